@@ -1,18 +1,25 @@
 from __future__ import print_function
 
 import argparse
+import errno
 import sys
 
-from selecta.indexing import FuzzyIndex
-from selecta.ui import DumbTerminalUI, SmartTerminalUI
-from selecta.utils import identity
-from selecta.terminal import reopened_terminal, Terminal
+# Only the modules needed by every run are imported here; the terminal
+# backends, the user interface, the worker processes and the optional
+# features are imported when they are first needed to keep the startup
+# time low
+from selecta.errors import NotSupportedError
+from selecta.indexing import create_fuzzy_index, FUZZY_INDEX_ENGINES
+from selecta.matches import numeric_score_of
+from selecta.utils import identity, text_type
 
 __version__ = "0.0.1"
 
+#: Names of the user interface classes in ``selecta.ui`` that can be chosen
+#: from the command line
 KNOWN_UI_CLASSES = dict(
-    dumb=DumbTerminalUI,
-    smart=SmartTerminalUI
+    dumb="DumbTerminalUI",
+    smart="SmartTerminalUI"
 )
 
 def main(args=None):
@@ -29,24 +36,174 @@ def main(args=None):
 
     parser = create_command_line_parser()
     options = parser.parse_args(args)
+    if options.jobs < 0:
+        parser.error("the number of jobs must not be negative")
+    if options.cache_dir is not None and options.jobs != 1:
+        parser.error("--cache cannot be combined with --jobs")
+    if options.cache_dir is not None:
+        from selecta.cache import IndexCache
+        if not IndexCache.supports_engine(options.engine):
+            parser.error("--cache cannot be combined with --engine "
+                         "{0}".format(options.engine))
+    if options.show_stats and options.jobs != 1:
+        parser.error("--stats cannot be combined with --jobs")
+    if options.filter_query is not None and options.queries_file is not None:
+        parser.error("--filter cannot be combined with --queries")
+    if options.serve_address is not None and (
+            options.filter_query is not None or
+            options.queries_file is not None):
+        parser.error("--serve cannot be combined with --filter or --queries")
+    if options.limit is not None and options.limit < 1:
+        parser.error("the limit must be positive")
+    if options.queries_file == "-" and options.input_file is None:
+        parser.error("--queries - requires --input")
+
+    serving = options.serve_address is not None
+    interactive = options.filter_query is None and \
+        options.queries_file is None and not serving
 
     if options.show_version:
         print(__version__)
         return
 
-    index = prepare_index()
+    if options.cache_dir is not None:
+        from selecta.cache import IndexCache
+        cache = IndexCache(options.cache_dir or None,
+                           max_size=options.cache_size * 1024 * 1024)
+        index = prepare_cached_index(cache, path=options.input_file,
+                                     engine=options.engine)
+    elif options.input_file is not None:
+        with open(options.input_file) as fp:
+            index = prepare_index(fp, engine=options.engine,
+                                  jobs=options.jobs)
+    elif interactive:
+        index = prepare_index_in_background(engine=options.engine,
+                                            jobs=options.jobs)
+    else:
+        index = prepare_index(engine=options.engine, jobs=options.jobs)
+
+    if options.show_stats:
+        from selecta.stats import StatsCollector
+        stats = StatsCollector()
+    else:
+        stats = None
+
+    # Caching the recent results makes editing the query (e.g., with
+    # Backspace) and repeated queries of the clients of a server fast
+    _configure_index(index, query_cache=interactive or serving, stats=stats)
+
+    try:
+        if interactive:
+            return _choose_interactively(index, options)
+        elif serving:
+            return _serve(index, options, stats)
+        else:
+            return _run_queries_from_options(index, options)
+    finally:
+        if stats is not None:
+            print(stats.summary(), file=sys.stderr)
+
+
+def _choose_interactively(index, options):
+    """Lets the user choose an item from the index on the terminal and
+    prints the chosen item. Returns the exit code of the application."""
+    from selecta import ui
+    from selecta.terminal import reopened_terminal
 
     with reopened_terminal():
-        ui_factory = KNOWN_UI_CLASSES[options.ui]
+        ui_factory = getattr(ui, KNOWN_UI_CLASSES[options.ui])
         selection = process_input(index, options.initial_query,
                                   ui_factory=ui_factory)
 
+    # If reading the input failed in the background, the selection was made
+    # from an incomplete list of items so we must not print it
+    error = getattr(index, "error", None)
+    if error is not None:
+        raise error
+
     if selection is not None:
         print(selection)
 
     return selection is None
 
 
+def _configure_index(index, query_cache=False, stats=None):
+    """Enables the query cache and the collection of statistics on the given
+    index if needed."""
+    # The wrapped index of a StreamingIndex does the actual searching
+    searcher = getattr(index, "index", index)
+    if query_cache and hasattr(searcher, "query_cache"):
+        from selecta.querycache import QueryCache
+        searcher.query_cache = QueryCache()
+    if stats is not None:
+        searcher.stats_callback = stats
+
+
+def _serve(index, options, stats):
+    """Serves the given index on the socket given with ``--serve`` until the
+    process is interrupted or terminated. Returns the exit code of the
+    application."""
+    from selecta.server import IndexServer
+
+    if options.cache_dir is not None:
+        from selecta.cache import IndexCache
+        cache = IndexCache(options.cache_dir or None,
+                           max_size=options.cache_size * 1024 * 1024)
+    else:
+        cache = None
+
+    def load(path):
+        path = path or options.input_file
+        if path is None:
+            raise NotSupportedError("the items were read from the standard "
+                                    "input; give the path of a file to "
+                                    "reload the items from")
+        if cache is not None:
+            new_index = prepare_cached_index(cache, path=path,
+                                             engine=options.engine)
+        else:
+            with open(path) as fp:
+                new_index = prepare_index(fp, engine=options.engine,
+                                          jobs=options.jobs)
+        _configure_index(new_index, query_cache=True, stats=stats)
+        return new_index
+
+    server = IndexServer(options.serve_address, load, index)
+    print("Serving the index on {0}".format(options.serve_address),
+          file=sys.stderr)
+    server.serve_forever()
+    return 0
+
+
+def _run_queries_from_options(index, options):
+    """Runs the query given with ``--filter`` or the queries in the file
+    given with ``--queries`` without any user interaction. Returns the exit
+    code of the application."""
+    try:
+        if options.filter_query is not None:
+            # Command line arguments are bytes on Python 2.x
+            query, = _prepare_strings([options.filter_query],
+                                      encoding=sys.getfilesystemencoding())
+            num_matches = filter_items(index, query, options.limit)
+        elif options.queries_file == "-":
+            num_matches = run_queries(index, _prepare_strings(
+                sys.stdin, _strip_newline
+            ), options.limit)
+        else:
+            with open(options.queries_file) as fp:
+                num_matches = run_queries(index, _prepare_strings(
+                    fp, _strip_newline
+                ), options.limit)
+        sys.stdout.flush()
+    except IOError as ex:
+        # The reader of the standard output (e.g., head) may exit early
+        if ex.errno != errno.EPIPE:
+            raise
+        return 0
+
+    return 0 if num_matches else 1
+
+
 def create_command_line_parser():
     """Creates and returns the command line argument parser."""
     ui_names = sorted(KNOWN_UI_CLASSES.keys())
@@ -58,6 +215,54 @@ def create_command_line_parser():
     parser.add_argument("-s", "--search", dest="initial_query",
                         metavar="SEARCH", default=None,
                         help="specify an initial search string")
+    parser.add_argument("--engine", dest="engine", metavar="ENGINE",
+                        default="auto", choices=FUZZY_INDEX_ENGINES,
+                        help="use the given fuzzy matching engine; valid "
+                        "choices are: {0!r}".format(list(FUZZY_INDEX_ENGINES)))
+    parser.add_argument("-j", "--jobs", dest="jobs", metavar="N",
+                        type=int, default=1,
+                        help="search the items using N worker processes; "
+                        "0 means one process per CPU core")
+    parser.add_argument("-i", "--input", dest="input_file", metavar="FILE",
+                        default=None,
+                        help="read the items from FILE instead of the "
+                        "standard input")
+    parser.add_argument("-f", "--filter", dest="filter_query",
+                        metavar="QUERY", default=None,
+                        help="do not show the user interface; print all the "
+                        "items matching QUERY, best first")
+    parser.add_argument("--queries", dest="queries_file", metavar="FILE",
+                        default=None,
+                        help="do not show the user interface; run each line "
+                        "of FILE as a query and print the matches as "
+                        "tab-separated lines of the query, the rank, the "
+                        "score and the item. Use - to read the queries from "
+                        "the standard input (requires --input)")
+    parser.add_argument("-n", "--limit", dest="limit", metavar="N",
+                        type=int, default=None,
+                        help="print at most N matches for each query with "
+                        "--filter or --queries")
+    parser.add_argument("--serve", dest="serve_address", metavar="SOCKET",
+                        default=None,
+                        help="do not show the user interface; keep the index "
+                        "in memory and answer the queries of clients on the "
+                        "Unix domain socket SOCKET. See selecta.server for "
+                        "the protocol")
+    parser.add_argument("--cache", dest="cache_dir", metavar="DIR",
+                        nargs="?", const="", default=None,
+                        help="store the index in a cache in DIR (default: "
+                        "~/.cache/selecta) and reuse it when the same input "
+                        "is seen again. The input is identified by its path "
+                        "and modification time when --input is used, and by "
+                        "its contents otherwise")
+    parser.add_argument("--cache-size", dest="cache_size", metavar="MB",
+                        type=int, default=256,
+                        help="remove the least recently used indexes from "
+                        "the cache when it grows larger than MB megabytes")
+    parser.add_argument("--stats", dest="show_stats", action="store_true",
+                        default=False,
+                        help="print statistics about the searches to the "
+                        "standard error on exit")
     parser.add_argument("--ui", dest="ui", metavar="UI", default="smart",
                         choices=ui_names,
                         help="use the given user interface; valid choices "
@@ -65,7 +270,33 @@ def create_command_line_parser():
     return parser
 
 
-def prepare_index(strings=sys.stdin, transform=unicode.strip, encoding=None):
+def create_index(engine="auto", jobs=1):
+    """Creates the index to be used by the application.
+
+    Args:
+        engine (str): the fuzzy matching engine to use; see
+            ``selecta.indexing.create_fuzzy_index()`` for the valid choices
+        jobs (int): the number of worker processes to distribute the items
+            of the index among. 1 means to keep all the items in the current
+            process; 0 means to use one worker process per CPU core.
+
+    Returns:
+        selecta.indexing.Index: the created index
+    """
+    if jobs < 0:
+        raise ValueError("the number of jobs must not be negative")
+    if jobs == 0:
+        import multiprocessing
+        jobs = multiprocessing.cpu_count()
+    if jobs == 1:
+        return create_fuzzy_index(engine)
+
+    from selecta.sharding import create_sharded_fuzzy_index
+    return create_sharded_fuzzy_index(jobs, engine)
+
+
+def prepare_index(strings=sys.stdin, transform=text_type.strip, encoding=None,
+                  engine="auto", jobs=1):
     """Prepares the index to be used by the application from strings coming
     from the given input stream or iterable.
 
@@ -77,22 +308,207 @@ def prepare_index(strings=sys.stdin, transform=unicode.strip, encoding=None):
             if they are not Unicode. ``None`` means to fall back to the
             ``encoding`` attribute of the ``strings`` iterable if there is
             such an attribute, or to ``sys.getdefaultencoding()``.
+        engine (str): the fuzzy matching engine to use; see
+            ``selecta.indexing.create_fuzzy_index()`` for the valid choices
+        jobs (int): the number of worker processes to use; see
+            create_index_ for more details
 
     Returns:
         selecta.indexing.Index: the prepared index
     """
+    index = create_index(engine, jobs)
+    for string in _prepare_strings(strings, transform, encoding):
+        index.add(string)
+    index.finalize()
+    return index
+
+
+def prepare_index_in_background(strings=sys.stdin, transform=text_type.strip,
+                                encoding=None, engine="auto", jobs=1):
+    """Prepares the index to be used by the application from strings coming
+    from the given input stream or iterable in a background thread. The
+    returned index can be searched immediately; searches will find the
+    strings that were read so far.
+
+    See prepare_index_ for the description of the arguments.
+
+    Returns:
+        selecta.streaming.StreamingIndex: the index being prepared
+    """
+    from selecta.streaming import StreamingIndex
+    items = _prepare_strings(strings, transform, encoding)
+    return StreamingIndex(create_index(engine, jobs), items).start()
+
+
+def prepare_cached_index(cache, strings=sys.stdin, path=None,
+                         transform=text_type.strip, encoding=None,
+                         engine="auto"):
+    """Loads the index to be used by the application from the given cache,
+    or prepares it from strings coming from the given input stream, file or
+    iterable and stores it in the cache if the cache has no index for the
+    same input yet.
+
+    Indexes loaded from the cache are memory-mapped read-only indexes that
+    use the pure Python fuzzy matching engine. If the cache cannot be used
+    with the given engine, the index is prepared from the strings and it is
+    not stored in the cache. Failures to store the index in the cache are
+    ignored.
+
+    Args:
+        cache (selecta.cache.IndexCache): the cache to use
+        strings (file): the input stream to read the strings from if no path
+            is given. The stream is read until its end so its contents can
+            be used as the cache key.
+        path (str or None): the path of the file to read the strings from.
+            The cache key is derived from the path and the modification time
+            of the file, so the file is not read at all if the cache has an
+            index for it.
+
+    See prepare_index_ for the description of the other arguments.
+
+    Returns:
+        selecta.indexing.Index: the loaded or prepared index
+    """
+    if not cache.supports_engine(engine):
+        if path is not None:
+            with open(path) as fp:
+                return prepare_index(fp, transform, encoding, engine)
+        return prepare_index(strings, transform, encoding, engine)
+
+    if path is not None:
+        key = cache.key_for_path(path)
+    else:
+        data = getattr(strings, "buffer", strings).read()
+        encoding = encoding or getattr(strings, "encoding", None)
+        key = cache.key_for_data(data)
+
+    index = cache.load(key)
+    if index is not None:
+        return index
+
+    if path is not None:
+        with open(path) as fp:
+            index = prepare_index(fp, transform, encoding, engine)
+    else:
+        index = prepare_index(data.splitlines(), transform, encoding, engine)
+
+    try:
+        cache.store(key, index)
+    except (IOError, OSError, NotSupportedError):
+        pass
+
+    return index
+
+
+def filter_items(index, query, limit=None, stream=None):
+    """Searches the given index for the given query and writes the string
+    representations of the matches to the given stream, one per line, best
+    first.
+
+    Args:
+        index (selecta.indexing.Index): the index to search
+        query (str): the query
+        limit (int or None): the maximum number of matches to write.
+            ``None`` means to write all the matches.
+        stream (file or None): the stream to write the matches to. ``None``
+            means the standard output.
+
+    Returns:
+        int: the number of matches written
+    """
+    write = _line_writer(stream or sys.stdout)
+    matches = index.search(query, limit)
+    for match in matches:
+        write(match.matched_string + u"\n")
+    return len(matches)
+
+
+def run_queries(index, queries, limit=None, stream=None):
+    """Searches the given index for each of the given queries and writes the
+    matches to the given stream as tab-separated lines of the query, the
+    rank of the match (starting from 1), the score of the match and the
+    string representation of the matched item. Queries without matches
+    produce no lines.
+
+    Args:
+        index (selecta.indexing.Index): the index to search
+        queries (iterable of str): the queries
+        limit (int or None): the maximum number of matches to write for
+            each query. ``None`` means to write all the matches.
+        stream (file or None): the stream to write the matches to. ``None``
+            means the standard output.
+
+    Returns:
+        int: the total number of matches written
+    """
+    write = _line_writer(stream or sys.stdout)
+    num_matches = 0
+    for query in queries:
+        matches = index.search(query, limit)
+        if not matches:
+            continue
+        write(u"".join(
+            u"{0}\t{1}\t{2}\t{3}\n".format(query, rank,
+                                          numeric_score_of(match),
+                                          match.matched_string)
+            for rank, match in enumerate(matches, 1)
+        ))
+        num_matches += len(matches)
+    return num_matches
+
+
+def _line_writer(stream):
+    """Returns a function that writes a Unicode string to the given stream,
+    encoding it first if the stream expects bytes (as on Python 2.x)."""
+    if text_type is str:
+        return stream.write
+
+    encoding = getattr(stream, "encoding", None) or "utf-8"
+
+    def write(string):
+        stream.write(string.encode(encoding))
+    return write
+
+
+def _strip_newline(string):
+    """Removes the line terminator from the end of the given string."""
+    return string.rstrip(u"\r\n")
+
+
+def _prepare_strings(strings, transform=None, encoding=None):
+    """Decodes and transforms the strings coming from the given input stream
+    or iterable before they are fed into the index. Input streams are read
+    line by line without any read-ahead buffering so the strings become
+    available as soon as they arrive.
+
+    See prepare_index_ for the description of the arguments.
+    """
     transform = transform or identity
     encoding = encoding or getattr(strings, "encoding", None) or \
         sys.getdefaultencoding()
-    index = FuzzyIndex()
+    if hasattr(strings, "readline"):
+        strings = _each_line_of(strings)
     for string in strings:
-        if not isinstance(string, unicode):
+        if not isinstance(string, text_type):
             string = string.decode(encoding)
-        index.add(transform(string))
-    return index
+        yield transform(string)
+
+
+def _each_line_of(stream):
+    """Yields the lines of the given stream one by one."""
+    readline = stream.readline
+    while True:
+        line = readline()
+        if not line:
+            return
+        yield line
+
 
+def process_input(index, initial_query=None, ui_factory=None):
+    from selecta.terminal import Terminal
+    if ui_factory is None:
+        from selecta.ui import SmartTerminalUI as ui_factory
 
-def process_input(index, initial_query=None, ui_factory=SmartTerminalUI):
     # Note that we force the Terminal factory to assume that we are connected
     # to a TTY. This is intentional; we know that because we have reopened
     # /dev/tty (on Linux and Mac) or CON (on Windows) before.
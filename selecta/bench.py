@@ -0,0 +1,720 @@
+"""Reproducible benchmarks for the hot paths of selecta: building the index,
+searching it and rendering the matches.
+
+Run ``python -m selecta.bench --help`` for the available options. The
+startup benchmarks measure how long it takes for a fresh interpreter to
+import the command line interface and to show the prompt. The other
+benchmarks use synthetic corpora that are generated from a fixed random
+seed, so two runs with the same options and the same Python version work
+on exactly the same items and queries. The results are written as JSON
+and can be compared against a saved baseline with ``--baseline``.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+
+from selecta.__main__ import prepare_index
+from select import select
+from selecta.indexing import SubstringIndex, FUZZY_INDEX_ENGINES
+from selecta.renderers import MatchRenderer
+from selecta.terminal import Terminal
+from threading import Thread
+from timeit import default_timer
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+__all__ = ["CORPORA", "compare_results", "generate_corpus", "main",
+           "run_benchmarks", "run_startup_benchmarks"]
+
+#: Version of the format of the benchmark results
+RESULT_FORMAT_VERSION = 2
+
+#: Lengths of the queries whose latency is measured
+QUERY_LENGTHS = (1, 2, 4, 8)
+
+_WORDS = ("src lib test tests main util utils index core app data model "
+          "view controller config build docs api client server common "
+          "internal vendor assets static scripts tools parser render cache "
+          "handler request response user session auth account payment "
+          "order item search query result error event queue worker").split()
+_EXTENSIONS = (".py", ".js", ".ts", ".go", ".c", ".h", ".md", ".json",
+               ".txt", ".html", ".css", ".yml")
+_LOG_LEVELS = ("DEBUG", "INFO", "INFO", "INFO", "WARNING", "ERROR")
+
+
+def _generate_paths(rng, size):
+    words, extensions = _WORDS, _EXTENSIONS
+    for index in range(size):
+        depth = rng.randint(1, 8)
+        parts = [rng.choice(words) for _ in range(depth)]
+        parts.append("{0}_{1}{2}".format(rng.choice(words), index,
+                                         rng.choice(extensions)))
+        yield "/".join(parts)
+
+
+def _generate_log_lines(rng, size):
+    words = _WORDS
+    for index in range(size):
+        yield "2016-{0:02}-{1:02}T{2:02}:{3:02}:{4:02} {5} [{6}.{7}] " \
+            "{8} id={9}".format(
+                rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23),
+                rng.randint(0, 59), rng.randint(0, 59),
+                rng.choice(_LOG_LEVELS), rng.choice(words), rng.choice(words),
+                " ".join(rng.choice(words)
+                         for _ in range(rng.randint(3, 12))),
+                rng.randint(0, 10 * size)
+            )
+
+
+def _generate_identifiers(rng, size):
+    words = _WORDS
+    for index in range(size):
+        parts = [rng.choice(words) for _ in range(rng.randint(1, 5))]
+        style = rng.randint(0, 2)
+        if style == 0:
+            yield "_".join(parts)
+        elif style == 1:
+            yield parts[0] + "".join(part.capitalize() for part in parts[1:])
+        else:
+            yield "".join(part.capitalize() for part in parts)
+
+
+#: Dictionary mapping the names of the known synthetic corpora to the
+#: functions that generate them from a random generator and a size
+CORPORA = dict(
+    paths=_generate_paths,
+    logs=_generate_log_lines,
+    identifiers=_generate_identifiers
+)
+
+
+def generate_corpus(name, size, seed=42):
+    """Generates a synthetic corpus.
+
+    Args:
+        name (str): the name of the corpus; must be a key of ``CORPORA``
+        size (int): the number of lines in the corpus
+        seed (int): the seed of the random generator
+
+    Returns:
+        list of str: the lines of the corpus
+    """
+    return list(CORPORA[name](random.Random(seed), size))
+
+
+def _generate_queries(rng, lines, length, count, contiguous):
+    """Generates queries of the given length from randomly chosen lines of
+    the corpus so most of the queries have at least one match. Contiguous
+    queries are substrings of the lines; other queries are subsequences."""
+    lines = [line for line in lines if len(line) >= length]
+    result = []
+    for _ in range(count if lines else 0):
+        line = rng.choice(lines)
+        if contiguous:
+            start = rng.randint(0, len(line) - length)
+            result.append(line[start:start + length])
+        else:
+            indices = sorted(rng.sample(range(len(line)), length))
+            result.append("".join(line[index] for index in indices))
+    return result
+
+
+def _percentile(values, fraction):
+    """Returns the given percentile of the given list of numbers using the
+    nearest-rank method."""
+    values = sorted(values)
+    rank = max(int(round(fraction * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def _peak_memory_in_megabytes():
+    """Returns the peak resident set size of the current process in
+    megabytes, or ``None`` if it cannot be determined."""
+    # On Linux, ru_maxrss of a child process starts from the resident set
+    # size of its parent, so the high water mark of the process is taken
+    # from /proc if possible
+    try:
+        with open("/proc/self/status") as fp:
+            for line in fp:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (IOError, OSError, ValueError):
+        pass
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+def _measure_peak_memory(name, size, seed, engine):
+    """Returns the peak resident set size in megabytes of a fresh interpreter
+    process that generates the given corpus and prepares and searches its
+    fuzzy index, or ``None`` if it cannot be determined. The peak of the
+    current process would include everything that the earlier benchmarks
+    allocated, so it could not be compared between corpora."""
+    if resource is None:
+        return None
+    output = subprocess.check_output(
+        [sys.executable, "-c", _MEMORY_PROBE, name, str(size), str(seed),
+         engine],
+        env=_subprocess_environment()
+    ).strip()
+    return None if output == b"None" else float(output)
+
+
+def _print_peak_memory(name, size, seed, engine):
+    """Generates the given corpus, prepares and searches its fuzzy index and
+    prints the peak resident set size of the current process in megabytes.
+    Used by _measure_peak_memory_ in the child process."""
+    lines = generate_corpus(name, size, seed)
+    index = prepare_index(lines, engine=engine)
+    index.search(lines[0][:1], 9)
+    print(_peak_memory_in_megabytes())
+
+
+#: Python code that runs _print_peak_memory_ with the command line arguments
+#: of the interpreter
+_MEMORY_PROBE = "import sys; from selecta.bench import _print_peak_memory; " \
+    "_print_peak_memory(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), " \
+    "sys.argv[4])"
+
+
+def _subprocess_environment():
+    """Returns the environment of the interpreter processes started by the
+    benchmarks, which can import selecta from the same directory as the
+    current process."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [root] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else [])
+    )
+    return env
+
+
+class _BenchmarkTerminal(Terminal):
+    """Terminal that renders templates with standard ANSI escape sequences
+    without being attached to a real terminal."""
+
+    @property
+    def supported(self):
+        return True
+
+    def init(self):
+        super(_BenchmarkTerminal, self).init()
+        self._control_sequences.update(
+            NORMAL="\x1b[0m", CLEAR_EOL="\x1b[K", FG_BLACK="\x1b[30m",
+            BG_YELLOW="\x1b[43m", BG_WHITE="\x1b[47m"
+        )
+
+
+def _measure_prepare_index(lines, engine):
+    start = default_timer()
+    index = prepare_index(lines, engine=engine)
+    elapsed = default_timer() - start
+    return index, {"lines_per_second": round(len(lines) / elapsed, 1)}
+
+
+def _measure_search(index, queries, limit):
+    # Indexes may build some of their auxiliary data structures lazily
+    # when they are searched for the first time; this should not be
+    # attributed to any of the queries
+    for queries_of_length in queries.values():
+        if queries_of_length:
+            index.search(queries_of_length[0][:1], limit)
+            break
+
+    # Every query is measured as a fresh search. Without resetting the
+    # index, a query that extends the previous one would only narrow down
+    # the previous candidates; that is measured separately as typing
+    metrics = {}
+    for length, queries_of_length in sorted(queries.items()):
+        if not queries_of_length:
+            continue
+        latencies = []
+        for query in queries_of_length:
+            index.forget_previous_query()
+            start = default_timer()
+            index.search(query, limit)
+            latencies.append((default_timer() - start) * 1000)
+        prefix = "q{0}.".format(length)
+        metrics.update(_latency_metrics(prefix, latencies))
+
+    metrics.update(_measure_typing(index, queries[max(queries)], limit))
+    return metrics
+
+
+def _measure_typing(index, queries, limit):
+    # Simulates the user typing each query character by character, starting
+    # from an empty query; each keystroke narrows down the candidates of
+    # the previous one
+    latencies = []
+    for query in queries:
+        index.forget_previous_query()
+        for end in range(1, len(query) + 1):
+            start = default_timer()
+            index.search(query[:end], limit)
+            latencies.append((default_timer() - start) * 1000)
+    return _latency_metrics("typing.", latencies) if latencies else {}
+
+
+def _latency_metrics(prefix, latencies):
+    return {
+        prefix + "p50_ms": round(_percentile(latencies, 0.5), 3),
+        prefix + "p99_ms": round(_percentile(latencies, 0.99), 3)
+    }
+
+
+def _measure_rendering(matches, rounds):
+    terminal = _BenchmarkTerminal(is_tty=True)
+    terminal.init()
+    try:
+        renderer = MatchRenderer()
+        renderer.attach_to_terminal(terminal)
+        render = renderer.render
+        durations = []
+        for round_index in range(rounds):
+            start = default_timer()
+            for match_index, match in enumerate(matches):
+                render(match, selected=match_index == round_index)
+            durations.append(default_timer() - start)
+    finally:
+        terminal.deinit()
+
+    # The median of the rounds is less sensitive to noise than the total
+    return {"matches_per_second":
+            round(len(matches) / _percentile(durations, 0.5), 1)}
+
+
+def run_benchmarks(corpora=None, sizes=(10000, 100000), seed=42,
+                   num_queries=50, engine="auto", limit=9, log=None):
+    """Runs the benchmarks on the given corpora and sizes.
+
+    Args:
+        corpora (list of str or None): the names of the corpora to use;
+            ``None`` means all the corpora in ``CORPORA``
+        sizes (list of int): the sizes of the corpora to use
+        seed (int): the seed of the random generator that generates the
+            corpora and the queries
+        num_queries (int): the number of queries to run for each query
+            length and index type
+        engine (str): the fuzzy matching engine to use; see
+            ``selecta.indexing.create_fuzzy_index()``
+        limit (int or None): the maximum number of matches to retrieve for
+            each query; the default is the number of matches shown by the
+            user interface
+        log (callable or None): a function to call with a progress message
+            before each benchmark
+
+    Returns:
+        dict: the results of the benchmarks that can be serialized to JSON.
+            The ``metrics`` key maps the names of the measured metrics to
+            their values. Search latencies are measured for fresh queries
+            of each length (``qN.*``) and for each keystroke while the
+            longest queries are typed character by character
+            (``typing.*``). ``peak_memory_mb`` is measured in a separate
+            process for each corpus. Metrics ending in ``_per_second`` are
+            better when they are higher; all the other metrics are better
+            when they are lower.
+    """
+    corpora = sorted(CORPORA) if corpora is None else list(corpora)
+    metrics = {}
+
+    for name in corpora:
+        for size in sizes:
+            if log:
+                log("{0} x {1}".format(name, size))
+
+            prefix = "{0}.{1}.".format(name, size)
+            lines = generate_corpus(name, size, seed)
+            rng = random.Random(seed)
+
+            fuzzy_index, result = _measure_prepare_index(lines, engine)
+            for key, value in result.items():
+                metrics[prefix + "prepare_index." + key] = value
+
+            for index_name, index, contiguous in (
+                ("fuzzy", fuzzy_index, False),
+                ("substring", _create_substring_index(lines), True)
+            ):
+                queries = dict(
+                    (length, _generate_queries(rng, lines, length,
+                                               num_queries, contiguous))
+                    for length in QUERY_LENGTHS
+                )
+                result = _measure_search(index, queries, limit)
+                for key, value in result.items():
+                    metrics[prefix + index_name + "." + key] = value
+
+            matches = list(fuzzy_index.search(lines[0][:1], 1000))
+            del fuzzy_index
+            result = _measure_rendering(matches, rounds=10)
+            for key, value in result.items():
+                metrics[prefix + "render." + key] = value
+
+            peak_memory = _measure_peak_memory(name, size, seed, engine)
+            if peak_memory is not None:
+                metrics[prefix + "peak_memory_mb"] = peak_memory
+
+    return {
+        "version": RESULT_FORMAT_VERSION,
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform()
+        },
+        "options": {
+            "corpora": corpora, "sizes": list(sizes), "seed": seed,
+            "num_queries": num_queries, "engine": engine, "limit": limit
+        },
+        "metrics": metrics
+    }
+
+
+def _create_substring_index(lines):
+    index = SubstringIndex()
+    for line in lines:
+        index.add(line)
+    index.finalize()
+    return index
+
+
+#: Python code that prints the time needed to import the command line
+#: interface in a fresh interpreter
+_IMPORT_TIMER = "from timeit import default_timer; start = default_timer(); " \
+    "import selecta.__main__; print(default_timer() - start)"
+
+#: The prompt that the command line interface shows when it is ready
+_PROMPT = b"> "
+
+
+def run_startup_benchmarks(rounds=10, num_items=1000, seed=42,
+                           engine="auto", python=None, timeout=10,
+                           log=None):
+    """Measures the startup time of the command line interface, each time
+    in a fresh interpreter process.
+
+    Args:
+        rounds (int): the number of times each measurement is repeated
+        num_items (int): the number of items to feed to the command line
+            interface when measuring the time to the first prompt
+        seed (int): the seed of the random generator that generates the
+            items
+        engine (str): the fuzzy matching engine to use; see
+            ``selecta.indexing.create_fuzzy_index()``
+        python (str or None): the Python interpreter to use; ``None``
+            means the current one
+        timeout (float): the number of seconds to wait for the prompt
+        log (callable or None): a function to call with a progress message
+            before the benchmarks
+
+    Returns:
+        dict: the medians of the measurements in milliseconds.
+            ``startup.import_ms`` is the time needed to import the command
+            line interface; ``startup.version_ms`` is the total time of
+            ``selecta --version``; ``startup.first_prompt_ms`` is the time
+            from starting ``selecta`` until it shows the prompt. The latter
+            is measured on a pseudo-terminal; its value is ``None`` if the
+            platform has no pseudo-terminals or the prompt did not appear in
+            time in any of the rounds, and the reason is logged.
+    """
+    if log:
+        log("startup")
+
+    python = python or sys.executable
+    env = _subprocess_environment()
+    items = "".join(line + "\n" for line in
+                    generate_corpus("paths", num_items, seed)).encode("utf-8")
+
+    import_times, version_times, prompt_times = [], [], []
+    failure = None
+    with open(os.devnull, "w") as devnull:
+        for _ in range(rounds):
+            output = subprocess.check_output([python, "-c", _IMPORT_TIMER],
+                                             env=env)
+            import_times.append(float(output) * 1000)
+
+            start = default_timer()
+            subprocess.check_call([python, "-m", "selecta", "--version"],
+                                  env=env, stdout=devnull)
+            version_times.append((default_timer() - start) * 1000)
+
+            elapsed, output = _time_to_first_prompt(
+                [python, "-m", "selecta", "--engine", engine], env, items,
+                timeout
+            )
+            if elapsed is not None:
+                prompt_times.append(elapsed * 1000)
+            else:
+                failure = output
+
+    metrics = {
+        "startup.import_ms": round(_percentile(import_times, 0.5), 3),
+        "startup.version_ms": round(_percentile(version_times, 0.5), 3)
+    }
+    if len(prompt_times) == rounds:
+        metrics["startup.first_prompt_ms"] = \
+            round(_percentile(prompt_times, 0.5), 3)
+    else:
+        # The metric is recorded as missing instead of being left out so
+        # the results and the comparison with a baseline show it
+        metrics["startup.first_prompt_ms"] = None
+        if log:
+            log("startup.first_prompt_ms is missing: the prompt did not "
+                "appear in {0} of {1} rounds. {2}".format(
+                    rounds - len(prompt_times), rounds,
+                    "The output of selecta was:\n" + failure.decode(
+                        "utf-8", "replace"
+                    ) if failure else "No pseudo-terminal is available."
+                ))
+    return metrics
+
+
+def _time_to_first_prompt(args, env, items, timeout):
+    """Runs the command line interface with the given arguments on a
+    pseudo-terminal, feeds it the given items on its standard input and
+    returns the number of seconds until it showed the prompt, or ``None``
+    if it could not be measured, along with everything that the command
+    line interface wrote to the pseudo-terminal."""
+    try:
+        import pty
+    except ImportError:
+        return None, b""
+
+    read_end, write_end = os.pipe()
+    start = default_timer()
+    pid, fd = pty.fork()
+    if pid == 0:
+        # Child process
+        try:
+            os.close(write_end)
+            os.dup2(read_end, 0)
+            os.execve(args[0], args, env)
+        finally:
+            os._exit(127)
+
+    os.close(read_end)
+    writer = Thread(target=_write_and_close, args=(write_end, items))
+    writer.daemon = True
+    writer.start()
+
+    output, result = b"", None
+    try:
+        while default_timer() - start < timeout:
+            readable, _, _ = select([fd], [], [], 0.01)
+            if not readable:
+                continue
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                break
+            if not chunk:
+                break
+            output += chunk
+            if _PROMPT in output:
+                result = default_timer() - start
+                break
+    finally:
+        try:
+            os.kill(pid, 9)
+        except OSError:
+            pass
+        os.waitpid(pid, 0)
+        os.close(fd)
+        writer.join()
+
+    return result, output
+
+
+def _write_and_close(fd, data):
+    """Writes the given data into the given file descriptor and closes it;
+    errors are ignored because the reader may exit early."""
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def compare_results(results, baseline, tolerance=0.1):
+    """Compares the results of a benchmark run against a baseline.
+
+    Args:
+        results (dict): the results of the benchmark run, as returned by
+            run_benchmarks_
+        baseline (dict): the results of an earlier benchmark run
+        tolerance (float): the relative change that is not yet considered a
+            regression
+
+    Returns:
+        list of tuple: the name, the baseline value, the current value and
+            the relative change of each metric that is present in both
+            runs, sorted by name. The fifth item of each tuple is ``True``
+            if the metric regressed by more than the given tolerance.
+            Metrics that were measured in the baseline but are missing
+            (``None``) in the current run are reported as regressions with
+            no relative change.
+    """
+    result = []
+    current, previous = results["metrics"], baseline["metrics"]
+    for name in sorted(set(current) & set(previous)):
+        old_value, new_value = previous[name], current[name]
+        if not old_value:
+            continue
+        if new_value is None:
+            result.append((name, old_value, None, None, True))
+            continue
+        change = (new_value - old_value) / old_value
+        if name.endswith("_per_second"):
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance
+        result.append((name, old_value, new_value, change, regressed))
+    return result
+
+
+def create_command_line_parser():
+    """Creates and returns the command line argument parser."""
+    corpus_names = sorted(CORPORA)
+
+    parser = argparse.ArgumentParser(prog="python -m selecta.bench")
+    parser.add_argument("--suite", dest="suite", metavar="SUITE",
+                        default="all", choices=("all", "search", "startup"),
+                        help="run the search benchmarks on the synthetic "
+                        "corpora, the startup benchmarks or all of them. "
+                        "Default: all")
+    parser.add_argument("--corpus", dest="corpora", metavar="CORPUS",
+                        action="append", choices=corpus_names,
+                        help="use the given synthetic corpus; may be given "
+                        "multiple times. Valid choices are: {0!r}. Default: "
+                        "all of them".format(corpus_names))
+    parser.add_argument("--sizes", dest="sizes", metavar="N,N,...",
+                        default="10000,100000",
+                        help="comma-separated list of corpus sizes")
+    parser.add_argument("--seed", dest="seed", metavar="SEED", type=int,
+                        default=42, help="seed of the random generator")
+    parser.add_argument("--queries", dest="num_queries", metavar="N",
+                        type=int, default=50,
+                        help="number of queries to run for each query "
+                        "length and index type")
+    parser.add_argument("--engine", dest="engine", metavar="ENGINE",
+                        default="auto", choices=FUZZY_INDEX_ENGINES,
+                        help="use the given fuzzy matching engine; valid "
+                        "choices are: {0!r}".format(list(FUZZY_INDEX_ENGINES)))
+    parser.add_argument("--startup-rounds", dest="startup_rounds",
+                        metavar="N", type=int, default=10,
+                        help="number of times each startup measurement is "
+                        "repeated")
+    parser.add_argument("--startup-budget", dest="startup_budget",
+                        metavar="MS", type=float, default=None,
+                        help="exit with a non-zero code if the time to the "
+                        "first prompt (or, if it cannot be measured, the "
+                        "time of selecta --version) exceeds MS "
+                        "milliseconds")
+    parser.add_argument("-o", "--output", dest="output", metavar="FILE",
+                        default=None,
+                        help="write the results to FILE instead of the "
+                        "standard output")
+    parser.add_argument("--baseline", dest="baseline", metavar="FILE",
+                        default=None,
+                        help="compare the results with the results in FILE "
+                        "and exit with a non-zero code if any of the "
+                        "metrics regressed")
+    parser.add_argument("--tolerance", dest="tolerance", metavar="FRACTION",
+                        type=float, default=0.1,
+                        help="relative change of a metric that is not yet "
+                        "considered a regression when comparing with the "
+                        "baseline. Default: 0.1")
+    return parser
+
+
+def main(args=None):
+    """The main entry point of the benchmark suite.
+
+    Args:
+        args (list of str): the command line arguments
+
+    Returns:
+        int: the exit code of the benchmark suite
+    """
+    if args is None:
+        args = sys.argv[1:]
+
+    parser = create_command_line_parser()
+    options = parser.parse_args(args)
+    try:
+        sizes = [int(size) for size in options.sizes.split(",")]
+    except ValueError:
+        parser.error("sizes must be a comma-separated list of integers")
+    if any(size < 1 for size in sizes):
+        parser.error("sizes must be positive")
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    # With no corpora, run_benchmarks() only describes the environment
+    corpora = [] if options.suite == "startup" else options.corpora
+    results = run_benchmarks(corpora, sizes, options.seed,
+                             options.num_queries, options.engine, log=log)
+    if options.suite != "search":
+        results["options"]["startup_rounds"] = options.startup_rounds
+        results["metrics"].update(run_startup_benchmarks(
+            options.startup_rounds, seed=options.seed,
+            engine=options.engine, log=log
+        ))
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, "w") as fp:
+            fp.write(output + "\n")
+    else:
+        print(output)
+
+    regressed = False
+    if options.startup_budget is not None and options.suite != "search":
+        metrics = results["metrics"]
+        name = "startup.first_prompt_ms"
+        if metrics.get(name) is None:
+            log("checking the budget against startup.version_ms instead")
+            name = "startup.version_ms"
+        if metrics[name] > options.startup_budget:
+            log("{0} is {1}, over the budget of {2} ms".format(
+                name, metrics[name], options.startup_budget
+            ))
+            regressed = True
+
+    if not options.baseline:
+        return 1 if regressed else 0
+
+    with open(options.baseline) as fp:
+        baseline = json.load(fp)
+
+    for name, old_value, new_value, change, is_regression in \
+            compare_results(results, baseline, options.tolerance):
+        log("{0:<50} {1:>12} {2:>12} {3:>8}{4}".format(
+            name, old_value, "missing" if new_value is None else new_value,
+            "" if change is None else "{0:+.1%}".format(change),
+            "  REGRESSION" if is_regression else ""
+        ))
+        regressed = regressed or is_regression
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,432 @@
+"""On-disk cache of fuzzy indexes so that the same set of items does not
+have to be indexed again every time selecta is started."""
+
+from array import array
+from selecta.errors import NotSupportedError
+from selecta.indexing import create_fuzzy_index, FuzzyIndex
+from selecta.utils import SIGNATURE_TYPECODE, text_type
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+__all__ = ["IndexCache", "MappedFuzzyIndex", "default_cache_directory",
+           "write_index"]
+
+#: Magic bytes at the start of every index file, including the version
+#: number of the file format
+_MAGIC = b"SELIDX\x00\x02"
+
+#: Typecodes of the sections of an index file, in the order they appear in
+#: the file. ``None`` denotes UTF-8 encoded text. The item and token
+#: offsets are byte offsets into the item and token text.
+_SECTIONS = (
+    ("item_offsets", "L"), ("item_text", None),
+    ("token_offsets", "L"), ("token_text", None),
+    ("posting_offsets", "I"), ("posting_item_ids", "I"),
+    ("token_signatures", SIGNATURE_TYPECODE), ("token_lengths", "I")
+)
+
+#: Description of the platform-dependent aspects of the file format; index
+#: files written on a platform with a different layout are ignored
+_LAYOUT = "{0}:{1}".format(
+    sys.byteorder,
+    ",".join(str(array(typecode).itemsize)
+             for _, typecode in _SECTIONS if typecode)
+).encode("ascii")
+
+#: Header of an index file: the magic bytes, the layout, the number of
+#: items, tokens and postings, the number of items that do not have exactly
+#: one token, and the offset and length of each section
+_HEADER = struct.Struct("=8s32s4Q{0}Q".format(2 * len(_SECTIONS)))
+
+#: Sections are aligned to this many bytes
+_ALIGNMENT = 8
+
+#: Extension of the index files in the cache directory
+_EXTENSION = ".idx"
+
+#: Extension of the temporary files that index files are written to
+_TEMP_EXTENSION = ".tmp"
+
+#: Temporary files older than this many seconds are assumed to be left
+#: behind by an interrupted write and are removed during eviction
+_MAX_TEMP_FILE_AGE = 3600
+
+
+def default_cache_directory():
+    """Returns the default directory of the index cache; this is a directory
+    named ``selecta`` in ``$XDG_CACHE_HOME`` or ``~/.cache``."""
+    root = os.environ.get("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "selecta")
+
+
+class IndexCache(object):
+    """Directory of index files, each of which is identified by a key that
+    is derived from the input the index was built from.
+
+    Loaded indexes are memory-mapped from their files, so the cache makes
+    starting up on a large set of items almost instantaneous. When the total
+    size of the files exceeds the size limit of the cache, the least recently
+    used files are removed.
+
+    Attributes:
+        directory (str): the directory of the index files
+        max_size (int): the maximum total size of the index files in bytes
+    """
+
+    def __init__(self, directory=None, max_size=256 * 1024 * 1024):
+        """Constructor.
+
+        Args:
+            directory (str or None): the directory of the index files.
+                ``None`` means to use default_cache_directory_. The
+                directory is created when the first index is stored.
+            max_size (int): the maximum total size of the index files in
+                bytes
+        """
+        self.directory = directory or default_cache_directory()
+        self.max_size = max_size
+
+    @staticmethod
+    def supports_engine(engine):
+        """Returns whether the indexes loaded from the cache find the same
+        items as the indexes created with the given fuzzy matching engine.
+        Loaded indexes search like FuzzyIndex_, so they cannot stand in for
+        indexes of the other engines.
+
+        Args:
+            engine (str): the name of the engine; see
+                ``selecta.indexing.create_fuzzy_index()``
+
+        Returns:
+            bool: whether the cache can be used with the given engine
+        """
+        try:
+            return type(create_fuzzy_index(engine)) is FuzzyIndex
+        except NotSupportedError:
+            return False
+
+    @staticmethod
+    def key_for_data(data):
+        """Returns the cache key of an index built from the given input.
+
+        Args:
+            data (bytes): the raw input that the items of the index were
+                read from
+
+        Returns:
+            str: the cache key
+        """
+        digest = hashlib.sha1(b"data:")
+        digest.update(data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def key_for_path(path):
+        """Returns the cache key of an index built from the file at the given
+        path. The key depends on the absolute path, the size and the
+        modification time of the file, so it changes when the file is
+        modified.
+
+        Args:
+            path (str): the path of the file that the items of the index
+                were read from
+
+        Returns:
+            str: the cache key
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        fingerprint = "path:{0}:{1}:{2!r}".format(path, stat.st_size,
+                                                  stat.st_mtime)
+        if isinstance(fingerprint, text_type):
+            fingerprint = fingerprint.encode("utf-8")
+        return hashlib.sha1(fingerprint).hexdigest()
+
+    def load(self, key):
+        """Loads the index with the given key from the cache.
+
+        Args:
+            key (str): the cache key of the index
+
+        Returns:
+            MappedFuzzyIndex or None: the loaded index or ``None`` if there is
+                no usable index with the given key in the cache
+        """
+        path = self._path_for(key)
+        try:
+            with open(path, "rb") as fp:
+                buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            return None
+
+        try:
+            index = MappedFuzzyIndex(buffer)
+        except ValueError:
+            return None
+
+        # Mark the file as recently used for the eviction policy
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return index
+
+    def store(self, key, index):
+        """Stores the given index in the cache and removes the least recently
+        used indexes if the cache became too large.
+
+        Args:
+            key (str): the cache key of the index
+            index (FuzzyIndex): the index to store
+
+        Raises:
+            NotSupportedError: if the index cannot be stored in the cache
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        # Write to a temporary file first so other processes never see a
+        # half-written index file
+        fd, temp_path = tempfile.mkstemp(dir=self.directory,
+                                         suffix=_TEMP_EXTENSION)
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                write_index(index, fp)
+            _replace(temp_path, self._path_for(key))
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used index files from the cache until
+        the total size of the files is at most the size limit. Temporary
+        files left behind by interrupted writes are also removed."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+
+        files, now = [], time.time()
+        for name in names:
+            is_temp_file = name.endswith(_TEMP_EXTENSION)
+            if not is_temp_file and not name.endswith(_EXTENSION):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                if is_temp_file:
+                    # Recent temporary files may still be written by
+                    # another process
+                    if now - stat.st_mtime > _MAX_TEMP_FILE_AGE:
+                        os.unlink(path)
+                    continue
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total_size -= size
+
+    def _path_for(self, key):
+        return os.path.join(self.directory, key + _EXTENSION)
+
+
+class MappedFuzzyIndex(FuzzyIndex):
+    """Read-only fuzzy index that is backed by an index file written by
+    write_index_, typically memory-mapped.
+
+    The postings, the signatures and the lengths of the tokens are used
+    directly from the buffer without copying them whenever the Python
+    version allows it; the items and the tokens are decoded from the buffer
+    one by one whenever they are needed. The index finds the same items
+    with the same scores as the index that was written to the file.
+    """
+
+    def __init__(self, buffer):
+        """Constructor.
+
+        Args:
+            buffer (buffer): the contents of the index file
+
+        Raises:
+            ValueError: if the buffer does not contain a valid index file
+        """
+        super(MappedFuzzyIndex, self).__init__()
+
+        if len(buffer) < _HEADER.size:
+            raise ValueError("index file is truncated")
+
+        header = _HEADER.unpack(buffer[:_HEADER.size])
+        if header[0] != _MAGIC or header[1].rstrip(b"\x00") != _LAYOUT:
+            raise ValueError("not an index file or incompatible format")
+
+        num_items, num_tokens, self._num_postings, \
+            self._num_irregular_items = header[2:6]
+        sections = {}
+        for index, (name, typecode) in enumerate(_SECTIONS):
+            offset, length = header[6 + 2 * index:8 + 2 * index]
+            if offset + length > len(buffer):
+                raise ValueError("index file is truncated")
+            sections[name] = _view(buffer, offset, length, typecode)
+
+        self._file_buffer = buffer
+        self._items = _MappedStrings(sections["item_text"],
+                                     sections["item_offsets"])
+        self._tokens = _MappedStrings(sections["token_text"],
+                                      sections["token_offsets"])
+        self._posting_offsets = sections["posting_offsets"]
+        self._posting_item_ids = sections["posting_item_ids"]
+        self._token_signatures = sections["token_signatures"]
+        self._token_lengths = sections["token_lengths"]
+
+        if len(self._items) != num_items or len(self._tokens) != num_tokens:
+            raise ValueError("index file is corrupted")
+
+    def add(self, item, tokenizer=None):
+        raise NotSupportedError("memory-mapped indexes are read-only")
+
+    def finalize(self):
+        pass
+
+
+def write_index(index, fp):
+    """Writes the given fuzzy index into the given file in a format that can
+    be loaded with MappedFuzzyIndex_.
+
+    Args:
+        index (FuzzyIndex): the index to write. All its items must be
+            strings.
+        fp (file): the file to write the index to; it must be opened in
+            binary mode
+
+    Raises:
+        NotSupportedError: if the index cannot be written
+    """
+    if not isinstance(index, FuzzyIndex):
+        raise NotSupportedError("only fuzzy indexes can be written")
+    if not all(isinstance(item, text_type) for item in index._items):
+        raise NotSupportedError("only indexes of strings can be written")
+
+    index.finalize()
+    index._ensure_signatures()
+
+    data = {}
+    data["item_offsets"], data["item_text"] = _pack_strings(index._items)
+    data["token_offsets"], data["token_text"] = _pack_strings(index._tokens)
+    data["posting_offsets"] = index._posting_offsets
+    data["posting_item_ids"] = index._posting_item_ids
+    data["token_signatures"] = index._token_signatures
+    data["token_lengths"] = index._token_lengths
+
+    chunks, locations = [], []
+    offset = _HEADER.size
+    for name, typecode in _SECTIONS:
+        chunk = data[name]
+        if typecode is not None:
+            chunk = _to_bytes(array(typecode, chunk))
+        padding = -offset % _ALIGNMENT
+        chunks.append(b"\x00" * padding)
+        chunks.append(chunk)
+        offset += padding
+        locations.extend((offset, len(chunk)))
+        offset += len(chunk)
+
+    fp.write(_HEADER.pack(_MAGIC, _LAYOUT, len(index._items),
+                          len(index._tokens), index._num_postings,
+                          index._num_irregular_items, *locations))
+    for chunk in chunks:
+        fp.write(chunk)
+
+
+class _MappedStrings(object):
+    """Read-only sequence of strings that are stored in a buffer as UTF-8
+    encoded text, along with the byte offsets of the strings. Strings are
+    decoded every time they are accessed and are not kept in memory, so
+    the memory used by the sequence does not grow as it is searched."""
+
+    def __init__(self, text, offsets):
+        self._text = text
+        self._offsets = offsets
+        self._length = len(offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("index out of range")
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return bytes(self._text[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __len__(self):
+        return self._length
+
+
+def _pack_strings(strings):
+    """Encodes the given strings into a single UTF-8 byte string, and returns
+    the offsets of the strings in the byte string along with the byte string
+    itself."""
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets, offset = array("L", [0]), 0
+    for chunk in encoded:
+        offset += len(chunk)
+        offsets.append(offset)
+    return offsets, b"".join(encoded)
+
+
+def _replace(source, target):
+    """Renames the given file, replacing the target if it exists."""
+    try:
+        os.replace(source, target)
+    except AttributeError:
+        # Python 2.x has no os.replace()
+        if os.name == "nt" and os.path.exists(target):
+            os.unlink(target)
+        os.rename(source, target)
+
+
+if hasattr(memoryview, "cast"):
+    def _to_bytes(items):
+        return items.tobytes()
+
+    def _view(buffer, offset, length, typecode):
+        """Returns a view into the given part of the buffer that contains an
+        array with the given typecode (or the raw bytes if the typecode is
+        ``None``), without copying the data."""
+        view = memoryview(buffer)[offset:offset+length]
+        return view if typecode is None else view.cast(typecode)
+else:
+    # Python 2.x cannot cast memoryviews, so we have to copy the arrays
+    def _to_bytes(items):
+        return items.tostring()
+
+    def _view(buffer, offset, length, typecode):
+        """Returns an array with the given typecode (or the raw bytes if the
+        typecode is ``None``) that contains the given part of the buffer."""
+        if typecode is None:
+            return buffer[offset:offset+length]
+        result = array(typecode)
+        result.fromstring(buffer[offset:offset+length])
+        return result
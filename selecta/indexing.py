@@ -1,7 +1,14 @@
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from operator import itemgetter
-from selecta.matches import Match
-from selecta.utils import each_index_of_string, list_packer
+from heapq import nsmallest
+import re
+from selecta.errors import NotSupportedError
+from selecta.matches import LazyMatch, ResultSet
+from selecta.stats import SearchStats
+from selecta.utils import each_index_of_string, list_packer, \
+    signature_of, SIGNATURE_TYPECODE, text_type
+from timeit import default_timer
 
 
 class Index(object):
@@ -15,14 +22,36 @@ class Index(object):
         """
         raise NotImplementedError
 
-    def search(query):
+    def finalize(self):
+        """Notifies the index that no more items will be added to it for
+        the time being. Indexes may use this opportunity to build auxiliary
+        data structures that are expensive to update incrementally. Adding
+        more items after finalizing the index is allowed but it may make the
+        next search slower.
+        """
+        pass
+
+    def forget_previous_query(self):
+        """Discards the state that the index may keep about the previous
+        query to speed up the next query if it extends the previous one.
+        The next search is then as slow as a search on a fresh index.
+        """
+        pass
+
+    def search(self, query, limit=None):
         """Returns a list of matches given a search query.
 
         Args:
             query (str): the search query
+            limit (int or None): the maximum number of matches to return.
+                ``None`` means to return all the matches.
 
         Returns:
-            list of selecta.matches.Match: the list of matches
+            sequence of selecta.matches.Match: the best matches, sorted by
+                score; typically a selecta.matches.ResultSet. The ``num_hits``
+                attribute of the sequence contains the total number of
+                matches, including the ones that were not returned due to
+                the limit.
         """
         raise NotImplementedError
 
@@ -35,22 +64,71 @@ class IndexBase(Index):
             index and returns a suitable string representation that can be
             shown on the UI.
         match_factory (callable): a callable that creates subclasses of Match
-            objects
+            objects. When the factory creates LazyMatch_ instances, the string
+            representation and the highlighted substrings of the matches are
+            calculated only when they are needed.
+        query_cache (selecta.querycache.QueryCache or None): a cache of the
+            results of recent searches. Cached results are returned as they
+            are until items are added to the index. ``None`` means not to
+            cache the results.
+        stats_callback (callable or None): a callable that is called with a
+            ``selecta.stats.SearchStats`` object after every search. Search
+            statistics are collected only when a callback is set.
         tokenizer (callable): a callable that takes an item to be
             added to the index and returns a list of extracted tokens that are
             added to the index. ``None`` means to add the string representation
             of the item as is.
     """
 
-    def __init__(self, displayer=unicode, tokenizer=list_packer,
-                 match_factory=Match):
+    _SEPARATOR = "\x00"
+
+    def __init__(self, displayer=text_type, tokenizer=list_packer,
+                 match_factory=LazyMatch):
         self.displayer = displayer
         self.match_factory = match_factory
+        self.query_cache = None
+        self.stats_callback = None
         self.tokenizer = tokenizer
-        self._tokens_to_items = defaultdict(list)
+
+        # Items and tokens are identified by dense integer IDs that are
+        # assigned in the order of addition
+        self._items = []
+        self._tokens = []
+        self._token_ids = {}
+
+        # Maps the hashable items to their IDs so duplicates can be detected
+        # quickly when they are added; see _contains_item()
+        self._item_ids = {}
+
+        # The IDs of the items of each token are stored in compressed sparse
+        # row format: the item IDs of token i are in
+        # _posting_item_ids[_posting_offsets[i]:_posting_offsets[i+1]].
+        # Item IDs that cannot be appended to the end of this structure are
+        # kept in _overflow_postings until the index is finalized.
+        self._posting_offsets = array("I", [0])
+        self._posting_item_ids = array("I")
+        self._overflow_postings = {}
+        self._num_postings = 0
+
+        # Number of items that do not have exactly one token; see
+        # _has_one_item_per_token()
+        self._num_irregular_items = 0
+
+        # Indexes that scan all the tokens at once may join them into a
+        # single buffer, delimited by _SEPARATOR; token i starts at
+        # _buffer_offsets[i] in the buffer. See _ensure_buffer()
+        self._buffer = ""
+        self._buffer_offsets = array("L")
+
+        self._last_candidates = None
+
+        # Statistics of the search in progress if there is a stats callback
+        self._stats = None
 
     def add(self, item, tokenizer=None):
-        """Adds the given item to the index.
+        """Adds the given item to the index. Adding an item that is equal to
+        an item already in the index has no effect unless a custom
+        tokenizer is given.
 
         Args:
             item (object): the item to add
@@ -58,26 +136,407 @@ class IndexBase(Index):
                 called with the item to extract a list of tokens for the item.
                 ``None`` means to use the default tokenizer.
         """
-        tokenizer = tokenizer or self.tokenizer
-        for token in tokenizer(item):
-            self._add_token_for_item(token, item)
+        normalize = self._normalize_token
+        tokens = [normalize(token)
+                  for token in (tokenizer or self.tokenizer)(item)]
+        if tokenizer is None and tokens and \
+                self._contains_item(item, tokens[0]):
+            return
+
+        item_id = len(self._items)
+        self._items.append(item)
+        try:
+            self._item_ids.setdefault(item, item_id)
+        except TypeError:
+            # Unhashable item
+            pass
+        if len(tokens) != 1:
+            self._num_irregular_items += 1
+        for token in tokens:
+            self._add_token_for_item(token, item_id)
+
+    def finalize(self):
+        self._compact_postings()
+
+    def search(self, query, limit=None):
+        # The results can change only when a new posting is added
+        cache, version = self.query_cache, self._num_postings
+        if cache is not None:
+            result = cache.get(query, limit, version)
+            if result is not None:
+                if self.stats_callback is not None:
+                    stats = SearchStats(query, self.__class__.__name__)
+                    stats.cached = True
+                    stats.hits = result.num_hits
+                    self.stats_callback(stats)
+                return result
+
+        if self.stats_callback is None:
+            result = self._search(query, limit)
+        else:
+            result = self._search_with_stats(query, limit)
+
+        if cache is not None:
+            cache.put(query, limit, result, version)
+        return result
+
+    def _search(self, query, limit=None):
+        """Performs the search for ``search()``; see ``Index.search()``
+        for the description of the arguments and the return value."""
+        raise NotImplementedError
+
+    def _search_with_stats(self, query, limit=None):
+        """Performs the search for ``search()`` while collecting the
+        statistics of the search, and passes the statistics to the stats
+        callback of the index."""
+        stats = self._stats = SearchStats(query, self.__class__.__name__)
+        start = default_timer()
+        try:
+            result = self._search(query, limit)
+        finally:
+            self._stats = None
+        stats.total_time = default_timer() - start
+
+        # At this point, items_deduplicated is the number of items of all
+        # the scored tokens, counting an item once for each of its tokens
+        stats.hits = result.num_hits
+        stats.items_deduplicated = max(stats.items_deduplicated - stats.hits,
+                                       0)
+        stats.tokens_rejected = len(self._tokens) - stats.candidates_scored
+        self.stats_callback(stats)
+        return result
+
+    def _add_token_for_item(self, token, item_id):
+        """Registers a normalized token corresponding to the item with the
+        given ID in the search index."""
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            token_id = self._token_ids[token] = len(self._tokens)
+            self._tokens.append(token)
+            self._register_new_token(token, token_id)
+        self._add_posting(token_id, item_id)
+        self.forget_previous_query()
+
+    def _add_posting(self, token_id, item_id):
+        """Records that the token with the given ID belongs to the item with
+        the given ID. Item IDs must be added in non-decreasing order for each
+        token."""
+        offsets, item_ids = self._posting_offsets, self._posting_item_ids
+        last_token_id = len(offsets) - 2
+        if token_id > last_token_id:
+            # New token; its posting list goes to the end
+            item_ids.append(item_id)
+            offsets.append(len(item_ids))
+        else:
+            overflow = self._overflow_postings.get(token_id)
+            if overflow:
+                last_item_id = overflow[-1]
+            else:
+                last_item_id = item_ids[offsets[token_id + 1] - 1]
+            if last_item_id == item_id:
+                return
+
+            if token_id == last_token_id:
+                # The posting list of the last token can be extended in place
+                item_ids.append(item_id)
+                offsets[-1] += 1
+            else:
+                if overflow is None:
+                    overflow = self._overflow_postings[token_id] = array("I")
+                overflow.append(item_id)
+        self._num_postings += 1
+
+    def _compact_postings(self):
+        """Moves the item IDs from the overflow postings into the compressed
+        sparse row structure of the postings."""
+        overflow = self._overflow_postings
+        if not overflow:
+            return
+
+        offsets, item_ids = self._posting_offsets, self._posting_item_ids
+        new_offsets, new_item_ids = array("I", [0]), array("I")
+        start, shift = 0, 0
+        for token_id in sorted(overflow):
+            # Copy everything up to the end of the posting list of the token
+            # in bulk, then append the overflow of the token
+            end = token_id + 1
+            new_item_ids.extend(item_ids[offsets[start]:offsets[end]])
+            new_item_ids.extend(overflow[token_id])
+            new_offsets.extend(offset + shift
+                               for offset in offsets[start+1:end+1])
+            shift += len(overflow[token_id])
+            new_offsets[-1] += len(overflow[token_id])
+            start = end
+        new_item_ids.extend(item_ids[offsets[start]:])
+        new_offsets.extend(offset + shift for offset in offsets[start+1:])
+
+        self._posting_offsets, self._posting_item_ids = new_offsets, \
+            new_item_ids
+        self._overflow_postings = {}
+
+    def _contains_item(self, item, token):
+        """Returns whether the index already contains the given item, given
+        the first normalized token of the item."""
+        try:
+            return item in self._item_ids
+        except TypeError:
+            # Unhashable items are compared with the items that have the
+            # same first token
+            pass
+
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            return False
+        items = self._items
+        return any(items[item_id] == item
+                   for item_id in self._item_ids_of_token(token_id))
+
+    def _has_one_item_per_token(self):
+        """Returns whether each item of the index has exactly one token and
+        each token belongs to exactly one item. In this case, the ID of each
+        token is equal to the ID of its item."""
+        # When every item has exactly one token, there is one posting per
+        # item, so the totals tell whether the tokens are all distinct
+        return self._num_irregular_items == 0 and \
+            self._num_postings == len(self._tokens) == len(self._items)
+
+    def _item_ids_of_token(self, token_id):
+        """Returns the IDs of the items that the token with the given ID
+        belongs to, in increasing order."""
+        offsets = self._posting_offsets
+        start, end = offsets[token_id], offsets[token_id + 1]
+        overflow = self._overflow_postings.get(token_id)
+        if overflow is not None:
+            return self._posting_item_ids[start:end] + overflow
+        elif end - start == 1:
+            return (self._posting_item_ids[start], )
+        else:
+            return self._posting_item_ids[start:end]
+
+    def forget_previous_query(self):
+        """Discards the state that the index keeps about the previous query
+        to speed up the next query if it extends the previous one. The next
+        search will examine all the tokens of the index."""
+        self._last_candidates = None
+
+    def _normalize_token(self, token):
+        """Normalizes a token before it is added to the index. The default
+        implementation returns the token as is."""
+        return token
+
+    def _register_new_token(self, token, token_id):
+        """Registers a token that was not seen before in the auxiliary data
+        structures of the index. The default implementation does nothing."""
+        pass
+
+    def _ensure_buffer(self):
+        """Appends the tokens that were added since the last call to the
+        buffer of the index."""
+        offsets = self._buffer_offsets
+        new_tokens = self._tokens[len(offsets):]
+        if not new_tokens:
+            return
+
+        start = len(self._buffer)
+        for token in new_tokens:
+            offsets.append(start)
+            start += len(token) + 1
+
+        separator = self._SEPARATOR
+        self._buffer += separator.join(new_tokens) + separator
+
+    def _find_candidates(self, query):
+        """Returns the tokens that may match the given (already normalized)
+        query string, along with some per-token state that the index can
+        use to speed up the scoring of the token.
+
+        When the query extends the query of the previous call (i.e. the
+        previous query is a prefix of the current one), only the tokens that
+        matched the previous query are examined. This makes incremental
+        searching (where the user types the query character by character)
+        considerably faster on large indexes.
+
+        Args:
+            query (str): the normalized query string
+
+        Returns:
+            list of tuples: the IDs of the candidate tokens and their states
+        """
+        last_candidates = self._last_candidates
+        if last_candidates is not None and query.startswith(last_candidates[0]):
+            last_query, candidates = last_candidates
+            new_chars = query[len(last_query):]
+            if not new_chars:
+                return candidates
+            num_candidates = len(candidates)
+        else:
+            token_ids = self._prefilter(query)
+            candidates = ((token_id, None) for token_id in token_ids)
+            num_candidates = len(token_ids)
+            new_chars = query
+
+        if self._stats is not None:
+            self._stats.tokens_scanned += num_candidates
+
+        result = []
+        tokens, update = self._tokens, self._update_candidate_state
+        for token_id, state in candidates:
+            state = update(tokens[token_id], state, query, new_chars)
+            if state is not None:
+                result.append((token_id, state))
+
+        self._last_candidates = query, result
+        return result
+
+    def _prefilter(self, query):
+        """Returns the tokens that need to be examined for the given
+        (already normalized) query string when there is no previous
+        candidate set to narrow down. Subclasses may override this method to
+        reject tokens that cannot possibly match the query without looking
+        at their characters one by one.
+
+        Args:
+            query (str): the normalized query string
+
+        Returns:
+            iterable of int: the IDs of the tokens to examine, in increasing
+                order
+        """
+        return range(len(self._tokens))
+
+    def _update_candidate_state(self, token, state, query, new_chars):
+        """Updates the state of a candidate token when the query has been
+        extended with some new characters.
+
+        Args:
+            token (str): the candidate token
+            state (object): the state of the token that was returned for the
+                previous query, or ``None`` if the token has not been examined
+                yet
+            query (str): the full, normalized query string
+            new_chars (str): the characters that were appended to the previous
+                query to obtain the current one. Equal to ``query`` if the
+                token has not been examined yet.
+
+        Returns:
+            object: the new state of the token, or ``None`` if the token cannot
+                match the query
+        """
+        raise NotImplementedError
+
+    def _record_candidates(self, token_ids):
+        """Records the tokens with the given IDs in the statistics of the
+        search in progress as candidates that are about to be scored. Must
+        be called only when statistics are being collected.
+
+        Args:
+            token_ids (sequence of int): the IDs of the candidate tokens
+        """
+        stats = self._stats
+        stats.candidates_scored += len(token_ids)
+        if self._has_one_item_per_token():
+            stats.items_deduplicated += len(token_ids)
+        else:
+            item_ids_of_token = self._item_ids_of_token
+            stats.items_deduplicated += sum(
+                len(item_ids_of_token(token_id)) for token_id in token_ids
+            )
+
+    def _timed(self, timer, func, *args, **kwds):
+        """Calls the given function with the given arguments and adds the
+        time it took to the given timer of the statistics of the search in
+        progress, if there is one.
+
+        Args:
+            timer (str): the name of the timer in ``SearchStats``
+            func (callable): the function to call; the remaining
+                positional and keyword arguments are passed to it
+
+        Returns:
+            object: the return value of the function
+        """
+        stats = self._stats
+        if stats is None:
+            return func(*args, **kwds)
+        start = default_timer()
+        result = func(*args, **kwds)
+        setattr(stats, timer, getattr(stats, timer) + default_timer() - start)
+        return result
+
+    def _select_best(self, items_and_scores, limit=None):
+        """Selects the best items from a dictionary mapping item IDs to their
+        scores.
+
+        Args:
+            items_and_scores (dict): dictionary mapping item IDs to their
+                scores; lower scores are better
+            limit (int or None): the maximum number of items to return.
+                ``None`` means to return all the items.
+
+        Returns:
+            list of tuples: the best item ID-score pairs, sorted by
+                _ranking_key_. Ties are broken by item ID, so the order does
+                not depend on the iteration order of the dictionary. When a
+                limit is given, only the best items are kept in a bounded
+                heap instead of sorting all the items.
+        """
+        key = self._ranking_key
+        if limit is None or limit >= len(items_and_scores):
+            return sorted(items_and_scores.items(), key=key)
+        else:
+            return nsmallest(limit, items_and_scores.items(), key=key)
+
+    def _ranking_key(self, item_id_and_score):
+        """Returns the key that orders an item ID-score pair among the
+        results of a search: the items are ordered by score and then by ID.
+        Scores that contain the matched range as well (as in FuzzyIndex_)
+        order the ties by the matched range before the ID."""
+        item_id, score = item_id_and_score
+        return score, item_id
+
+    def _create_result_set(self, item_ids, scores, spans=None, num_hits=None,
+                           highlighter=None):
+        """Creates a result set from the items with the given IDs and their
+        scores that constructs the matches of the items with
+        _construct_match_for_item_ when they are accessed.
 
-    def _add_token_for_item(self, token, item):
-        """Registers a token corresponding to the given item in the search
-        index."""
-        self._tokens_to_items[token].append(item)
+        See ``selecta.matches.ResultSet`` for the description of the
+        other arguments.
 
-    def _construct_match_for_item(self, item, score=0.0):
+        Args:
+            item_ids (iterable of int): the IDs of the items
+            highlighter (callable or None): the highlighter to pass to
+                _construct_match_for_item_
+
+        Returns:
+            selecta.matches.ResultSet: the result set
+        """
+        def match_factory(item, score):
+            return self._construct_match_for_item(item, score, highlighter)
+        items = self._items
+        return ResultSet([items[item_id] for item_id in item_ids], scores,
+                         spans, num_hits, match_factory)
+
+    def _construct_match_for_item(self, item, score=0.0, highlighter=None):
         """Constructs a match that corresponds to the given item.
 
         Args:
             item (object): the item to construct the match for
             score (float): the score of the item, if known
+            highlighter (callable or None): a callable that takes the string
+                representation of the item and returns the list of substrings
+                to highlight in it. ``None`` means not to highlight anything.
         """
         result = self.match_factory()
         result.matched_object = item
-        result.matched_string = self.displayer(item)
         result.score = score
+        if isinstance(result, LazyMatch):
+            result.displayer = self.displayer
+            result.highlighter = highlighter
+        else:
+            result.matched_string = self.displayer(item)
+            if highlighter is not None:
+                result.substrings = highlighter(result.matched_string)
         return result
 
 
@@ -85,79 +544,368 @@ class SubstringIndex(IndexBase):
     """Index that finds all objects in the index that are associated to at
     least one token that contains the query string as a substring. Matches are
     scored based on the index of the first character of the match; lower scores
-    are better."""
+    are better.
+
+    The index maintains a trigram index that maps each three-character
+    substring of the tokens to the IDs of the tokens containing it. Queries
+    with at least three characters examine only those tokens that contain
+    all the trigrams of the query.
+    """
 
     def __init__(self, case_sensitive=True):
         super(SubstringIndex, self).__init__()
         self._case_sensitive = bool(case_sensitive)
+        self._trigrams_to_token_ids = {}
 
-    def _add_token_for_item(self, token, item):
-        if not self._case_sensitive:
-            token = token.lower()
-        super(SubstringIndex, self)._add_token_for_item(token, item)
+    def _normalize_token(self, token):
+        return token if self._case_sensitive else token.lower()
+
+    def _register_new_token(self, token, token_id):
+        """Registers a token that was not seen before in the auxiliary data
+        structures of the index. This implementation adds the trigrams of
+        the token to the trigram index."""
+        postings = self._trigrams_to_token_ids
+        for trigram in set(token[i:i+3] for i in range(len(token) - 2)):
+            token_ids = postings.get(trigram)
+            if token_ids is None:
+                token_ids = postings[trigram] = array("I")
+            token_ids.append(token_id)
+
+    def _prefilter(self, query):
+        if len(query) < 3:
+            return range(len(self._tokens))
 
-    def search(self, query):
+        # Fetch the posting lists of the trigrams in the query, rarest first
+        postings = self._trigrams_to_token_ids
+        token_id_lists = []
+        for trigram in set(query[i:i+3] for i in range(len(query) - 2)):
+            token_ids = postings.get(trigram)
+            if token_ids is None:
+                return []
+            token_id_lists.append(token_ids)
+        token_id_lists.sort(key=len)
+
+        # Intersect the posting lists. Posting lists are sorted because token
+        # IDs are assigned in increasing order, so we can use binary search
+        # to test whether a candidate appears in the next list
+        candidates = token_id_lists[0]
+        for token_ids in token_id_lists[1:]:
+            num_token_ids = len(token_ids)
+            candidates = [
+                token_id for token_id in candidates
+                if _contains_sorted(token_ids, token_id, num_token_ids)
+            ]
+            if not candidates:
+                return []
+
+        return candidates
+
+    def _search(self, query, limit=None):
         if not self._case_sensitive:
             query = query.lower()
 
-        items_and_scores = self._score_items(query)
-        return self._create_matches_from(query, items_and_scores)
+        items_and_scores = self._timed("scoring_time", self._score_items,
+                                       query)
+        return self._create_matches_from(query, items_and_scores, limit)
 
-    def _create_matches_from(self, query, items_and_scores):
-        """Given a query string and a dictionary mapping matched items to their
-        scores, returns an appropriate list of highlighted matches, sorted by
-        score."""
+    def _create_matches_from(self, query, items_and_scores, limit=None):
+        """Given a query string and a dictionary mapping the IDs of matched
+        items to their scores, returns an appropriate list of highlighted
+        matches, sorted by score. At most ``limit`` matches are returned if
+        the limit is not ``None``."""
         query_length = len(query)
-        result = []
-        for item, score in sorted(items_and_scores.items(), key=itemgetter(1)):
-            match = self._construct_match_for_item(item, -score)
-            matched_string = match.matched_string
+
+        def highlighter(matched_string):
             if not self._case_sensitive:
                 matched_string = matched_string.lower()
-            match.substrings = [
+            return [
                 (index, index + query_length)
                 for index in each_index_of_string(query, matched_string)
             ]
-            result.append(match)
-        return result
+
+        best = self._timed("sorting_time", self._select_best,
+                           items_and_scores, limit)
+        return self._timed(
+            "match_time", self._create_result_set,
+            [item_id for item_id, _ in best],
+            array("l", [-score for _, score in best]),
+            num_hits=len(items_and_scores), highlighter=highlighter
+        )
 
     def _score_items(self, query):
-        """Given a query, returns a dictionary that contains all the items
-        where at least one token of the item matches the query, along with
-        the scores of the matches.
+        """Given a query, returns a dictionary that contains the IDs of all
+        the items where at least one token of the item matches the query,
+        along with the scores of the matches.
+        """
+        return self._scores_of_items_from(self._find_candidates(query))
+
+    def _scores_of_items_from(self, tokens_and_indices):
+        """Given an iterable of pairs containing token IDs and the index of
+        the first occurrence of the query in the corresponding token, returns
+        a dictionary that maps the IDs of the items associated to these
+        tokens to their scores.
         """
-        result = defaultdict(int)
-        for token, items in self._tokens_to_items.iteritems():
-            index = token.find(query)
-            if index >= 0:
-                for item in items:
-                    result[item] = min(result[item], -index)
+        if self._stats is not None:
+            tokens_and_indices = list(tokens_and_indices)
+            self._record_candidates([token_id
+                                     for token_id, _ in tokens_and_indices])
+
+        if self._has_one_item_per_token():
+            # Token IDs are the same as item IDs
+            return dict(
+                (token_id, -index) for token_id, index in tokens_and_indices
+            )
+
+        result = {}
+        item_ids_of_token = self._item_ids_of_token
+        for token_id, index in tokens_and_indices:
+            for item_id in item_ids_of_token(token_id):
+                result[item_id] = min(result.get(item_id, 0), -index)
         return result
 
+    def _update_candidate_state(self, token, state, query, new_chars):
+        # The state of a token is the index of the first occurrence of the
+        # query in the token. When the query is extended, the first
+        # occurrence of the new query cannot be before the old one.
+        index = token.find(query, state or 0)
+        return index if index >= 0 else None
+
+
+class BufferedSubstringIndex(SubstringIndex):
+    """Index that finds the same objects with the same scores as
+    SubstringIndex_, but stores all the tokens joined into a single
+    separator-delimited buffer along with the offsets where the tokens
+    start in the buffer.
+
+    A query is answered by scanning the buffer with repeated ``find()``
+    calls; each hit is mapped back to its token by binary search on the
+    offsets, and the scan continues from the start of the next token so
+    only the first occurrence of the query in each token is visited. No
+    trigram index is kept, which makes this index considerably smaller
+    than SubstringIndex_ when there are many tokens.
+
+    The buffer is extended lazily with the tokens that were added since the
+    last search.
+    """
+
+    def __init__(self, case_sensitive=True):
+        super(BufferedSubstringIndex, self).__init__(case_sensitive)
+        self._has_separator = False
+
+    def _register_new_token(self, token, token_id):
+        if self._SEPARATOR in token:
+            # The buffer cannot be used if a token contains the separator;
+            # we fall back to scanning all the tokens then
+            self._has_separator = True
+
+    def _prefilter(self, query):
+        return range(len(self._tokens))
+
+    def _score_items(self, query):
+        if self._has_separator:
+            return super(BufferedSubstringIndex, self)._score_items(query)
+        if not query:
+            # The empty query matches every token at index zero
+            return self._scores_of_items_from(
+                (token_id, 0) for token_id in range(len(self._tokens))
+            )
+
+        self._ensure_buffer()
+        find, offsets = self._buffer.find, self._buffer_offsets
+        num_tokens = len(offsets)
+        if self._stats is not None:
+            self._stats.tokens_scanned += num_tokens
+
+        first_occurrences = []
+        token_id, position = 0, find(query)
+        while position >= 0:
+            token_id = bisect_right(offsets, position, token_id) - 1
+            first_occurrences.append(
+                (token_id, position - offsets[token_id])
+            )
+            token_id += 1
+            if token_id == num_tokens:
+                break
+            position = find(query, offsets[token_id])
+
+        return self._scores_of_items_from(first_occurrences)
+
+
+class SuffixArrayIndex(BufferedSubstringIndex):
+    """Index that finds the same objects with the same scores as
+    SubstringIndex_, but uses a suffix array built over the buffer of
+    BufferedSubstringIndex_ instead of scanning the buffer.
+
+    The suffix array is built when the index is finalized. Items added
+    after that are merged into the suffix array when the index is searched
+    for the next time: only the suffixes of the new tokens are sorted, and
+    each of them is inserted into the existing array with a binary search.
+    A query is answered by finding the range of suffixes that start with
+    the query using two binary searches. This takes O(|q| log N + H) time
+    where N is the total length of the tokens and H is the number of
+    occurrences of the query. No LCP array is kept; the two binary searches
+    delimit the range of hits on their own.
+    """
+
+    def __init__(self, case_sensitive=True):
+        super(SuffixArrayIndex, self).__init__(case_sensitive)
+        self._suffix_array = None
+        self._num_indexed_chars = 0
+
+    def finalize(self):
+        super(SuffixArrayIndex, self).finalize()
+        if not self._has_separator:
+            self._build()
+
+    def _build(self):
+        """Builds the suffix array of the index, or merges the suffixes of
+        the tokens that were added since the last call into it."""
+        self._ensure_buffer()
+        text = self._buffer
+        start = self._num_indexed_chars
+        if start == len(text):
+            return
+
+        typecode = "I" if len(text) < 2 ** 32 else "L"
+        new_suffixes = _build_suffix_array(text[start:], self._SEPARATOR)
+        suffix_array = self._suffix_array
+        if suffix_array is None:
+            self._suffix_array = array(typecode, new_suffixes)
+        else:
+            if suffix_array.typecode != typecode:
+                suffix_array = array(typecode, suffix_array)
+            self._suffix_array = _merge_suffix_array(
+                text, self._SEPARATOR, suffix_array,
+                [start + position for position in new_suffixes]
+            )
+        self._num_indexed_chars = len(text)
+
+    def _find_occurrences(self, query):
+        """Returns the starting positions of all the occurrences of the given
+        query in the concatenated text of the index, in no particular
+        order."""
+        if self._SEPARATOR in query:
+            return []
+
+        text, suffix_array = self._buffer, self._suffix_array
+        length, num_suffixes = len(query), len(suffix_array)
+
+        # Find the range of suffixes that start with the query
+        low, high = 0, num_suffixes
+        while low < high:
+            middle = (low + high) // 2
+            position = suffix_array[middle]
+            if text[position:position+length] < query:
+                low = middle + 1
+            else:
+                high = middle
+
+        start, high = low, num_suffixes
+        while low < high:
+            middle = (low + high) // 2
+            position = suffix_array[middle]
+            if text[position:position+length] == query:
+                low = middle + 1
+            else:
+                high = middle
+
+        return suffix_array[start:low]
+
+    def _score_items(self, query):
+        if self._has_separator or not query:
+            return super(SuffixArrayIndex, self)._score_items(query)
+        self._build()
+
+        # Find the first occurrence of the query in each token
+        offsets = self._buffer_offsets
+        first_occurrences = {}
+        for position in self._find_occurrences(query):
+            token_id = bisect_right(offsets, position) - 1
+            index = position - offsets[token_id]
+            if first_occurrences.get(token_id, index) >= index:
+                first_occurrences[token_id] = index
+
+        return self._scores_of_items_from(
+            (token_id, first_occurrences[token_id])
+            for token_id in sorted(first_occurrences)
+        )
+
 
 class FuzzyIndex(IndexBase):
     """TODO: document"""
 
     def __init__(self):
         super(FuzzyIndex, self).__init__()
-        self._tokens_to_items = defaultdict(list)
+        self._token_signatures = array(SIGNATURE_TYPECODE)
+        self._token_lengths = array("I")
 
-    def _add_token_for_item(self, token, item):
-        super(FuzzyIndex, self)._add_token_for_item(token.lower(), item)
+    def _normalize_token(self, token):
+        return token.lower()
 
-    def _create_matches_from(self, prepared_query, items_and_scores):
-        """Given a prepared query string and a dictionary mapping matched items
-        to their scores and the matched ranges, returns an appropriate list of
-        highlighted matches, sorted by score."""
-        result = []
-        for item, score in sorted(items_and_scores.items(), key=itemgetter(1)):
-            match = self._construct_match_for_item(item, score)
-            matched_string = match.matched_string.lower()
-            _, matched_range = self._score_token(matched_string, prepared_query)
-            if matched_range is not None:
-                match.substrings = [matched_range]
-            result.append(match)
-        return result
+    def _ensure_signatures(self):
+        """Calculates the character signatures and the lengths of the tokens
+        whose signatures are not known yet. The signature of a token is a bit
+        mask that contains a bit for every character in the token; see
+        ``selecta.utils.signature_of()``.
+
+        Signatures are calculated in bulk when they are first needed by a
+        search instead of one by one when the tokens are added, so they do
+        not slow down building the index."""
+        num_signatures = len(self._token_signatures)
+        if num_signatures < len(self._tokens):
+            new_tokens = self._tokens[num_signatures:]
+            self._token_signatures.extend(
+                signature_of(token) for token in new_tokens
+            )
+            self._token_lengths.extend(len(token) for token in new_tokens)
+
+    def _prefilter(self, query):
+        # A token cannot match the query if it is shorter than the query or
+        # if its signature lacks any of the bits from the signature of the
+        # query
+        self._ensure_signatures()
+        mask, length = signature_of(query), len(query)
+        return [
+            token_id for token_id, (signature, token_length) in enumerate(
+                zip(self._token_signatures, self._token_lengths)
+            )
+            if signature & mask == mask and token_length >= length
+        ]
+
+    def _create_matches_from(self, prepared_query, items_and_scores,
+                             limit=None):
+        """Given a prepared query string and a dictionary mapping the IDs of
+        matched items to their scores and the matched ranges, returns an
+        appropriate list of highlighted matches, sorted by score. At most
+        ``limit`` matches are returned if the limit is not ``None``."""
+        best = self._timed("sorting_time", self._select_best,
+                           items_and_scores, limit)
+        return self._timed("match_time", self._create_result_set_from,
+                           prepared_query, best, len(items_and_scores))
+
+    def _create_result_set_from(self, prepared_query, best, num_hits):
+        """Creates a result set from the best item ID-score pairs returned
+        by ``_select_best()`` for the given prepared query."""
+        scores, starts, ends = array("l"), array("l"), array("l")
+        for _, (score, (start, end)) in best:
+            scores.append(score)
+            starts.append(start)
+            ends.append(end)
+        return self._create_result_set(
+            [item_id for item_id, _ in best], scores, (starts, ends),
+            num_hits=num_hits,
+            highlighter=self._create_highlighter(prepared_query)
+        )
+
+    def _create_highlighter(self, prepared_query):
+        """Creates a highlighter function for the given prepared query that
+        can be used to find the substrings to highlight in the string
+        representation of a matched item."""
+        def highlighter(matched_string):
+            _, matched_range = self._score_token(matched_string.lower(),
+                                                 prepared_query)
+            return [matched_range] if matched_range is not None else []
+        return highlighter
 
     def _find_end_of_match(self, rest, token, start):
         """Finds the end of a potential match in the given token.
@@ -220,19 +968,154 @@ class FuzzyIndex(IndexBase):
             return None, []
 
     def _score_items(self, prepared_query):
-        """Given a prepared query, returns a dictionary that contains all the
-        items where at least one token of the item matches the query, along
-        with the scores of the matches and the corresponding matched ranges.
+        """Given a prepared query, returns a dictionary that contains the IDs
+        of all the items where at least one token of the item matches the
+        query, along with the scores of the matches and the corresponding
+        matched ranges.
+        """
+        first_char, rest = prepared_query
+        if not first_char:
+            return {}
+
+        query = first_char + "".join(rest)
+        candidates = self._find_candidates(query)
+        return self._scores_of_items_from(
+            (token_id for token_id, _ in candidates), prepared_query
+        )
+
+    def _scores_of_items_from(self, token_ids, prepared_query):
+        """Given an iterable of token IDs that may match the given prepared
+        query, scores the tokens and returns a dictionary that maps the IDs of
+        the items associated to the matching tokens to their scores and the
+        corresponding matched ranges.
         """
+        if self._stats is not None:
+            token_ids = list(token_ids)
+            self._record_candidates(token_ids)
+
         result = {}
-        for token, items in self._tokens_to_items.iteritems():
-            score, matched_range = self._score_token(token, prepared_query)
+        tokens, score_token = self._tokens, self._score_token
+        if self._has_one_item_per_token():
+            # Token IDs are the same as item IDs
+            for token_id in token_ids:
+                score, matched_range = score_token(tokens[token_id],
+                                                   prepared_query)
+                if matched_range is not None:
+                    result[token_id] = score, matched_range
+            return result
+
+        item_ids_of_token = self._item_ids_of_token
+        for token_id in token_ids:
+            score, matched_range = score_token(tokens[token_id],
+                                               prepared_query)
             if matched_range is not None:
-                for item in items:
-                    if item not in result or result[item][0] < score:
-                        result[item] = score, matched_range
+                for item_id in item_ids_of_token(token_id):
+                    if item_id not in result or result[item_id][0] < score:
+                        result[item_id] = score, matched_range
         return result
 
+    def _update_candidate_state(self, token, state, query, new_chars):
+        # The state of a token is the index of the last character of the
+        # leftmost occurrence of the query as a subsequence of the token.
+        # A token matches the extended query if and only if the new characters
+        # can be found as a subsequence after this index.
+        index = -1 if state is None else state
+        for char in new_chars:
+            index = token.find(char, index+1)
+            if index < 0:
+                return None
+        return index
+
+    def _find_best_match(self, token, first_char, rest, known_match):
+        """Finds the best match of a query in the given token using dynamic
+        programming over the occurrences of the query characters in the
+        token. This takes O(len(token) * len(query)) time in the worst case.
+
+        The score of a match is calculated in the same way as in
+        ``_find_end_of_match()``, but all the possible alignments of the
+        query are considered, not only the greedy ones. Ties are broken in
+        favour of the match that starts earlier and then in favour of the
+        one that ends earlier.
+
+        Args:
+            token (str): the token being matched
+            first_char (str): the first character of the query string
+            rest (list of str): the remaining characters of the query string
+            known_match (tuple): the score and the start index of a known
+                match of the query in the token. Partial matches that cannot
+                be better than this match are discarded early.
+
+        Returns:
+            tuple: the score of the best match and the matched range
+        """
+        # Partial matches are represented by integer keys of the form
+        # score * width + start so the best one is simply the smallest key.
+        # For every position where the last matched character of the query
+        # may be, we keep the best key of the partial matches whose last
+        # match is sequential, the same for boundary matches, and the best
+        # key overall. The best key is all we need to know about the other
+        # types of matches as they do not affect the score of the next match.
+        width = len(token) + 1
+        max_key = known_match[0] * width + known_match[1]
+        infinity = float("inf")
+        find = token.find
+
+        positions, states = [], []
+        position = find(first_char)
+        while 0 <= position <= max_key - width:
+            positions.append(position)
+            states.append((infinity, infinity, width + position))
+            position = find(first_char, position + 1)
+
+        for char in rest:
+            num_positions = len(positions)
+            new_positions, new_states = [], []
+            index, best_boundary, best_other = 0, infinity, infinity
+
+            end = find(char, positions[0] + 1)
+            while end >= 0:
+                # Find the best partial matches that end at least two
+                # characters before the new character; these are the ones
+                # that can be extended with a boundary or a normal match
+                while index < num_positions and positions[index] < end - 1:
+                    sequential, boundary, best = states[index]
+                    key = min(boundary, best + width)
+                    if key < best_boundary:
+                        best_boundary = key
+                    key = best - positions[index] * width
+                    if key < best_other:
+                        best_other = key
+                    index += 1
+
+                if index < num_positions and positions[index] == end - 1:
+                    sequential, boundary, best = states[index]
+                    sequential = min(sequential, best + width)
+                else:
+                    sequential = infinity
+
+                if token[end-1].isalnum():
+                    boundary, best = infinity, best_other + end * width
+                else:
+                    boundary = best = best_boundary
+                if sequential < best:
+                    best = sequential
+
+                if best <= max_key:
+                    new_positions.append(end)
+                    new_states.append((sequential, boundary, best))
+
+                end = find(char, end + 1)
+
+            positions, states = new_positions, new_states
+
+        best_key, best_end = infinity, None
+        for position, (_, _, key) in zip(positions, states):
+            if key < best_key:
+                best_key, best_end = key, position
+
+        score, start = divmod(best_key, width)
+        return score, (start, best_end + 1)
+
     def _score_token(self, token, prepared_query):
         """Returns the score assigned to the given token for the given
         prepared query string.
@@ -247,22 +1130,29 @@ class FuzzyIndex(IndexBase):
                 range, or ``(None, None)`` if the token does not match the
                 query
         """
-        best_score, best_match = None, None
-
         first_char, rest = prepared_query
-        if first_char:
-            for match_start in each_index_of_string(first_char, token):
-                score, match_end = self._find_end_of_match(rest, token, match_start)
-                if match_end and (best_score is None or score < best_score):
-                    best_score = score
-                    best_match = match_start, match_end
+        start = token.find(first_char) if first_char else -1
+        if start < 0:
+            return None, None
+
+        # Try the greedy match from the first occurrence of the first
+        # character. If it fails, the token does not match the query at all.
+        # If it reaches the lowest possible score, no other match can be
+        # better so we can skip the dynamic programming
+        score, end = self._find_end_of_match(rest, token, start)
+        if end is None:
+            return None, None
+        if score <= 2:
+            return score, (start, end)
 
-        return best_score, best_match
+        return self._find_best_match(token, first_char, rest, (score, start))
 
-    def search(self, query):
+    def _search(self, query, limit=None):
         prepared_query = self._prepare_query(query)
-        items_and_scores = self._score_items(prepared_query)
-        return self._create_matches_from(prepared_query, items_and_scores)
+        items_and_scores = self._timed("scoring_time", self._score_items,
+                                       prepared_query)
+        return self._create_matches_from(prepared_query, items_and_scores,
+                                         limit)
 
     def score_token(self, token, query):
         """Returns the score assigned to the given token for the given query
@@ -278,3 +1168,375 @@ class FuzzyIndex(IndexBase):
                 query
         """
         return self._score_token(token, self._prepare_query(query))
+
+
+class RegexFuzzyIndex(FuzzyIndex):
+    """Index that finds the same objects with the same scores as
+    FuzzyIndex_, but decides which tokens match the query by running a
+    single regular expression over a newline-delimited buffer of all the
+    tokens instead of examining the tokens one by one in Python.
+
+    The query ``abc`` is compiled into ``^[^\\na]*a[^\\nb]*b[^\\nc]*c``
+    in multi-line mode; the expression cannot cross the boundary of a
+    token, and each gap stops at the first occurrence of the next character
+    of the query. The expression is anchored at the start of the token
+    because the query is a subsequence of the token if and only if the
+    greedy match from the first occurrence of its first character succeeds.
+    Without the anchor, a token with many copies of the first character
+    and no match would be rescanned from each copy, which takes quadratic
+    time. After a hit, the search continues from the start of the next
+    token. Only the tokens that were hit are scored by the scorer of
+    FuzzyIndex_.
+    """
+
+    _SEPARATOR = "\n"
+
+    def __init__(self):
+        super(RegexFuzzyIndex, self).__init__()
+        self._has_separator = False
+
+    def _register_new_token(self, token, token_id):
+        if self._SEPARATOR in token:
+            # The expression could match across the separator within the
+            # token, so we fall back to examining the tokens one by one
+            self._has_separator = True
+
+    def _score_items(self, prepared_query):
+        first_char, rest = prepared_query
+        if self._has_separator or not first_char:
+            return super(RegexFuzzyIndex, self)._score_items(prepared_query)
+        if self._SEPARATOR == first_char or self._SEPARATOR in rest:
+            # No token contains the separator so nothing can match
+            return {}
+
+        self._ensure_buffer()
+        search = self._compile_query(prepared_query).search
+        offsets = self._buffer_offsets
+        num_tokens = len(offsets)
+        if self._stats is not None:
+            self._stats.tokens_scanned += num_tokens
+
+        token_ids = []
+        token_id, match = 0, search(self._buffer)
+        while match:
+            token_id = bisect_right(offsets, match.start(), token_id) - 1
+            token_ids.append(token_id)
+            token_id += 1
+            if token_id == num_tokens:
+                break
+            match = search(self._buffer, offsets[token_id])
+
+        return self._scores_of_items_from(token_ids, prepared_query)
+
+    def _compile_query(self, prepared_query):
+        """Compiles the given prepared query into a regular expression that
+        matches from the start of every token that contains the query as a
+        subsequence, up to the end of the leftmost greedy match."""
+        first_char, rest = prepared_query
+        escaped_separator = re.escape(self._SEPARATOR)
+        parts = ["^"]
+        for char in [first_char] + rest:
+            escaped_char = re.escape(char)
+            parts.append("[^" + escaped_separator + escaped_char + "]*")
+            parts.append(escaped_char)
+        return re.compile("".join(parts), re.MULTILINE)
+
+
+class PathTrieFuzzyIndex(FuzzyIndex):
+    """Index that finds the same objects with the same scores as
+    FuzzyIndex_, but stores the tokens in a trie of path components so the
+    directories that are shared by many paths are examined only once per
+    query.
+
+    A token matches the query if and only if the query can be found in it
+    greedily as a subsequence. The greedy match is calculated for each node
+    of the trie, continuing from the state of the parent node. When the
+    match is completed within a node, all the tokens in the subtree of the
+    node match the query without looking at their remaining characters.
+    Subtrees whose character signatures lack some of the remaining
+    characters of the query, or whose paths are too short to contain them,
+    are pruned. When the query is extended, the search continues from the
+    nodes where the previous query was completed. Only the matching tokens
+    are scored by the scorer of FuzzyIndex_.
+
+    The path components examined during a search are counted as scanned
+    tokens in the search statistics.
+
+    The trie pays off only when many paths share long directory prefixes,
+    and it makes building the index considerably slower than building a
+    FuzzyIndex_. On a listing of 300k real file paths, building took about
+    seven times as long while searching was only about 10% faster overall;
+    selective queries were up to twice as fast and some broad ones were
+    slower. On paths with little sharing, such as the synthetic paths of
+    ``selecta.bench``, searching is slower than with FuzzyIndex_.
+    """
+
+    #: The separator between the components of the paths in the tokens
+    path_separator = "/"
+
+    def __init__(self):
+        super(PathTrieFuzzyIndex, self).__init__()
+        self._root = _PathTrieNode("")
+
+        # The previous query and the nodes where it was completed, along
+        # with the index of the last matched character in their components
+        self._last_completed = None
+
+    def _find_matching_tokens(self, query):
+        """Returns the IDs of the tokens that match the given (already
+        normalized) query string, in increasing order."""
+        last_completed = self._last_completed
+        if last_completed is not None and \
+                query.startswith(last_completed[0]):
+            last_query, completed = last_completed
+            stack = [(node, len(last_query), index)
+                     for node, index in completed]
+        else:
+            stack = [(self._root, 0, -1)]
+
+        # Signatures of the remaining parts of the query, indexed by the
+        # number of characters of the query that were matched already
+        length = len(query)
+        masks = [signature_of(query[start:]) for start in range(length)]
+
+        completed, num_nodes = [], 0
+        while stack:
+            node, matched, index = stack.pop()
+            num_nodes += 1
+            find = node.component.find
+            while matched < length:
+                index = find(query[matched], index + 1)
+                if index < 0:
+                    break
+                matched += 1
+
+            if matched == length:
+                completed.append((node, index))
+                continue
+
+            mask, needed = masks[matched], length - matched
+            for child in node.children.values():
+                if child.signature & mask == mask and \
+                        child.max_length >= needed:
+                    stack.append((child, matched, -1))
+
+        self._last_completed = query, completed
+        if self._stats is not None:
+            self._stats.tokens_scanned += num_nodes
+
+        # The subtrees of the completed nodes are disjoint. The tokens are
+        # reported in increasing order of their IDs like in FuzzyIndex_ so
+        # ties are broken in the same way.
+        if len(completed) == 1:
+            return completed[0][0].token_ids
+        token_ids = array("I")
+        for node, _ in completed:
+            token_ids.extend(node.token_ids)
+        return sorted(token_ids)
+
+    def forget_previous_query(self):
+        super(PathTrieFuzzyIndex, self).forget_previous_query()
+        self._last_completed = None
+
+    def _register_new_token(self, token, token_id):
+        path, node = [], self._root
+        for component in self._split_path(token):
+            child = node.children.get(component)
+            if child is None:
+                child = node.children[component] = _PathTrieNode(component)
+            child.token_ids.append(token_id)
+            path.append(child)
+            node = child
+
+        # The signature and the maximum suffix length of a node are
+        # determined by its component and the same values of its children,
+        # so they are updated from the bottom up, stopping at the first node
+        # that does not change.
+        signature, length = 0, 0
+        for node in reversed(path):
+            signature |= signature_of(node.component)
+            length += len(node.component)
+            if node.signature | signature == node.signature and \
+                    node.max_length >= length:
+                break
+            node.signature |= signature
+            if node.max_length < length:
+                node.max_length = length
+            signature, length = node.signature, node.max_length
+
+    def _score_items(self, prepared_query):
+        first_char, rest = prepared_query
+        if not first_char:
+            return {}
+
+        query = first_char + "".join(rest)
+        return self._scores_of_items_from(self._find_matching_tokens(query),
+                                          prepared_query)
+
+    def _split_path(self, token):
+        """Splits the given token into path components such that each
+        component except the last one ends with the path separator and the
+        components add up to the token."""
+        separator = self.path_separator
+        parts = token.split(separator)
+        components = [part + separator for part in parts[:-1]]
+        if parts[-1]:
+            components.append(parts[-1])
+        return components
+
+
+class _PathTrieNode(object):
+    """Node in the trie of a PathTrieFuzzyIndex_.
+
+    Attributes:
+        component (str): the path component that leads to the node from its
+            parent
+        children (dict): the children of the node, keyed by their components
+        token_ids (array): the IDs of the tokens in the subtree of the node,
+            in increasing order
+        signature (int): the union of the character signatures of the
+            suffixes of the tokens in the subtree of the node, starting at
+            the component of the node
+        max_length (int): the length of the longest such suffix
+    """
+
+    __slots__ = ("component", "children", "token_ids", "signature",
+                 "max_length")
+
+    def __init__(self, component):
+        self.component = component
+        self.children = {}
+        self.token_ids = array("I")
+        self.signature = 0
+        self.max_length = 0
+
+
+FUZZY_INDEX_ENGINES = ("auto", "numpy", "python", "regex", "trie")
+
+
+def create_fuzzy_index(engine="auto"):
+    """Creates a fuzzy index that uses the given matching engine.
+
+    Args:
+        engine (str): the name of the matching engine. ``python`` creates a
+            FuzzyIndex_ that scores tokens one by one in pure Python.
+            ``numpy`` creates a ``selecta.vectorized.NumPyFuzzyIndex`` that
+            scores all the tokens at once using NumPy. ``regex`` creates a
+            RegexFuzzyIndex_ that finds the matching tokens with a single
+            regular expression. ``trie`` creates a PathTrieFuzzyIndex_
+            that shares the work on the common directories of file paths;
+            it is slower to build and helps only when the paths share long
+            directory prefixes.
+            ``auto`` currently chooses ``python``.
+
+    Returns:
+        FuzzyIndex: the newly created index
+
+    Raises:
+        NotSupportedError: if the requested engine is not available
+        ValueError: if the name of the engine is not known
+    """
+    if engine not in FUZZY_INDEX_ENGINES:
+        raise ValueError("unknown engine: {0!r}".format(engine))
+
+    if engine == "numpy":
+        try:
+            from selecta.vectorized import NumPyFuzzyIndex
+        except ImportError:
+            raise NotSupportedError("the numpy engine requires NumPy")
+        return NumPyFuzzyIndex()
+
+    if engine == "regex":
+        return RegexFuzzyIndex()
+    if engine == "trie":
+        return PathTrieFuzzyIndex()
+
+    return FuzzyIndex()
+
+
+def _contains_sorted(items, item, length):
+    """Returns whether the given sorted sequence of the given length contains
+    the given item, using binary search."""
+    index = bisect_left(items, item, 0, length)
+    return index < length and items[index] == item
+
+
+def _build_suffix_array(text, separator):
+    """Builds the suffix array of the given text where the text is a sequence
+    of tokens, each one terminated by the given separator character. The
+    separator must be the smallest character in the text and it may not
+    appear anywhere else.
+
+    Suffixes are compared only up to the end of the token they start in;
+    since the separator is the smallest character, the resulting order is
+    the same as the true lexicographic order for all the prefixes that do
+    not contain a separator. Suffixes that are equal up to the end of their
+    tokens are ordered by their positions.
+
+    Args:
+        text (str): the text to build the suffix array for
+        separator (str): the separator character that terminates each token
+
+    Returns:
+        list of int: the starting positions of the suffixes of the text,
+            sorted by the suffixes as described above
+    """
+    buckets = defaultdict(list)
+    for position, char in enumerate(text):
+        buckets[char].append(position)
+
+    find = text.find
+
+    def suffix_in_token(position):
+        return text[position:find(separator, position)]
+
+    # Sort the suffixes bucket by bucket to keep the number of keys that are
+    # alive at the same time low
+    result = []
+    for char in sorted(buckets):
+        positions = buckets.pop(char)
+        if char != separator:
+            positions.sort(key=suffix_in_token)
+        result.extend(positions)
+    return result
+
+
+def _merge_suffix_array(text, separator, suffix_array, new_suffixes):
+    """Merges the given suffixes into a suffix array that was built by
+    _build_suffix_array_ over a prefix of the given text.
+
+    Args:
+        text (str): the text that the suffixes refer to
+        separator (str): the separator character that terminates each token
+        suffix_array (array): the suffix array to merge the new suffixes
+            into; all the suffixes in it must start before the new ones
+        new_suffixes (list of int): the starting positions of the new
+            suffixes, sorted in the same way as the suffix array
+
+    Returns:
+        array: a new suffix array that contains both the old and the new
+            suffixes
+    """
+    find = text.find
+
+    def suffix_in_token(position):
+        return text[position:find(separator, position)]
+
+    # The new suffixes are sorted, so their insertion points are increasing
+    # and each binary search can start from the previous insertion point
+    result = array(suffix_array.typecode)
+    num_suffixes, previous = len(suffix_array), 0
+    for position in new_suffixes:
+        key = suffix_in_token(position)
+        low, high = previous, num_suffixes
+        while low < high:
+            middle = (low + high) // 2
+            if key < suffix_in_token(suffix_array[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        result.extend(suffix_array[previous:low])
+        result.append(position)
+        previous = low
+    result.extend(suffix_array[previous:])
+    return result
@@ -1,4 +1,5 @@
 from functools import total_ordering
+from selecta.utils import text_type
 
 
 @total_ordering
@@ -15,6 +16,8 @@ class Match(object):
             is a pair of the start and end indices of the substring.
     """
 
+    __slots__ = ("matched_object", "matched_string", "score", "substrings")
+
     def __init__(self):
         self.matched_object = None
         self.matched_string = None
@@ -31,6 +34,143 @@ class Match(object):
         self.substrings = canonical_ranges(self.substrings)
 
 
+class LazyMatch(Match):
+    """Match whose string representation and highlighted substrings are
+    calculated only when they are accessed for the first time. This is useful
+    for searches that produce lots of matches out of which only a few will
+    be shown on the UI.
+
+    Attributes:
+        displayer (callable or None): a callable that takes the matched object
+            and returns its string representation
+        highlighter (callable or None): a callable that takes the string
+            representation of the matched object and returns the list of
+            substrings to mark in it. ``None`` means not to mark anything.
+    """
+
+    __slots__ = ("displayer", "highlighter", "_matched_string", "_substrings")
+
+    def __init__(self):
+        super(LazyMatch, self).__init__()
+        self.displayer = None
+        self.highlighter = None
+        self._matched_string = None
+        self._substrings = None
+
+    @property
+    def matched_string(self):
+        if self._matched_string is None and self.displayer is not None:
+            self._matched_string = self.displayer(self.matched_object)
+        return self._matched_string
+
+    @matched_string.setter
+    def matched_string(self, value):
+        self._matched_string = value
+
+    @property
+    def substrings(self):
+        if self._substrings is None:
+            if self.highlighter is not None and \
+                    self.matched_string is not None:
+                self._substrings = self.highlighter(self.matched_string)
+            else:
+                self._substrings = []
+        return self._substrings
+
+    @substrings.setter
+    def substrings(self, value):
+        self._substrings = value
+
+
+class MatchList(list):
+    """List of matches returned from a search index.
+
+    Attributes:
+        num_hits (int): the total number of hits in the index for the query
+            that produced this list. May be larger than the length of the list
+            if the search was limited to the best few matches only.
+    """
+
+    def __init__(self, matches=(), num_hits=None):
+        super(MatchList, self).__init__(matches)
+        self.num_hits = len(self) if num_hits is None else num_hits
+
+
+class ResultSet(object):
+    """Compact, read-only sequence of matches returned from a search index.
+
+    Instead of holding a Match_ object for each hit, the result set stores
+    the matched items, their scores and (optionally) the matched spans in
+    parallel sequences (typically ``array`` objects) and constructs Match_
+    objects only when the individual results are accessed. Slicing a result
+    set returns another result set.
+
+    Attributes:
+        items (list): the matched items, best first
+        scores (sequence): the scores of the matched items
+        spans (tuple or None): ``None`` or a pair of sequences containing the
+            start and end indices of the matched span in each item. When the
+            spans are given, the ``score`` attribute of the constructed
+            matches is a tuple consisting of the score and the span.
+        num_hits (int): the total number of hits in the index for the query
+            that produced this result set. May be larger than the length of
+            the result set if the search was limited to the best few matches
+            only.
+        match_factory (callable): a callable that takes an item and its
+            score and returns a Match_ object for them
+    """
+
+    def __init__(self, items=(), scores=(), spans=None, num_hits=None,
+                 match_factory=None):
+        self.items = list(items)
+        self.scores = scores
+        self.spans = spans
+        self.num_hits = len(self.items) if num_hits is None else num_hits
+        self.match_factory = match_factory or _create_match
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            spans = self.spans
+            if spans is not None:
+                spans = spans[0][index], spans[1][index]
+            return self.__class__(self.items[index], self.scores[index],
+                                  spans, self.num_hits, self.match_factory)
+
+        item = self.items[index]
+        score = self.scores[index]
+        if self.spans is not None:
+            score = score, (self.spans[0][index], self.spans[1][index])
+        return self.match_factory(item, score)
+
+    def __iter__(self):
+        for index in range(len(self.items)):
+            yield self[index]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return "<{0} with {1} matches out of {2} hits>".format(
+            self.__class__.__name__, len(self), self.num_hits
+        )
+
+
+def _create_match(item, score):
+    """Default match factory of ResultSet_ objects."""
+    result = Match()
+    result.matched_object = item
+    result.matched_string = text_type(item)
+    result.score = score
+    return result
+
+
+def numeric_score_of(match):
+    """Returns the numeric score of the given match; the scores of fuzzy
+    matches also contain the matched range."""
+    score = match.score
+    return score[0] if isinstance(score, tuple) else score
+
+
 def canonical_ranges(ranges):
     """Given a list of ranges of the form ``(start, end)``, returns
     another list that ensures that:
@@ -0,0 +1,121 @@
+"""Bounded cache of the results of recent searches, so that going back to
+an earlier query (e.g., with Backspace) does not need another search."""
+
+from collections import OrderedDict
+
+import sys
+
+__all__ = ["QueryCache"]
+
+
+class QueryCache(object):
+    """Least recently used cache of search results, keyed by the query and
+    the limit of the search that produced them.
+
+    Every cached result belongs to a *version* of the contents of the
+    index; a lookup or store with a different version empties the cache
+    first. The total estimated size of the cached results is kept below a
+    given limit by evicting the least recently used ones. The items of the
+    results are not counted because they are owned by the index anyway.
+
+    Attributes:
+        max_size (int): the maximum total estimated size of the cached
+            results in bytes
+    """
+
+    def __init__(self, max_size=16 * 1024 * 1024):
+        """Constructor.
+
+        Args:
+            max_size (int): the maximum total estimated size of the cached
+                results in bytes
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._size = 0
+        self._version = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """The total estimated size of the cached results in bytes."""
+        return self._size
+
+    def clear(self):
+        """Removes all the results from the cache."""
+        self._entries.clear()
+        self._size = 0
+
+    def get(self, query, limit=None, version=None):
+        """Returns the cached result of a search.
+
+        Args:
+            query (str): the query of the search
+            limit (int or None): the limit of the search
+            version (object): the version of the contents of the index
+
+        Returns:
+            object or None: the cached result or ``None`` if the result of
+                the search is not in the cache
+        """
+        self._check_version(version)
+        key = query, limit
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+
+        # Move the entry to the end to mark it as the most recently used one
+        self._entries[key] = entry
+        return entry[0]
+
+    def put(self, query, limit, result, version=None):
+        """Stores the result of a search in the cache and evicts the least
+        recently used results if the cache became too large. Results larger
+        than the size limit of the cache are not stored.
+
+        Args:
+            query (str): the query of the search
+            limit (int or None): the limit of the search
+            result (object): the result of the search, typically a
+                ``selecta.matches.ResultSet``
+            version (object): the version of the contents of the index
+        """
+        self._check_version(version)
+        key = query, limit
+        old_entry = self._entries.pop(key, None)
+        if old_entry is not None:
+            self._size -= old_entry[1]
+
+        size = _estimate_size(query, result)
+        if size > self.max_size:
+            return
+
+        self._entries[key] = result, size
+        self._size += size
+        while self._size > self.max_size:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+
+    def _check_version(self, version):
+        """Empties the cache if the given version differs from the version
+        of the cached results."""
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+
+def _estimate_size(query, result):
+    """Estimates the memory used by the given search result, not counting
+    the matched items themselves."""
+    size = sys.getsizeof(query) + sys.getsizeof(result)
+    items = getattr(result, "items", None)
+    if items is None:
+        # Not a result set; a list of matches
+        return size + sum(sys.getsizeof(match) for match in result)
+
+    size += sys.getsizeof(items) + sys.getsizeof(result.scores)
+    if result.spans is not None:
+        size += sum(sys.getsizeof(part) for part in result.spans)
+    return size
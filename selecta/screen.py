@@ -0,0 +1,94 @@
+"""Virtual screen model that sits between the user interface and the
+terminal and sends only the changed rows of the UI to the terminal."""
+
+__all__ = ["Screen"]
+
+
+class Screen(object):
+    """Virtual model of a block of consecutive rows on the terminal.
+
+    The screen remembers the rows that were painted on the terminal the
+    last time. When it is asked to show a new set of rows, it compares them
+    to the painted ones and repaints only the rows that have changed, moving
+    the cursor directly from one changed row to the next.
+
+    Rows are strings that may already contain terminal control sequences;
+    they are written to the terminal as they are. Each row must clear the
+    rest of its line on the terminal (e.g., by ending in ``${CLEAR_EOL}``)
+    when it is painted over a longer row.
+
+    The screen assumes that nobody else moves the cursor or writes to the
+    terminal between two updates; call invalidate_ if this is not the case.
+    """
+
+    def __init__(self, terminal):
+        """Constructor.
+
+        Args:
+            terminal (Terminal): the terminal that the screen paints on. The
+                cursor of the terminal must be in the first row of the block
+                when the screen is used for the first time.
+        """
+        self.terminal = terminal
+        self._rows = []
+        self._cursor_row = 0
+        self._cursor_column = 0
+
+    @property
+    def rows(self):
+        """The rows that are currently painted on the terminal."""
+        return list(self._rows)
+
+    def invalidate(self):
+        """Notifies the screen that the block is empty on the terminal and
+        that the cursor is at the start of the first row of the block."""
+        self._rows = []
+        self._cursor_row = 0
+        self._cursor_column = 0
+
+    def update(self, rows, cursor=(0, 0)):
+        """Updates the block on the terminal to show the given rows and then
+        moves the cursor to the given position.
+
+        Args:
+            rows (list of str): the new rows of the block
+            cursor (tuple of int): the row and column to move the cursor to,
+                relative to the top left corner of the block
+        """
+        old_rows, new_rows = self._rows, list(rows)
+        changed = [
+            index for index, row in enumerate(new_rows)
+            if row != (old_rows[index] if index < len(old_rows) else "")
+        ]
+        must_clear = len(old_rows) > len(new_rows) and \
+            any(old_rows[len(new_rows):])
+        if not changed and not must_clear and \
+                cursor == (self._cursor_row, self._cursor_column):
+            return
+
+        terminal = self.terminal
+        with terminal.hidden_cursor():
+            for index in changed:
+                self._move_to_row(index)
+                if new_rows[index]:
+                    terminal.write(new_rows[index], raw=True)
+                    self._cursor_column = None
+                else:
+                    terminal.clear_to_eol()
+
+            if must_clear:
+                self._move_to_row(len(new_rows))
+                terminal.clear_to_eos()
+
+            row, column = cursor
+            if row != self._cursor_row or column != self._cursor_column:
+                terminal.move_cursor(x=column, dy=row - self._cursor_row)
+                self._cursor_row, self._cursor_column = row, column
+
+        self._rows = new_rows
+
+    def _move_to_row(self, row):
+        """Moves the cursor to the start of the given row of the block."""
+        if row != self._cursor_row or self._cursor_column != 0:
+            self.terminal.move_cursor(x=0, dy=row - self._cursor_row)
+            self._cursor_row, self._cursor_column = row, 0
@@ -0,0 +1,363 @@
+"""Server that keeps a search index resident in memory and answers the
+queries of its clients over a Unix domain socket, so the clients do not
+have to build the index every time they need to search it.
+
+The protocol is line-based. Requests and responses are UTF-8 encoded lines
+terminated by a newline character. The following requests are supported:
+
+``SEARCH <limit> <query>``
+    Searches the index for the query; everything after the space that
+    follows the limit is part of the query. The limit is the maximum number
+    of matches to return; zero means to return all of them. The response
+    is ``OK <count> <num_hits>``, followed by ``<count>`` lines of the form
+    ``<score>\\t<item>``, best match first. ``<num_hits>`` is the total
+    number of matches in the index.
+
+``RELOAD [<path>]``
+    Builds a new index from the file at the given absolute path, or from
+    the same source as the current index if no path is given. Relative
+    paths are rejected because the server cannot know the working directory
+    of the client. Searches are answered from the old index until the new
+    one is ready. The response is ``OK``.
+
+``PING``
+    The response is ``OK``.
+
+Backslashes, tabs, newlines and carriage returns in the queries, paths and
+items are escaped as ``\\\\``, ``\\t``, ``\\n`` and ``\\r`` so they cannot
+break the lines of the protocol.
+
+Requests that cannot be fulfilled are answered with ``ERR <message>``.
+Each client may send any number of requests on the same connection; the
+server handles the clients concurrently.
+"""
+
+from selecta.errors import NotSupportedError
+from selecta.matches import numeric_score_of
+from threading import Lock
+
+import errno
+import os
+import re
+import signal
+import socket
+
+try:
+    # Python 3.x
+    import socketserver
+except ImportError:
+    # Python 2.x
+    import SocketServer as socketserver
+
+__all__ = ["IndexClient", "IndexServer"]
+
+
+class IndexServer(object):
+    """Server that answers the queries of its clients from a resident search
+    index over a Unix domain socket.
+
+    Attributes:
+        address (str): the path of the socket
+        loader (callable): a callable that creates the index. It is called
+            with the path given in a ``RELOAD`` request, or with ``None``
+            when the index should be built from its original source. It
+            should raise NotSupportedError_ if it cannot build the index.
+        index (selecta.indexing.Index): the index being served
+    """
+
+    def __init__(self, address, loader, index=None):
+        """Constructor.
+
+        Args:
+            address (str): the path of the socket
+            loader (callable): the callable that creates the index; see the
+                ``loader`` attribute
+            index (selecta.indexing.Index or None): the index to serve
+                initially. ``None`` means to call the loader to create it.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise NotSupportedError("Unix domain sockets are not supported "
+                                    "on this platform")
+
+        self.address = address
+        self.loader = loader
+        self.index = index if index is not None else loader(None)
+
+        # Indexes are not thread-safe, so the searches of the clients are
+        # serialized. Reloads build the new index outside the lock.
+        self._search_lock = Lock()
+        self._reload_lock = Lock()
+        self._server = None
+        self._thread = None
+
+    def reload(self, path=None):
+        """Builds a new index with the loader of the server and starts
+        serving the new index when it is ready.
+
+        Args:
+            path (str or None): the path to pass to the loader
+        """
+        with self._reload_lock:
+            index = self.loader(path)
+            with self._search_lock:
+                index, self.index = self.index, index
+
+        # Release the worker processes of sharded indexes
+        close = getattr(index, "close", None)
+        if close is not None:
+            close()
+
+    def search(self, query, limit=None):
+        """Searches the index of the server; see ``Index.search()``."""
+        with self._search_lock:
+            return self.index.search(query, limit)
+
+    def serve_forever(self):
+        """Binds the socket of the server and serves the clients until the
+        process is interrupted or terminated. The socket file is removed
+        when the server stops."""
+        self.start()
+        previous_handler = signal.signal(signal.SIGTERM, _exit_on_signal)
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+            self.stop()
+
+    def start(self):
+        """Binds the socket of the server. Use ``serve_forever()`` or
+        ``handle_requests()`` afterwards to serve the clients.
+
+        Raises:
+            NotSupportedError: if another server is already listening on
+                the socket
+        """
+        if _is_listening(self.address):
+            raise NotSupportedError("another server is already listening "
+                                    "on {0}".format(self.address))
+        try:
+            os.unlink(self.address)
+        except OSError as ex:
+            if ex.errno != errno.ENOENT:
+                raise
+
+        server = _ThreadingUnixStreamServer(self.address, _RequestHandler)
+        server.index_server = self
+        self._server = server
+
+    def handle_requests(self):
+        """Serves the clients in a background thread until ``stop()`` is
+        called. Mostly useful for testing."""
+        from threading import Thread
+        self._thread = Thread(target=self._server.serve_forever,
+                              name="selecta-server")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops serving the clients and removes the socket file."""
+        server, self._server = self._server, None
+        if server is None:
+            return
+
+        server.shutdown_requested = True
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            server.shutdown()
+            thread.join()
+        server.server_close()
+        try:
+            os.unlink(self.address)
+        except OSError:
+            pass
+
+
+class IndexClient(object):
+    """Client of an IndexServer_.
+
+    The client can also be used as a context manager that closes the
+    connection when leaving the context.
+    """
+
+    def __init__(self, address):
+        """Constructor.
+
+        Args:
+            address (str): the path of the socket of the server
+        """
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(address)
+        self._stream = self._socket.makefile("rwb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the connection to the server."""
+        self._stream.close()
+        self._socket.close()
+
+    def ping(self):
+        """Checks whether the server is responding."""
+        self._request(u"PING")
+
+    def reload(self, path=None):
+        """Asks the server to reload its index and waits until the new index
+        is ready.
+
+        Args:
+            path (str or None): the path of the file to load the items from.
+                Relative paths are relative to the working directory of the
+                client. ``None`` means to load the items from the same
+                source as the current index.
+        """
+        if path is None:
+            self._request(u"RELOAD")
+        else:
+            self._request(u"RELOAD " + _escape(os.path.abspath(path)))
+
+    def search(self, query, limit=None):
+        """Searches the index of the server.
+
+        Args:
+            query (str): the search query
+            limit (int or None): the maximum number of matches to return.
+                ``None`` means to return all the matches.
+
+        Returns:
+            tuple: the total number of matches and a list containing the
+                score and the string representation of the best matches
+        """
+        count, num_hits = [
+            int(value) for value in
+            self._request(
+                u"SEARCH {0} {1}".format(limit or 0, _escape(query))
+            ).split()
+        ]
+        matches = []
+        for _ in range(count):
+            score, _, item = self._read_line().partition(u"\t")
+            matches.append((int(score), _unescape(item)))
+        return num_hits, matches
+
+    def _read_line(self):
+        line = self._stream.readline()
+        if not line:
+            raise EOFError("the server closed the connection")
+        return line.decode("utf-8").rstrip(u"\n")
+
+    def _request(self, request):
+        """Sends a request and returns the remainder of the status line of
+        the response.
+
+        Raises:
+            NotSupportedError: if the server refused the request
+        """
+        self._stream.write(request.encode("utf-8") + b"\n")
+        self._stream.flush()
+        status, _, rest = self._read_line().partition(u" ")
+        if status != u"OK":
+            raise NotSupportedError(rest)
+        return rest
+
+
+class _ThreadingUnixStreamServer(socketserver.ThreadingMixIn,
+                                 socketserver.UnixStreamServer):
+    daemon_threads = True
+    shutdown_requested = False
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles the requests of a single client."""
+
+    def handle(self):
+        server = self.server
+        while not server.shutdown_requested:
+            line = self.rfile.readline()
+            if not line:
+                return
+            try:
+                response = self._respond(
+                    server.index_server, line.decode("utf-8").rstrip(u"\r\n")
+                )
+            except Exception as ex:
+                response = u"ERR {0}\n".format(
+                    u" ".join(u"{0}".format(ex).split())
+                )
+            try:
+                self.wfile.write(response.encode("utf-8"))
+                self.wfile.flush()
+            except (IOError, OSError):
+                # The client went away
+                return
+
+    def _respond(self, index_server, request):
+        command, _, argument = request.partition(u" ")
+        if command == u"SEARCH":
+            limit, _, query = argument.partition(u" ")
+            limit = int(limit)
+            if limit < 0:
+                raise ValueError("the limit must not be negative")
+            matches = index_server.search(_unescape(query), limit or None)
+            lines = [u"OK {0} {1}\n".format(len(matches), matches.num_hits)]
+            lines.extend(
+                u"{0}\t{1}\n".format(numeric_score_of(match),
+                                     _escape(match.matched_string))
+                for match in matches
+            )
+            return u"".join(lines)
+        elif command == u"RELOAD":
+            argument = _unescape(argument)
+            if argument and not os.path.isabs(argument):
+                raise ValueError("the path must be absolute")
+            index_server.reload(argument or None)
+            return u"OK\n"
+        elif command == u"PING":
+            return u"OK\n"
+        else:
+            raise ValueError("unknown request: {0}".format(command))
+
+
+#: Characters that are escaped in the arguments of the requests and in the
+#: items of the responses, and their escape sequences without the leading
+#: backslash
+_ESCAPES = {u"\\": u"\\", u"\t": u"t", u"\n": u"n", u"\r": u"r"}
+_UNESCAPES = dict((value, key) for key, value in _ESCAPES.items())
+_ESCAPED_CHARS = re.compile(u"[\\\\\t\n\r]")
+_ESCAPE_SEQUENCES = re.compile(u"\\\\(.)", re.DOTALL)
+
+
+def _escape(string):
+    """Escapes the characters in the given string that would break the
+    line-based protocol."""
+    return _ESCAPED_CHARS.sub(lambda match: u"\\" + _ESCAPES[match.group()],
+                              string)
+
+
+def _unescape(string):
+    """Reverses the effect of _escape_ on the given string."""
+    return _ESCAPE_SEQUENCES.sub(
+        lambda match: _UNESCAPES.get(match.group(1), match.group(1)), string
+    )
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
+
+
+def _is_listening(address):
+    """Returns whether a server is accepting connections on the Unix domain
+    socket at the given path."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(address)
+    except socket.error:
+        return False
+    finally:
+        probe.close()
+    return True
@@ -0,0 +1,196 @@
+"""Search index that distributes its items among several worker processes
+so that a search can use more than one CPU core."""
+
+from functools import partial
+from multiprocessing import Pipe, Process
+from selecta.indexing import Index, create_fuzzy_index
+from selecta.matches import Match, MatchList
+from operator import itemgetter
+
+__all__ = ["ShardedIndex", "create_sharded_fuzzy_index"]
+
+
+class ShardedIndex(Index):
+    """Index that splits its items into shards and keeps each shard in a
+    separate index living in a long-lived worker process.
+
+    Items are sent to the workers in batches, once. A search sends only the
+    query to all the workers at the same time; each worker searches its own
+    shard and returns its best matches, which are then merged in the
+    calling process. Equal items always end up in the same shard.
+
+    The wrapped indexes must rank their matches in increasing order of the
+    ``score`` attribute of the matches, just like FuzzyIndex_ does. Ties
+    are broken by the order in which the items were added.
+
+    Attributes:
+        batch_size (int): the maximum number of items to collect for a shard
+            before sending them to the corresponding worker
+    """
+
+    def __init__(self, num_shards, index_factory=create_fuzzy_index,
+                 batch_size=1000):
+        """Constructor.
+
+        Args:
+            num_shards (int): the number of shards and worker processes
+            index_factory (callable): a callable that creates the index of
+                a single shard when called with no arguments. It must be
+                picklable if the worker processes are not forked.
+            batch_size (int): the maximum number of items to collect for a
+                shard before sending them to the corresponding worker
+        """
+        if num_shards < 1:
+            raise ValueError("the number of shards must be positive")
+
+        self.batch_size = batch_size
+        self._connections = []
+        self._processes = []
+        self._pending = [[] for _ in range(num_shards)]
+        self._num_items = 0
+
+        for _ in range(num_shards):
+            connection, worker_connection = Pipe()
+            process = Process(target=_serve_shard,
+                              args=(worker_connection, index_factory),
+                              name="selecta-shard")
+            process.daemon = True
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    @property
+    def num_shards(self):
+        """The number of shards in the index."""
+        return len(self._connections)
+
+    def add(self, item):
+        shard = hash(item) % len(self._pending)
+        pending = self._pending[shard]
+        pending.append((self._num_items, item))
+        self._num_items += 1
+        if len(pending) >= self.batch_size:
+            self._flush(shard)
+
+    def close(self):
+        """Stops the worker processes of the index. The index cannot be used
+        any more after it was closed."""
+        for connection in self._connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections, self._processes = [], []
+
+    def finalize(self):
+        self._request_all("finalize", None)
+
+    def forget_previous_query(self):
+        self._request_all("forget_previous_query", None)
+
+    def search(self, query, limit=None):
+        num_hits, hits = 0, []
+        for shard_num_hits, shard_hits in self._request_all("search",
+                                                            (query, limit)):
+            num_hits += shard_num_hits
+            hits.extend(shard_hits)
+
+        # Each hit is a tuple of the score, the ID of the item, the item
+        # itself, its string representation and the highlighted substrings
+        hits.sort(key=itemgetter(0, 1))
+        if limit is not None:
+            del hits[limit:]
+
+        result = MatchList(num_hits=num_hits)
+        for score, _, item, matched_string, substrings in hits:
+            match = Match()
+            match.matched_object = item
+            match.matched_string = matched_string
+            match.score = score
+            match.substrings = substrings
+            result.append(match)
+        return result
+
+    def _flush(self, shard):
+        """Sends the pending items of the given shard to its worker."""
+        pending = self._pending[shard]
+        if pending:
+            self._connections[shard].send(("add", pending))
+            self._pending[shard] = []
+
+    def _request_all(self, command, args):
+        """Sends the given command to all the workers (after sending the
+        pending items) and returns the list of their responses."""
+        for shard, connection in enumerate(self._connections):
+            self._flush(shard)
+            connection.send((command, args))
+
+        responses = [connection.recv() for connection in self._connections]
+        for error, _ in responses:
+            if error is not None:
+                raise error
+        return [response for _, response in responses]
+
+
+def create_sharded_fuzzy_index(num_shards, engine="auto"):
+    """Creates a ShardedIndex_ whose shards are fuzzy indexes that use the
+    given fuzzy matching engine.
+
+    Args:
+        num_shards (int): the number of shards and worker processes
+        engine (str): the fuzzy matching engine to use; see
+            ``selecta.indexing.create_fuzzy_index()`` for the valid choices
+
+    Returns:
+        ShardedIndex: the sharded index
+    """
+    # Try the engine in this process first so we fail early if it is not
+    # available
+    create_fuzzy_index(engine)
+    return ShardedIndex(num_shards, partial(create_fuzzy_index, engine))
+
+
+def _serve_shard(connection, index_factory):
+    """Body of a worker process that holds a single shard of a ShardedIndex_
+    and executes the commands received from the given connection."""
+    index, ids, error = index_factory(), {}, None
+    while True:
+        command, args = connection.recv()
+        if command == "close":
+            break
+
+        if command == "add":
+            # Adding items is not acknowledged; errors are reported in the
+            # response to the next command instead
+            try:
+                for item_id, item in args:
+                    ids.setdefault(item, item_id)
+                    index.add(item)
+            except Exception as ex:
+                error = error or ex
+            continue
+
+        response = None
+        try:
+            if command == "finalize":
+                index.finalize()
+            elif command == "forget_previous_query":
+                index.forget_previous_query()
+            elif command == "search":
+                matches = index.search(*args)
+                response = matches.num_hits, [
+                    (match.score, ids[match.matched_object],
+                     match.matched_object, match.matched_string,
+                     match.substrings)
+                    for match in matches
+                ]
+            else:
+                raise ValueError("unknown command: {0!r}".format(command))
+        except Exception as ex:
+            error = error or ex
+
+        connection.send((error, response))
+        error = None
+
+    connection.close()
@@ -0,0 +1,133 @@
+"""Structured statistics about the searches performed by a search index,
+and a collector that summarizes them."""
+
+from operator import attrgetter
+
+__all__ = ["SearchStats", "StatsCollector"]
+
+
+class SearchStats(object):
+    """Statistics about a single search in an index.
+
+    Times are measured in seconds. Matches are typically constructed lazily
+    when they are accessed, so ``match_time`` covers the construction of the
+    result set only.
+
+    Attributes:
+        query (str): the search query
+        index (str): the name of the class of the index that was searched
+        tokens_scanned (int): the number of tokens that were examined
+            character by character (or scanned in bulk) to decide whether
+            they match the query
+        tokens_rejected (int): the number of tokens that were ruled out
+            without being scored, either by a prefilter or by the scan
+        candidates_scored (int): the number of tokens that were scored
+        hits (int): the number of matched items
+        items_deduplicated (int): the number of times an item was matched
+            by more than one of its tokens and only its best score was kept
+        scoring_time (float): the time spent on finding and scoring the
+            matching tokens
+        sorting_time (float): the time spent on ranking the matched items
+        match_time (float): the time spent on constructing the matches
+        total_time (float): the total time of the search
+        cached (bool): whether the result was returned from the query cache
+            of the index; no other statistics are collected then
+    """
+
+    __slots__ = ("query", "index", "cached", "tokens_scanned",
+                 "tokens_rejected", "candidates_scored", "hits",
+                 "items_deduplicated", "scoring_time", "sorting_time",
+                 "match_time", "total_time")
+
+    #: Names of the counters in the statistics
+    COUNTERS = ("tokens_scanned", "tokens_rejected", "candidates_scored",
+                "hits", "items_deduplicated")
+
+    #: Names of the timers in the statistics
+    TIMERS = ("scoring_time", "sorting_time", "match_time", "total_time")
+
+    def __init__(self, query=None, index=None):
+        self.query = query
+        self.index = index
+        self.cached = False
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        for name in self.TIMERS:
+            setattr(self, name, 0.0)
+
+    def as_dict(self):
+        """Returns the statistics as a dictionary."""
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __repr__(self):
+        return "{0}({1})".format(
+            self.__class__.__name__,
+            ", ".join("{0}={1!r}".format(name, getattr(self, name))
+                      for name in self.__slots__)
+        )
+
+
+class StatsCollector(object):
+    """Callable that can be used as the ``stats_callback`` of an index to
+    collect the statistics of all its searches.
+
+    Attributes:
+        searches (list of SearchStats): the statistics of the searches, in
+            the order they were performed
+    """
+
+    def __init__(self):
+        self.searches = []
+
+    def __call__(self, stats):
+        self.searches.append(stats)
+
+    def summary(self, num_slowest=5):
+        """Returns a human-readable summary of the collected statistics.
+
+        Args:
+            num_slowest (int): the number of slowest searches to list
+                individually
+
+        Returns:
+            str: the summary
+        """
+        searches = self.searches
+        if not searches:
+            return "No searches were performed."
+
+        num_cached = sum(1 for stats in searches if stats.cached)
+        header = "{0} search(es), {1} answered from the query cache".format(
+            len(searches), num_cached
+        )
+        lines = [header, "",
+                 "{0:<20}{1:>14}{2:>14}{3:>14}".format("", "total", "mean",
+                                                        "max")]
+        for name in SearchStats.COUNTERS:
+            values = [getattr(stats, name) for stats in searches]
+            lines.append("{0:<20}{1:>14}{2:>14.1f}{3:>14}".format(
+                name, sum(values), sum(values) / float(len(values)),
+                max(values)
+            ))
+        for name in SearchStats.TIMERS:
+            values = [getattr(stats, name) * 1000 for stats in searches]
+            lines.append("{0:<20}{1:>12.2f}ms{2:>12.2f}ms{3:>12.2f}ms".format(
+                name, sum(values), sum(values) / len(values), max(values)
+            ))
+
+        slowest = sorted(searches, key=attrgetter("total_time"),
+                         reverse=True)[:num_slowest]
+        lines.extend(["", "Slowest searches:"])
+        for stats in slowest:
+            lines.append(
+                "{0:>10.2f}ms  {1!r}: {2} scanned, {3} scored, {4} hits; "
+                "scoring {5:.2f}ms, sorting {6:.2f}ms, matches "
+                "{7:.2f}ms".format(
+                    stats.total_time * 1000, stats.query,
+                    stats.tokens_scanned, stats.candidates_scored,
+                    stats.hits, stats.scoring_time * 1000,
+                    stats.sorting_time * 1000, stats.match_time * 1000
+                )
+            )
+
+        return "\n".join(lines)
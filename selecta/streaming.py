@@ -0,0 +1,147 @@
+"""Classes and functions that allow a search index to be filled from a
+stream of items in a background thread while the index is already being
+searched."""
+
+from selecta.indexing import Index
+from threading import RLock, Thread
+
+import time
+
+__all__ = ["StreamingIndex"]
+
+
+class StreamingIndex(Index):
+    """Wrapper around a search index that adds the items coming from an
+    iterable to the wrapped index in a background thread. The index may be
+    searched while the items are being added; a search will then find the
+    items that were added so far.
+
+    Items are added to the wrapped index in batches. A batch is flushed into
+    the index when it reaches a given size or when enough time has passed
+    since the last flush, whichever happens first.
+
+    Attributes:
+        index (Index): the wrapped index
+        batch_size (int): the maximum number of items in a batch
+        flush_interval (float): the maximum number of seconds to wait before
+            flushing a non-empty batch into the index
+        error (Exception or None): the exception that stopped the background
+            thread, or ``None`` if the thread is still running or it has
+            finished successfully
+    """
+
+    def __init__(self, index, items, batch_size=1000, flush_interval=0.1):
+        """Constructor.
+
+        Args:
+            index (Index): the index to fill in the background
+            items (iterable): the items to add to the index. The iterable
+                is consumed in the background thread.
+            batch_size (int): the maximum number of items in a batch
+            flush_interval (float): the maximum number of seconds to wait
+                before flushing a non-empty batch into the index
+        """
+        self.index = index
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.error = None
+
+        self._items = items
+        self._lock = RLock()
+        self._num_items = 0
+        self._generation = 0
+        self._loading = False
+        self._thread = None
+
+    def add(self, item):
+        with self._lock:
+            self.index.add(item)
+            self._num_items += 1
+            self._generation += 1
+
+    def finalize(self):
+        with self._lock:
+            self.index.finalize()
+
+    def forget_previous_query(self):
+        with self._lock:
+            self.index.forget_previous_query()
+
+    @property
+    def generation(self):
+        """A counter that is increased whenever new items are added to the
+        index. Can be used to decide whether the results of an earlier search
+        are still up-to-date."""
+        return self._generation
+
+    @property
+    def loading(self):
+        """Whether the background thread is still adding items to the
+        index."""
+        return self._loading
+
+    @property
+    def num_items(self):
+        """The number of items added to the index so far."""
+        return self._num_items
+
+    def search(self, query, limit=None):
+        with self._lock:
+            return self.index.search(query, limit)
+
+    def start(self):
+        """Starts adding the items to the index in a background thread.
+
+        Returns:
+            StreamingIndex: the index itself, for easy chaining
+        """
+        if self._thread is not None:
+            raise RuntimeError("the background thread was already started")
+
+        self._loading = True
+        self._thread = Thread(target=self._run, name="selecta-loader")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Waits until all the items have been added to the index.
+
+        Args:
+            timeout (float or None): the maximum number of seconds to wait.
+                ``None`` means to wait indefinitely.
+
+        Returns:
+            bool: whether all the items have been added to the index
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self._loading
+
+    def _flush(self, batch):
+        """Adds the given batch of items to the wrapped index."""
+        with self._lock:
+            add = self.index.add
+            for item in batch:
+                add(item)
+            self._num_items += len(batch)
+            self._generation += 1
+
+    def _run(self):
+        """Body of the background thread."""
+        batch, batch_size = [], self.batch_size
+        last_flush = time.time()
+        try:
+            for item in self._items:
+                batch.append(item)
+                if len(batch) >= batch_size or \
+                        time.time() - last_flush >= self.flush_interval:
+                    self._flush(batch)
+                    batch, last_flush = [], time.time()
+            if batch:
+                self._flush(batch)
+            self.finalize()
+        except Exception as ex:
+            self.error = ex
+        finally:
+            self._loading = False
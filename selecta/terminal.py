@@ -4,8 +4,10 @@ import codecs
 import os
 import re
 import sys
+import time
 
 from contextlib import contextmanager
+from functools import partial
 from selecta.errors import NotSupportedError, TerminalInitError
 from string import Template
 
@@ -24,20 +26,29 @@ def _find_getch():
         try:
             import msvcrt
 
-            def _getch(block=True):
+            def _getch(block=True, timeout=None):
                 """Reads a single character from the terminal without echoing it
                 to the user.
 
                 Args:
                     block (bool): whether to wait for a keypress if there are
                         no characters in the terminal buffer.
+                    timeout (float or None): the maximum number of seconds to
+                        wait for a keypress in blocking mode. ``None`` means
+                        to wait indefinitely.
 
                 Returns:
                     the character read from the terminal or ``None`` if there
                     was no character waiting to be read and ``block`` was
-                    set to ``False``. May also return a full ANSI escape
-                    sequence for cursor keys.
+                    set to ``False`` or the timeout expired. May also return a
+                    full ANSI escape sequence for cursor keys.
                 """
+                if block and timeout is not None:
+                    deadline = time.time() + timeout
+                    while not msvcrt.kbhit() and time.time() < deadline:
+                        time.sleep(0.01)
+                    block = False
+
                 if not block and not msvcrt.kbhit():
                     return None
                 else:
@@ -45,18 +56,18 @@ def _find_getch():
                     # corresponding to cursor keys in a single sequence
                     return msvcrt.getch()
         except ImportError:
-            def _getch(block=True):
+            def _getch(block=True, timeout=None):
                 raise NotImplementedError
             return _getch
 
     from select import select
     from tty import setraw
 
-    def _kbhit(fd):
-        rlist, _, _ = select([fd], [], [], 0)
+    def _kbhit(fd, timeout=0):
+        rlist, _, _ = select([fd], [], [], timeout)
         return bool(rlist)
 
-    def _getch(block=True):
+    def _getch(block=True, timeout=None):
         """Reads a single character from the terminal without echoing it
         to the user."""
         fd = sys.stdin.fileno()
@@ -65,9 +76,12 @@ def _find_getch():
             setraw(fd)
 
             # If we are in nonblocking mode and there is no input available
-            # on fd, just return
+            # on fd, just return. Same if we are in blocking mode with a
+            # timeout and no input arrives in time.
             if not block and not _kbhit(fd):
                 return None
+            if block and timeout is not None and not _kbhit(fd, timeout):
+                return None
 
             # Escape sequences should be read in a single chunk so that's
             # why we have to loop below
@@ -80,7 +94,31 @@ def _find_getch():
 
     return _getch
 
-getch = _find_getch()
+_getch_implementation = None
+
+#: Regular expression that splits a chunk of raw terminal input into keys:
+#: complete CSI or SS3 escape sequences, lone escape or control characters
+#: and runs of non-control characters (which may be multi-byte characters
+#: or text pasted by the user)
+_key_regex = re.compile(
+    b"\x1b(?:\\[[0-?]*[ -/]*[@-~]|O.)?|[\x00-\x1f\x7f]|[^\x00-\x1f\x7f]+",
+    re.DOTALL
+)
+
+
+def getch(block=True, timeout=None):
+    """Reads a single character from the terminal without echoing it to the
+    user, either in blocking or nonblocking mode. See the docstring of
+    ``Terminal.getch()`` for the description of the arguments.
+
+    The platform-specific implementation is looked up when the function is
+    first called, so importing this module does not probe the terminal
+    modules of the platform.
+    """
+    global _getch_implementation
+    if _getch_implementation is None:
+        _getch_implementation = _find_getch()
+    return _getch_implementation(block, timeout)
 
 
 class Keycodes(object):
@@ -140,6 +178,7 @@ class Terminal(object):
     """
 
     _COLORS = "BLACK BLUE GREEN CYAN RED MAGENTA YELLOW WHITE".split()
+    _MAX_RENDERED_TEMPLATES = 256
 
     @classmethod
     def create(self, stream=None, is_tty=None):
@@ -196,8 +235,13 @@ class Terminal(object):
         self.stream = stream or sys.stdout
         self._initialized = False
         self._control_sequences = None
+        self._parameterized_cursor_movements = None
+        self._rendered_templates = {}
+        self._cursor_movements = {}
+        self._frame = None
         self._deinit_hook = None
         self._input_encoding = None
+        self._pending_keys = []
         if is_tty is not None:
             self._is_tty = bool(is_tty)
         else:
@@ -214,8 +258,12 @@ class Terminal(object):
             raise TerminalInitError("terminal is already initialized")
 
         self._control_sequences = self._create_empty_control_sequences()
+        self._parameterized_cursor_movements = {}
+        self._rendered_templates = {}
+        self._cursor_movements = {}
         self._deinit_hook = None
         self._input_encoding = self._detect_input_encoding()
+        self._pending_keys = []
 
         self._initialized = True
 
@@ -234,8 +282,12 @@ class Terminal(object):
 
         self._is_tty = False
         self._control_sequences = None
+        self._parameterized_cursor_movements = None
+        self._rendered_templates = {}
+        self._cursor_movements = {}
         self._deinit_hook = None
         self._input_encoding = None
+        self._pending_keys = []
 
         self._initialized = False
 
@@ -249,7 +301,27 @@ class Terminal(object):
         to the end of the screen."""
         self.write("${CLEAR_EOS}")
 
-    def getch(self):
+    @contextmanager
+    def frame(self):
+        """Context manager that collects everything written to the terminal
+        within the context in a buffer, and writes the contents of the buffer
+        to the stream of the terminal in a single call (followed by a single
+        flush) when leaving the context. Frames may be nested; only the
+        outermost frame writes to the stream."""
+        if self._frame is not None:
+            yield
+            return
+
+        self._frame = []
+        try:
+            yield
+        finally:
+            data, self._frame = "".join(self._frame), None
+            if data:
+                self.stream.write(data)
+                self.stream.flush()
+
+    def getch(self, block=True, timeout=None):
         """Reads a single character from the terminal without echoing it
         to the user. Handles Ctrl-C and EOF properly by raising
         KeyboardInterrupt or EOFError when needed. Also remaps some cursor
@@ -257,15 +329,52 @@ class Terminal(object):
         ``Keycodes``. If you don't need this behaviour, use the raw getch()_
         function.
 
+        Args:
+            block (bool): whether to wait for a keypress if there are
+                no characters in the terminal buffer.
+            timeout (float or None): the maximum number of seconds to wait
+                for a keypress in blocking mode. ``None`` means to wait
+                indefinitely.
+
         Returns:
             the raw character from the terminal or one of the constants from
-            the ``Keycodes`` class for some special keys.
+            the ``Keycodes`` class for some special keys, or ``None`` if no
+            character was available in nonblocking mode or before the timeout
+            expired.
 
         Raises:
             KeyboardInterrupt: when the user pressed Ctrl-C
             EOFError: when the user typed an end-of-file character
         """
-        char = getch()
+        # The raw getch() function returns all the bytes that are waiting in
+        # the input buffer in a single chunk. The chunk is split into keys
+        # here and the keys are returned one by one so that a sequence of
+        # keypresses is not mistaken for a single unknown key.
+        if not self._pending_keys:
+            chunk = self._read_chunk(block, timeout)
+            if not chunk:
+                return None
+            self._pending_keys.extend(_key_regex.findall(chunk))
+        return self._translate_key(self._pending_keys.pop(0))
+
+    def _read_chunk(self, block, timeout):
+        """Reads a chunk of raw input from the terminal using getch()_.
+
+        Returns:
+            bytes or None: the bytes waiting in the input buffer of the
+                terminal or ``None`` if no input was available in nonblocking
+                mode or before the timeout expired
+        """
+        return getch(block, timeout)
+
+    def _translate_key(self, char):
+        """Translates a single key read from the terminal to the value that
+        getch() should return for it.
+
+        Raises:
+            KeyboardInterrupt: when the key is Ctrl-C
+            EOFError: when the key is an end-of-file character
+        """
         if char == Keycodes.BREAK:
             raise KeyboardInterrupt
         elif char == Keycodes.EOF:
@@ -329,21 +438,25 @@ class Terminal(object):
         if y is not None:
             raise NotImplementedError("move() not implemented yet for absolute "
                                       "values in the Y direction")
-        else:
-            if dy > 0:
-                self.write("$DOWN" * dy)
-            elif dy < 0:
-                self.write("$UP" * -dy)
+
+        parts = []
+        if dy > 0:
+            parts.append(self._get_cursor_movement("DOWN", dy))
+        elif dy < 0:
+            parts.append(self._get_cursor_movement("UP", -dy))
 
         if x is not None:
-            self.write("$BOL")
+            parts.append(self._control_sequences["BOL"])
             if x > 0:
-                self.write("$RIGHT" * x)
+                parts.append(self._get_cursor_movement("RIGHT", x))
         else:
             if dx > 0:
-                self.write("$RIGHT" * dx)
+                parts.append(self._get_cursor_movement("RIGHT", dx))
             elif dx < 0:
-                self.write("$LEFT" * -dx)
+                parts.append(self._get_cursor_movement("LEFT", -dx))
+
+        if parts:
+            self.write("".join(parts), raw=True)
 
     def render(self, template):
         """Replaces tokens of the form ``$TOKEN`` and ``${TOKEN}`` in the given
@@ -391,8 +504,18 @@ class Terminal(object):
             - ``HIDE_CURSOR`` hides the cursor
 
             - ``SHOW_CURSOR`` shows the cursor
+
+        Rendered templates are cached so rendering the same template again
+        does not parse it again.
         """
-        return Template(template).safe_substitute(self._control_sequences)
+        result = self._rendered_templates.get(template)
+        if result is None:
+            result = Template(template).safe_substitute(
+                self._control_sequences
+            )
+            if len(self._rendered_templates) < self._MAX_RENDERED_TEMPLATES:
+                self._rendered_templates[template] = result
+        return result
 
     @property
     def supported(self):
@@ -416,13 +539,20 @@ class Terminal(object):
         replacing any tokens handled by the ``render()`` function before
         actually printing it.
 
+        When called within a frame_ context, the rendered template is added to
+        the buffer of the frame instead of being written to the stream.
+
         Args:
             template (str): the template to write
             raw (bool): when True, no replacements are performed on the
                 template
         """
-        self.stream.write(self.render(template) if not raw else template)
-        self.stream.flush()
+        data = self.render(template) if not raw else template
+        if self._frame is not None:
+            self._frame.append(data)
+        else:
+            self.stream.write(data)
+            self.stream.flush()
 
     def __enter__(self):
         self.init()
@@ -442,6 +572,30 @@ class Terminal(object):
         keys.extend("BG_{0}".format(color) for color in self._COLORS)
         return dict((key, '') for key in keys)
 
+    def _get_cursor_movement(self, direction, count):
+        """Returns the control sequence that moves the cursor by the given
+        number of cells in the given direction.
+
+        Args:
+            direction (str): the direction; one of ``UP``, ``DOWN``, ``LEFT``
+                or ``RIGHT``
+            count (int): the number of cells to move the cursor by
+
+        Returns:
+            str: the shortest known control sequence that moves the cursor
+        """
+        key = direction, count
+        result = self._cursor_movements.get(key)
+        if result is None:
+            result = self._control_sequences.get(direction, "") * count
+            parameterized = self._parameterized_cursor_movements.get(direction)
+            if count > 1 and parameterized is not None:
+                candidate = parameterized(count)
+                if candidate and len(candidate) < len(result):
+                    result = candidate
+            self._cursor_movements[key] = result
+        return result
+
     def _detect_input_encoding(self):
         """Detects the input encoding of the terminal."""
         encoding = sys.stdin.encoding
@@ -524,7 +678,14 @@ class CursesTerminal(Terminal):
         and appearance of the cursor."""
         self._parse_capabilities(BOL="cr", UP="cuu1", DOWN="cud1",
                                  LEFT="cub1", RIGHT="cuf1",
-                                 HIDE_CURSOR="cinvis", SHOW_CURSOR="cnorm")
+                                 HIDE_CURSOR="civis", SHOW_CURSOR="cnorm")
+
+        capabilities = dict(UP="cuu", DOWN="cud", LEFT="cub", RIGHT="cuf")
+        for direction, capability_name in capabilities.items():
+            capability = self._get_string_capability(capability_name)
+            if capability:
+                self._parameterized_cursor_movements[direction] = \
+                    partial(self._tparm, capability)
 
     def _parse_erasing_control_sequences(self):
         """Parses the control sequences from terminfo that erase content from
@@ -597,6 +758,13 @@ class ANSITerminal(Terminal):
         colorama.init()
         self._deinit_hook = colorama.deinit
 
+        self._parameterized_cursor_movements.update(
+            UP="\x1b[{0}A".format,
+            DOWN="\x1b[{0}B".format,
+            RIGHT="\x1b[{0}C".format,
+            LEFT="\x1b[{0}D".format
+        )
+
         self._control_sequences.update(
             UP="\x1b[1A",
             DOWN="\x1b[1B",
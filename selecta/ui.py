@@ -4,6 +4,7 @@ from contextlib import contextmanager
 from selecta.errors import NotSupportedError
 from selecta.terminal import Keycodes
 from selecta.renderers import MatchRenderer
+from selecta.screen import Screen
 from selecta.utils import is_printable, safeint
 
 import re
@@ -87,6 +88,20 @@ class TerminalUI(UI):
         the console."""
         return MatchRenderer()
 
+    def search(self, query):
+        """Searches the index of the UI for the given query, returning only
+        as many matches as the UI is able to show.
+
+        Args:
+            query (str): the query string
+
+        Returns:
+            selecta.matches.ResultSet: the best matches for the query
+        """
+        if self.index is None:
+            return []
+        return self.index.search(query, limit=self.hit_list_limit)
+
 
 class DumbTerminalUI(TerminalUI):
     """Dumb terminal-based UI class for ``selecta``. This UI class does not
@@ -94,7 +109,7 @@ class DumbTerminalUI(TerminalUI):
     access)."""
 
     def choose_item(self, initial_query=None):
-        matches = self.index.search(initial_query) if initial_query else None
+        matches = self.search(initial_query) if initial_query else None
         while True:
             self.show_matches(matches)
             query = self.read_query()
@@ -102,10 +117,10 @@ class DumbTerminalUI(TerminalUI):
                 return None
 
             match_index = safeint(query, 0)
-            if match_index > 0 and match_index <= len(matches):
+            if match_index > 0 and match_index <= len(matches or []):
                 return matches[match_index-1]
 
-            matches = self.index.search(query)
+            matches = self.search(query)
 
     def read_query(self):
         """Reads the query string or the index of the match chosen by the
@@ -126,6 +141,7 @@ class DumbTerminalUI(TerminalUI):
         """Shows the given list of matches on the standard output."""
         matches = matches or []
         limit = self.hit_list_limit
+        num_hits = getattr(matches, "num_hits", len(matches))
 
         self.renderer.attach_to_terminal(self.terminal)
         for index, match in enumerate(matches[:limit], 1):
@@ -133,8 +149,8 @@ class DumbTerminalUI(TerminalUI):
                 index=index,
                 rendered_match=self.renderer.render(match)
             ))
-        if len(matches) > limit:
-            print("...and {0} more".format(len(matches) - limit))
+        if num_hits > limit:
+            print("...and {0} more".format(num_hits - limit))
 
 
 class SmartTerminalUI(TerminalUI):
@@ -147,38 +163,98 @@ class SmartTerminalUI(TerminalUI):
         if not terminal.supports("LEFT", "RIGHT", "UP", "DOWN"):
             raise NotSupportedError("SmartTerminalUI requires a terminal that "
                                     "supports cursor movement")
+        self.poll_interval = 0.1
         self._query = None
+        self._refresh_deferred = False
+        self._refresh_pending = False
+        self._search_state = None
+        self._screen = Screen(terminal)
         self._ui_shown = False
+        self._index_state = None
         self.reset()
 
     def choose_item(self, initial_query=None):
         self.query = initial_query or ''
         while True:
+            # If the index is still being filled in the background, re-run
+            # the query periodically so the user sees the new items
+            if self._index_state != self._get_index_state():
+                self.refresh()
+            is_loading = self._index_state[1]
+
             try:
-                char = self.terminal.getch()
+                char = self.terminal.getch(
+                    timeout=self.poll_interval if is_loading else None
+                )
+                if char is None:
+                    continue
+
+                # Process all the characters that are already waiting in
+                # the input buffer (e.g., when the user pastes something)
+                # before searching and redrawing the UI only once
+                with self.deferred_refresh():
+                    action = self.handle_char(char)
+                    while action is None:
+                        char = self.terminal.getch(block=False)
+                        if char is None:
+                            break
+                        action = self.handle_char(char)
             except KeyboardInterrupt:
                 return None
             except EOFError:
                 return None
 
-            if Keycodes.is_enter_like(char):
+            if action == "accept":
                 return self.selected_item
-            elif Keycodes.is_backspace_like(char):
-                self.query = self.query[:-1]
-            elif char == Keycodes.CTRL_N or char == Keycodes.DOWN:
-                self.adjust_selected_index_by(1)
-            elif char == Keycodes.CTRL_P or char == Keycodes.UP:
-                self.adjust_selected_index_by(-1)
-            elif char == Keycodes.CTRL_U:
-                self.query = ''
-            elif char == Keycodes.CTRL_W:
-                self.query = re.sub("[^ ]* *$", "", self.query)
-            elif char == Keycodes.ESCAPE:
+            elif action == "cancel":
                 return None
-            elif is_printable(char):
-                self.query += char
-            else:
-                print("Unhandled char: {0!r}".format(char))
+
+    @contextmanager
+    def deferred_refresh(self):
+        """Context manager that postpones the redraws of the UI requested
+        within the context until the end of the context, where the UI is
+        redrawn at most once."""
+        if self._refresh_deferred:
+            yield
+            return
+
+        self._refresh_deferred, self._refresh_pending = True, False
+        try:
+            yield
+        finally:
+            self._refresh_deferred = False
+            if self._refresh_pending:
+                self.refresh()
+
+    def handle_char(self, char):
+        """Handles a single character or key code read from the terminal.
+
+        Args:
+            char (str): the character or key code to handle
+
+        Returns:
+            str or None: ``"accept"`` if the user has chosen the selected
+                item, ``"cancel"`` if the user has cancelled the selection
+                and ``None`` otherwise
+        """
+        if Keycodes.is_enter_like(char):
+            return "accept"
+        elif Keycodes.is_backspace_like(char):
+            self.query = self.query[:-1]
+        elif char == Keycodes.CTRL_N or char == Keycodes.DOWN:
+            self.adjust_selected_index_by(1)
+        elif char == Keycodes.CTRL_P or char == Keycodes.UP:
+            self.adjust_selected_index_by(-1)
+        elif char == Keycodes.CTRL_U:
+            self.query = ''
+        elif char == Keycodes.CTRL_W:
+            self.query = re.sub("[^ ]* *$", "", self.query)
+        elif char == Keycodes.ESCAPE:
+            return "cancel"
+        elif is_printable(char):
+            self.query += char
+        else:
+            print("Unhandled char: {0!r}".format(char))
 
     def dispose(self):
         self.hide()
@@ -193,8 +269,10 @@ class SmartTerminalUI(TerminalUI):
         self._ui_shown = False
 
     def _hide(self):
-        self.terminal.move_cursor(x=0)
-        self.terminal.clear_to_eos()
+        with self.terminal.frame():
+            self.terminal.move_cursor(x=0)
+            self.terminal.clear_to_eos()
+        self._screen.invalidate()
 
     def adjust_selected_index_by(self, offset, wrap=True):
         """Adjusts the selected index with the given offset, optionally wrapping
@@ -204,6 +282,9 @@ class SmartTerminalUI(TerminalUI):
             offset (int): the offset to add to the selected index
             wrap (bool): whether to wrap around the result list
         """
+        # The query might have changed since the last redraw if the redraw
+        # was deferred, so make sure that we are moving on the right list
+        self._update_matches()
         if self.selected_index is None:
             return
         new_index = int(self.selected_index) + offset
@@ -223,8 +304,9 @@ class SmartTerminalUI(TerminalUI):
 
     @query.setter
     def query(self, value):
-        """Sets the current query string shown on the UI."""
-        # TODO: optimize if the new query string has the old as a prefix
+        """Sets the current query string shown on the UI. The index takes
+        care of narrowing down the previous set of hits if the new query
+        string has the old one as a prefix."""
         if value == self._query:
             return
         self._query = value
@@ -232,40 +314,59 @@ class SmartTerminalUI(TerminalUI):
 
     def refresh(self):
         """Redraws the UI. Assumes that the cursor is in the row where the
-        drawing should start."""
-
-        num_lines = self.hit_list_limit + 1
-        if not self._ui_shown:
-            # Ensure that there are enough empty lines at the bottom of the
-            # terminal to show the UI
-            self.terminal.write("\n" * num_lines)
-            self.terminal.move_cursor(dy=-num_lines)
-            self._ui_shown = True
+        drawing should start. When called within a deferred_refresh_ context,
+        the redraw is postponed until the end of the context."""
+        if self._refresh_deferred:
+            self._refresh_pending = True
+            return
+        self._refresh_pending = False
 
         query = self.query
-
-        self._best_matches = self.index.search(query) if self.index else []
-        if self._best_matches and self._selected_index is None:
-            self._selected_index = 0
-        self._fix_selected_index()
-
-        with self.terminal.hidden_cursor():
-            # Draw the matches first
-            self.terminal.move_cursor(x=0, dy=1)
-            num_lines_printed = self._show_matches(self._best_matches)
-            self.terminal.clear_to_eos()
-
-            # Now draw the prompt and the query
-            self.terminal.move_cursor(x=0, dy=-num_lines_printed-1)
-            self.terminal.write(self.prompt, raw=True)
-            # TODO: truncate the query from the front if too wide
-            self.terminal.write(query, raw=True)
-            self.terminal.clear_to_eol()
+        self._update_matches()
+
+        # The first row contains the prompt, the query and the loading
+        # indicator or the loading error (if needed); the matches come
+        # afterwards. Only the rows that have changed since the last refresh
+        # are sent to the terminal.
+        # TODO: truncate the query from the front if too wide
+        render = self.terminal.render
+        prompt_row = [self.prompt, query, render("${CLEAR_EOL}")]
+        if self._index_state[1]:
+            indicator = "  (loading {0} items...)".format(
+                self.index.num_items
+            )
+            prompt_row.extend([render("${DIM}"), indicator,
+                               render("${NORMAL}")])
+        elif getattr(self.index, "error", None) is not None:
+            # Reading the items failed so the list of matches is incomplete
+            indicator = "  (error while loading items: {0})".format(
+                self.index.error
+            )
+            prompt_row.extend([render("${BOLD}"), indicator,
+                               render("${NORMAL}")])
+
+        rows = ["".join(prompt_row)]
+        rows.extend(self._render_matches(self._best_matches))
+
+        # Everything is sent to the terminal in a single write
+        with self.terminal.frame():
+            if not self._ui_shown:
+                # Ensure that there are enough empty lines at the bottom of
+                # the terminal to show the UI
+                num_lines = self.hit_list_limit + 1
+                self.terminal.write("\n" * num_lines)
+                self.terminal.move_cursor(dy=-num_lines)
+                self._screen.invalidate()
+                self._ui_shown = True
+
+            self._screen.update(rows,
+                                cursor=(0, len(self.prompt) + len(query)))
 
     def reset(self):
         """Resets the UI to the initial state (no query, no matches, no
         selection)."""
         self._best_matches = []
+        self._search_state = None
         self._selected_index = None
         self.query = ''
 
@@ -291,6 +392,31 @@ class SmartTerminalUI(TerminalUI):
         else:
             return self._best_matches[self._selected_index]
 
+    def _get_index_state(self):
+        """Returns a tuple describing the state of the index of the UI;
+        used to decide whether the index has changed since the last
+        refresh. The first element of the tuple is the generation of the
+        index (if the index supports it), the second element is whether the
+        index is still being loaded in the background."""
+        index = self.index
+        return getattr(index, "generation", None), \
+            bool(getattr(index, "loading", False))
+
+    def _update_matches(self):
+        """Updates the list of the best matches shown on the UI by searching
+        the index for the current query, unless neither the query nor the
+        index has changed since the last search."""
+        index_state = self._get_index_state()
+        search_state = self.index, self.query, index_state
+        if search_state != self._search_state:
+            self._best_matches = self.search(self.query)
+            self._index_state = index_state
+            self._search_state = search_state
+
+        if self._best_matches and self._selected_index is None:
+            self._selected_index = 0
+        self._fix_selected_index()
+
     def _fix_selected_index(self):
         """Ensures that the index of the selected item is within valid
         bounds."""
@@ -301,20 +427,19 @@ class SmartTerminalUI(TerminalUI):
                 0, min(self._selected_index, self.num_visible_matches)
             )
 
-    def _show_matches(self, matches):
-        """Shows the given list of matches on the terminal.
+    def _render_matches(self, matches):
+        """Renders the given list of matches into the rows that will show
+        them on the terminal.
 
         Returns:
-            int: the number of lines printed on the terminal
+            list of str: the rendered rows
         """
         matches = matches or []
         limit = self.hit_list_limit
 
         self.renderer.attach_to_terminal(self.terminal)
-        for index, match in enumerate(matches[:limit]):
-            selected = (index == self._selected_index)
-            rendered_match = self.renderer.render(match, selected=selected)
-            self.terminal.write(rendered_match, raw=True)
-            self.terminal.write("\n")
-
-        return min(len(matches), limit)
+        selected_index = self._selected_index
+        return [
+            self.renderer.render(match, selected=(index == selected_index))
+            for index, match in enumerate(matches[:limit])
+        ]
@@ -1,9 +1,17 @@
+from array import array
 from itertools import chain
 from string import printable
 import unicodedata
 
 __all__ = ["each_index_of_string", "identity", "is_printable",
-           "list_packer", "safeint"]
+           "list_packer", "safeint", "signature_of", "text_type"]
+
+try:
+    # Python 2.x
+    text_type = unicode
+except NameError:
+    # Python 3.x
+    text_type = str
 
 
 def each_index_of_string(string, corpus):
@@ -49,7 +57,7 @@ def is_printable(string):
     If the string is a Unicode string, this function uses the ``unicodedata``
     to decide which characters are printable. If the string contains raw bytes,
     it considers the characters in ``string.printable`` as printable."""
-    if isinstance(string, unicode):
+    if isinstance(string, text_type):
         return all(unicodedata.category(char) != 'Cc' for char in string)
     else:
         return all(_is_printable_helper[ord(char)] == ' ' for char in string)
@@ -60,6 +68,51 @@ def list_packer(*args):
     return args
 
 
+try:
+    array("Q")
+    SIGNATURE_TYPECODE = "Q"
+except ValueError:
+    # Python 2.x does not support unsigned long long arrays
+    SIGNATURE_TYPECODE = "L"
+
+_SIGNATURE_BITS = array(SIGNATURE_TYPECODE).itemsize * 8
+_SIGNATURE_SHIFT = 32 - (_SIGNATURE_BITS.bit_length() - 1)
+
+
+class _SignatureBits(dict):
+    """Dictionary that maps characters to the corresponding bits of the
+    character signatures, calculating the bits on the fly as needed."""
+
+    def __missing__(self, char):
+        bit = 1 << (((ord(char) * 2654435761) & 0xFFFFFFFF) >> _SIGNATURE_SHIFT)
+        self[char] = bit
+        return bit
+
+_get_signature_bit = _SignatureBits().__getitem__
+
+
+def signature_of(string):
+    """Returns the character signature of the given string. The signature
+    is a bit mask that has a bit set for every character in the string;
+    characters are mapped to bits with a multiplicative hash. A string *a*
+    may contain another string *b* as a subsequence only if the signature of
+    *a* contains all the bits from the signature of *b*.
+
+    The signature fits into an item of an ``array`` with the typecode given
+    in ``SIGNATURE_TYPECODE``; this is 64 bits wide on most platforms.
+
+    Args:
+        string (str): the string to calculate the signature of
+
+    Returns:
+        int: the signature of the string
+    """
+    result = 0
+    for bit in map(_get_signature_bit, set(string)):
+        result |= bit
+    return result
+
+
 def _safe_conversion(value, converter, default=None):
     """Pipes a value through a converter function and returns the converted
     value or the default value if there was an exception during the conversion.
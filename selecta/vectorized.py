@@ -0,0 +1,302 @@
+"""Search indexes that use NumPy to score all the tokens of the index with
+batched array operations instead of a per-token Python loop.
+
+This module can be imported only if NumPy is installed; use
+``selecta.indexing.create_fuzzy_index("numpy")`` to get a helpful error
+message when it is not.
+"""
+
+from selecta.indexing import FuzzyIndex
+
+import numpy as np
+
+__all__ = ["NumPyFuzzyIndex"]
+
+try:
+    # Python 2.x
+    _chr = unichr
+except NameError:
+    # Python 3.x
+    _chr = chr
+
+
+class NumPyFuzzyIndex(FuzzyIndex):
+    """Fuzzy index that packs the code points of all the tokens into a single
+    flat NumPy array (along with the offsets of the tokens in the array) and
+    scores all the tokens at once using batched array operations.
+
+    The scores and the matched ranges are exactly the same as the ones
+    calculated by FuzzyIndex_. The tokens are packed into the array when the
+    index is finalized; tokens added after that are packed by the next
+    search.
+    """
+
+    def __init__(self):
+        super(NumPyFuzzyIndex, self).__init__()
+        self._last_hits = None
+        self._num_packed_tokens = 0
+        self._codes = np.zeros(0, dtype=np.uint32)
+        self._alnum = np.zeros(0, dtype=bool)
+        self._token_starts = np.zeros(0, dtype=np.int64)
+        self._token_ends = np.zeros(0, dtype=np.int64)
+        self._max_token_length = 0
+        self._occurrences = {}
+        self._packable = True
+
+    def forget_previous_query(self):
+        super(NumPyFuzzyIndex, self).forget_previous_query()
+        self._last_hits = None
+
+    def finalize(self):
+        super(NumPyFuzzyIndex, self).finalize()
+        self._ensure_packed()
+
+    def _ensure_packed(self):
+        """Packs the tokens that were added since the index was finalized or
+        searched for the last time into the flat code point array of the
+        index."""
+        if not self._packable:
+            # Packing failed once; the index falls back to the pure Python
+            # implementation for good so there is no point in trying again
+            return
+
+        tokens = self._tokens[self._num_packed_tokens:]
+        if not tokens:
+            return
+
+        codes = np.frombuffer("".join(tokens).encode("utf-32-le"),
+                              dtype="<u4").astype(np.uint32)
+        lengths = np.array([len(token) for token in tokens], dtype=np.int64)
+        if codes.size != lengths.sum():
+            # This may happen on narrow Python builds with tokens containing
+            # characters outside the BMP; we cannot use the flat array then
+            self._packable = False
+            return
+
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        alnum_table = np.array([_chr(code).isalnum() for code in unique_codes],
+                               dtype=bool)
+
+        offset = self._codes.size
+        ends = offset + np.cumsum(lengths)
+        self._codes = np.concatenate((self._codes, codes))
+        self._alnum = np.concatenate((self._alnum,
+                                      alnum_table[inverse.reshape(-1)]))
+        self._token_starts = np.concatenate((self._token_starts,
+                                             ends - lengths))
+        self._token_ends = np.concatenate((self._token_ends, ends))
+        self._max_token_length = max(self._max_token_length,
+                                     int(lengths.max()))
+        self._occurrences = {}
+        self._num_packed_tokens += len(tokens)
+
+    def _get_occurrences(self, char):
+        """Returns the sorted array of the positions of the given character
+        in the flat code point array."""
+        result = self._occurrences.get(char)
+        if result is None:
+            result = np.flatnonzero(self._codes == ord(char))
+            self._occurrences[char] = result
+        return result
+
+    def _search(self, query, limit=None):
+        prepared_query = self._prepare_query(query)
+        first_char, rest = prepared_query
+        if not first_char or not self._has_one_item_per_token():
+            return super(NumPyFuzzyIndex, self)._search(query, limit)
+
+        self._ensure_packed()
+        if not self._packable:
+            return super(NumPyFuzzyIndex, self)._search(query, limit)
+
+        result = self._timed("scoring_time", self._score_query,
+                             prepared_query)
+        if result is None:
+            return super(NumPyFuzzyIndex, self)._search(query, limit)
+
+        # Each token belongs to exactly one item (with the same ID) so we can
+        # rank the tokens with NumPy and construct the matches for the best
+        # ones only. Ties are broken by the order in which the tokens were
+        # added, just like in FuzzyIndex.
+        token_ids, scores, starts, ends = result
+        order = self._timed("sorting_time", np.lexsort,
+                            (token_ids, ends, starts, scores))
+        if limit is not None:
+            order = order[:limit]
+
+        # The best items go straight into a result set; no Match objects are
+        # created until the matches are accessed
+        spans = starts[order].tolist(), ends[order].tolist()
+        return self._timed(
+            "match_time", self._create_result_set,
+            token_ids[order].tolist(), scores[order].tolist(), spans,
+            num_hits=token_ids.size,
+            highlighter=self._create_highlighter(prepared_query)
+        )
+
+    def _items_and_scores_of(self, token_ids, scores, starts, ends):
+        """Given the IDs of some matched tokens, their scores and their matched
+        ranges, returns a dictionary that maps the IDs of the items
+        corresponding to the tokens to their scores and matched ranges."""
+        result = {}
+        item_ids_of_token = self._item_ids_of_token
+        for token_id, score, start, end in zip(token_ids.tolist(),
+                                               scores.tolist(),
+                                               starts.tolist(), ends.tolist()):
+            for item_id in item_ids_of_token(token_id):
+                if item_id not in result or result[item_id][0] < score:
+                    result[item_id] = score, (start, end)
+        return result
+
+    def _score_items(self, prepared_query):
+        first_char, rest = prepared_query
+        if not first_char:
+            return {}
+
+        self._ensure_packed()
+        result = self._score_query(prepared_query) if self._packable else None
+        if result is None:
+            return super(NumPyFuzzyIndex, self)._score_items(prepared_query)
+
+        return self._items_and_scores_of(*result)
+
+    def _score_query(self, prepared_query):
+        """Scores all the tokens of the index against the given prepared,
+        non-empty query and remembers the matched tokens so they can be used
+        as candidates if the next query extends the current one.
+
+        Returns:
+            tuple: the same as _score_tokens()
+        """
+        first_char, rest = prepared_query
+        query = first_char + "".join(rest)
+        result = self._score_tokens(query)
+        if result is not None:
+            self._last_hits = query, result[0]
+            if self._stats is not None:
+                # All the tokens are scanned at once; only the matched ones
+                # get a score
+                self._stats.tokens_scanned += len(self._tokens)
+                self._record_candidates(result[0])
+        return result
+
+    def _score_tokens(self, query):
+        """Scores all the tokens of the index against the given normalized,
+        non-empty query.
+
+        Returns:
+            tuple: four NumPy arrays containing the IDs of the matched tokens
+                in increasing order, the scores of the tokens and the start
+                and end indices of the matched ranges within the tokens, or
+                ``None`` if the tokens are too long to be scored with 64-bit
+                integer arithmetic
+        """
+        first_char, rest = query[0], query[1:]
+
+        # This is the same dynamic programming as the one in
+        # FuzzyIndex._find_best_match(), run for the occurrences of the
+        # query characters in all the tokens in lockstep. Partial matches
+        # are represented by keys of the form score * width + start, and
+        # keys not smaller than max_key denote the lack of a partial match.
+        width = self._max_token_length + 1
+        max_key = (width + len(query) + 2) * width
+        stride = max_key + width * width + 1
+
+        # Every occurrence of the first character of the query is a potential
+        # start of a match
+        positions = self._get_occurrences(first_char)
+        token_ids = np.searchsorted(self._token_starts, positions,
+                                    side="right") - 1
+
+        last_hits = self._last_hits
+        if last_hits is not None and query.startswith(last_hits[0]):
+            mask = np.zeros(len(self._tokens), dtype=bool)
+            mask[last_hits[1]] = True
+            keep = mask[token_ids]
+            positions, token_ids = positions[keep], token_ids[keep]
+
+        offsets = self._token_starts[token_ids]
+        sequential = np.full(positions.size, max_key, dtype=np.int64)
+        boundary = sequential.copy()
+        other = width + positions - offsets
+
+        for char in rest:
+            if not positions.size:
+                return self._empty_result()
+
+            # Segmented prefix minima of the partial matches are calculated
+            # by shifting each token's values below those of the tokens
+            # before it; this must not overflow
+            segments = np.cumsum(np.concatenate(
+                ([0], token_ids[1:] != token_ids[:-1])
+            ))
+            if (int(segments[-1]) + 1) * stride >= 2 ** 62:
+                return None
+            shift = segments * stride
+
+            best = np.minimum(np.minimum(sequential, boundary), other)
+            best_boundary = np.minimum.accumulate(np.minimum(
+                boundary, np.minimum(sequential, other) + width
+            ) - shift) + shift
+            best_other = np.minimum.accumulate(
+                best - (positions - offsets) * width - shift
+            ) + shift
+
+            ends = self._get_occurrences(char)
+            end_token_ids = np.searchsorted(self._token_starts, ends,
+                                            side="right") - 1
+            end_offsets = self._token_starts[end_token_ids]
+
+            # Sequential matches extend the partial match that ends right
+            # before the new character
+            indices = np.searchsorted(positions, ends - 1)
+            clipped = np.minimum(indices, positions.size - 1)
+            found = (positions[clipped] == ends - 1) & \
+                (token_ids[clipped] == end_token_ids)
+            new_sequential = np.where(found, np.minimum(
+                sequential[clipped],
+                np.minimum(boundary[clipped], other[clipped]) + width
+            ), max_key)
+
+            # Other matches extend the best partial match that ends at least
+            # two characters before the new character in the same token
+            previous = np.maximum(indices - 1, 0)
+            found = (indices > 0) & (token_ids[previous] == end_token_ids)
+            after_alnum = self._alnum[np.maximum(ends - 1, 0)]
+            new_boundary = np.where(found & ~after_alnum,
+                                    best_boundary[previous], max_key)
+            new_other = np.where(
+                found & after_alnum,
+                best_other[previous] + (ends - end_offsets) * width, max_key
+            )
+
+            new_sequential = np.minimum(new_sequential, max_key)
+            new_boundary = np.minimum(new_boundary, max_key)
+            new_other = np.minimum(new_other, max_key)
+            keep = np.minimum(np.minimum(new_sequential, new_boundary),
+                              new_other) < max_key
+            positions, token_ids, offsets = ends[keep], \
+                end_token_ids[keep], end_offsets[keep]
+            sequential, boundary, other = new_sequential[keep], \
+                new_boundary[keep], new_other[keep]
+
+        if not positions.size:
+            return self._empty_result()
+
+        # For each token, keep the best match; ties are broken in favour of
+        # the match that ends earlier
+        keys = np.minimum(np.minimum(sequential, boundary), other)
+        order = np.lexsort((positions, keys, token_ids))
+        token_ids, keys = token_ids[order], keys[order]
+        positions, offsets = positions[order], offsets[order]
+        first = np.ones(token_ids.size, dtype=bool)
+        first[1:] = token_ids[1:] != token_ids[:-1]
+
+        scores, starts = np.divmod(keys[first], width)
+        return token_ids[first], scores, starts, \
+            positions[first] + 1 - offsets[first]
+
+    @staticmethod
+    def _empty_result():
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
@@ -0,0 +1,57 @@
+import unittest
+
+from selecta.bench import compare_results, CORPORA, generate_corpus, \
+    run_benchmarks, run_startup_benchmarks
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def test_corpora_are_reproducible(self):
+        for name in CORPORA:
+            corpus = generate_corpus(name, 100, seed=1)
+            self.assertEqual(100, len(corpus))
+            self.assertEqual(corpus, generate_corpus(name, 100, seed=1))
+            self.assertNotEqual(corpus, generate_corpus(name, 100, seed=2))
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(["paths"], sizes=[200], num_queries=3,
+                                 engine="python")
+        metrics = results["metrics"]
+        for name in ["prepare_index.lines_per_second", "fuzzy.q1.p50_ms",
+                     "fuzzy.q8.p99_ms", "fuzzy.typing.p50_ms",
+                     "substring.q4.p50_ms", "substring.typing.p99_ms",
+                     "render.matches_per_second", "peak_memory_mb"]:
+            self.assertTrue(metrics["paths.200." + name] > 0, name)
+
+    def test_run_startup_benchmarks(self):
+        metrics = run_startup_benchmarks(rounds=1, num_items=10, timeout=2)
+        self.assertTrue(metrics["startup.import_ms"] > 0)
+        self.assertTrue(metrics["startup.version_ms"] >
+                        metrics["startup.import_ms"])
+        # The time to the first prompt may not be measurable, but then it
+        # must be recorded as missing
+        self.assertTrue("startup.first_prompt_ms" in metrics)
+
+    def test_compare_results(self):
+        baseline = {"metrics": {"a.p50_ms": 10, "b.p50_ms": 10,
+                                "c.lines_per_second": 100,
+                                "d.lines_per_second": 100, "e.p50_ms": 1}}
+        results = {"metrics": {"a.p50_ms": 10.5, "b.p50_ms": 12,
+                               "c.lines_per_second": 80,
+                               "d.lines_per_second": 120, "f.p50_ms": 1}}
+        regressions = [name for name, _, _, _, regressed
+                       in compare_results(results, baseline, 0.1)
+                       if regressed]
+        self.assertEqual(["b.p50_ms", "c.lines_per_second"], regressions)
+
+    def test_missing_metrics_are_regressions(self):
+        baseline = {"metrics": {"startup.first_prompt_ms": 100, "a.p50_ms": 1}}
+        results = {"metrics": {"startup.first_prompt_ms": None, "a.p50_ms": 1}}
+        self.assertEqual(
+            [("a.p50_ms", 1, 1, 0, False),
+             ("startup.first_prompt_ms", 100, None, None, True)],
+            compare_results(results, baseline, 0.1)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from selecta.__main__ import prepare_cached_index
+from selecta.cache import IndexCache
+from selecta.errors import NotSupportedError
+from selecta.indexing import FuzzyIndex, RegexFuzzyIndex
+
+
+ITEMS = [u"foo/bar.py", u"foo/baz.py", u"spam/ham.txt", u"Makefile",
+         u"README.md", u"docs/index.rst", u"f\xf6\xf6/b\xe1r.py",
+         u"foo/bar.py"]
+
+
+def results_of(matches):
+    return [(match.matched_string, match.score, list(match.substrings))
+            for match in matches]
+
+
+class IndexCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = IndexCache(os.path.join(self.directory, "cache"))
+        self.index = FuzzyIndex()
+        for item in ITEMS:
+            self.index.add(item)
+        self.index.add(u"spam eggs", tokenizer=lambda item: item.split())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_store_and_load(self):
+        self.assertEqual(None, self.cache.load("foo"))
+        self.cache.store("foo", self.index)
+        index = self.cache.load("foo")
+        for query in [u"", u"f", u"fb", u"f\xf6", u"mkf", u"s", u"eg",
+                      u"xyz"]:
+            self.assertEqual(results_of(self.index.search(query)),
+                             results_of(index.search(query)))
+        self.assertRaises(NotSupportedError, index.add, u"bar")
+
+    def test_corrupted_files_are_ignored(self):
+        self.cache.store("foo", self.index)
+        path = os.path.join(self.cache.directory, "foo.idx")
+        with open(path, "r+b") as fp:
+            fp.truncate(100)
+        self.assertEqual(None, self.cache.load("foo"))
+
+    def test_eviction(self):
+        for key in ["foo", "bar", "baz"]:
+            self.cache.store(key, self.index)
+        self.cache.load("foo")
+        self.cache.max_size = 2 * os.path.getsize(
+            os.path.join(self.cache.directory, "foo.idx")
+        )
+        os.utime(os.path.join(self.cache.directory, "bar.idx"), (0, 0))
+        self.cache.evict()
+        self.assertEqual(["baz.idx", "foo.idx"],
+                         sorted(os.listdir(self.cache.directory)))
+
+    def test_stale_temporary_files_are_removed(self):
+        os.makedirs(self.cache.directory)
+        for name in ["stale.tmp", "fresh.tmp"]:
+            with open(os.path.join(self.cache.directory, name), "w"):
+                pass
+        stale_time = time.time() - 2 * 3600
+        os.utime(os.path.join(self.cache.directory, "stale.tmp"),
+                 (stale_time, stale_time))
+        self.cache.evict()
+        self.assertEqual(["fresh.tmp"], os.listdir(self.cache.directory))
+
+    def test_engines(self):
+        self.assertTrue(self.cache.supports_engine("python"))
+        self.assertFalse(self.cache.supports_engine("regex"))
+
+        path = os.path.join(self.directory, "items.txt")
+        with open(path, "w") as fp:
+            fp.write("foo\nbar\n")
+        for engine in ["python", "regex", "python", "regex"]:
+            index = prepare_cached_index(self.cache, path=path, engine=engine)
+            self.assertEqual(engine == "regex",
+                             isinstance(index, RegexFuzzyIndex))
+            self.assertEqual(["foo"], [match.matched_string
+                                       for match in index.search(u"fo")])
+
+    def test_keys(self):
+        path = os.path.join(self.directory, "items.txt")
+        with open(path, "w") as fp:
+            fp.write("foo\nbar\n")
+        key = self.cache.key_for_path(path)
+        self.assertEqual(key, self.cache.key_for_path(path))
+        os.utime(path, (0, 0))
+        self.assertNotEqual(key, self.cache.key_for_path(path))
+
+        self.assertEqual(self.cache.key_for_data(b"foo\nbar\n"),
+                         self.cache.key_for_data(b"foo\nbar\n"))
+        self.assertNotEqual(self.cache.key_for_data(b"foo\nbar\n"),
+                            self.cache.key_for_data(b"foo\nbaz\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,405 @@
+import random
+import time
+import unittest
+
+from selecta.indexing import BufferedSubstringIndex, FuzzyIndex, \
+    PathTrieFuzzyIndex, RegexFuzzyIndex, SubstringIndex, SuffixArrayIndex
+from selecta.indexing import _build_suffix_array
+from selecta.stats import StatsCollector
+
+try:
+    from selecta.vectorized import NumPyFuzzyIndex
+except ImportError:
+    NumPyFuzzyIndex = None
+
+
+ITEMS = ["foo/bar.py", "foo/baz.py", "spam/ham.txt", "Makefile",
+         "README.md", "docs/index.rst"]
+
+
+def create_index(index_factory, items=ITEMS):
+    index = index_factory()
+    for item in items:
+        index.add(item)
+    return index
+
+
+def matched_strings(matches):
+    return [match.matched_string for match in matches]
+
+
+def prefiltered_tokens(index, query):
+    return [index._tokens[token_id] for token_id in index._prefilter(query)]
+
+
+class FuzzyIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = create_index(FuzzyIndex)
+
+    def test_search(self):
+        self.assertEqual(["foo/bar.py", "foo/baz.py"],
+                         matched_strings(self.index.search("fba")))
+        self.assertEqual(["Makefile"],
+                         matched_strings(self.index.search("MKF")))
+        self.assertEqual([], matched_strings(self.index.search("xyz")))
+        self.assertEqual([], matched_strings(self.index.search("")))
+
+    def test_incremental_search(self):
+        for query in ["", "f", "fo", "foo", "foo/", "foo/bz", "foo/b",
+                      "foo/bar", "s", "sp", "spam", "o", "xyzzy", "oba"]:
+            fresh_index = create_index(FuzzyIndex)
+            self.assertEqual(matched_strings(fresh_index.search(query)),
+                             matched_strings(self.index.search(query)))
+
+    def test_search_with_limit(self):
+        matches = self.index.search("o")
+        self.assertEqual(3, matches.num_hits)
+        limited_matches = self.index.search("o", limit=2)
+        self.assertEqual(matched_strings(matches[:2]),
+                         matched_strings(limited_matches))
+        self.assertEqual(3, limited_matches.num_hits)
+        self.assertEqual(3, len(self.index.search("o", limit=10)))
+
+    def test_score_token(self):
+        self.assertEqual((1, (2, 3)), self.index.score_token("xxabc", "a"))
+        self.assertEqual((2, (2, 5)), self.index.score_token("xxabc", "abc"))
+        self.assertEqual((None, None), self.index.score_token("cba", "abc"))
+        # The greedy match would use the first "b" and score 6
+        self.assertEqual((3, (0, 6)),
+                         self.index.score_token("abx-bc", "abc"))
+        # Ties are broken in favour of the earliest start
+        self.assertEqual((2, (0, 3)), self.index.score_token("a/b-b", "ab"))
+        self.assertEqual((2, (3, 5)),
+                         self.index.score_token("a" * 4 + "b", "ab"))
+
+    def test_lazy_highlighting(self):
+        displayed = []
+
+        def displayer(item):
+            displayed.append(item)
+            return item
+
+        self.index.displayer = displayer
+        matches = self.index.search("fbr")
+        self.assertEqual([], displayed)
+        self.assertEqual([(0, 7)], matches[0].substrings)
+        self.assertEqual(["foo/bar.py"], displayed)
+
+    def test_prefilter(self):
+        self.assertEqual(["foo/bar.py", "foo/baz.py"],
+                         prefiltered_tokens(self.index, "fb"))
+        self.assertEqual(["makefile"], prefiltered_tokens(self.index, "mkfl"))
+        self.assertEqual([], prefiltered_tokens(self.index, "readme.md.txt"))
+
+    def test_incremental_search_after_add(self):
+        self.assertEqual(["foo/bar.py"],
+                         matched_strings(self.index.search("fbar")))
+        self.index.add("fubar")
+        self.assertEqual(["foo/bar.py", "fubar"],
+                         matched_strings(self.index.search("fbar")))
+
+
+class PostingsTestCase(unittest.TestCase):
+    def test_identical_items_are_stored_once(self):
+        index = create_index(FuzzyIndex, ITEMS + ITEMS)
+        self.assertEqual(len(ITEMS), len(index._items))
+        self.assertEqual(2, index.search("fba").num_hits)
+
+    def test_identical_unhashable_items_are_stored_once(self):
+        index = FuzzyIndex()
+        index.tokenizer = lambda item: [item[0]]
+        index.displayer = lambda item: item[0]
+        for item in [["foo", 1], ["foo", 2], ["foo", 1], ["bar", 1]]:
+            index.add(item)
+        self.assertEqual([["foo", 1], ["foo", 2], ["bar", 1]], index._items)
+
+    def test_postings(self):
+        rng = random.Random(42)
+        words = ["foo", "Foo", "FOO", "bar", "Bar", "baz", "qux"]
+        index, expected = FuzzyIndex(), {}
+        for item_id in range(200):
+            item = tuple(rng.choice(words)
+                         for _ in range(rng.randint(1, 4))) + (item_id, )
+            index.add(item, tokenizer=lambda item: item[:-1])
+            for word in item[:-1]:
+                item_ids = expected.setdefault(word.lower(), [])
+                if item_id not in item_ids:
+                    item_ids.append(item_id)
+
+        def postings():
+            return dict(
+                (token, list(index._item_ids_of_token(token_id)))
+                for token_id, token in enumerate(index._tokens)
+            )
+
+        self.assertEqual(expected, postings())
+        self.assertTrue(index._overflow_postings)
+        index.finalize()
+        self.assertFalse(index._overflow_postings)
+        self.assertEqual(expected, postings())
+
+    def test_items_with_no_tokens_and_multiple_tokens(self):
+        # The number of tokens is equal to the number of items here, but
+        # token IDs are not item IDs
+        factories = [FuzzyIndex, RegexFuzzyIndex, PathTrieFuzzyIndex,
+                     SubstringIndex]
+        if NumPyFuzzyIndex is not None:
+            factories.append(NumPyFuzzyIndex)
+        for factory in factories:
+            index = factory()
+            index.add(u"alpha beta", tokenizer=lambda s: s.split())
+            index.add(u"nothing", tokenizer=lambda s: [])
+            self.assertEqual([u"alpha beta"],
+                             matched_strings(index.search(u"beta")))
+
+
+class RegexFuzzyIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        chars = "abAB/.[]^-\\*"
+        self.items = [
+            "".join(rng.choice(chars) for _ in range(rng.randint(0, 12)))
+            for _ in range(300)
+        ]
+        self.items.extend(ITEMS)
+        self.queries = ["", "a", "ab", "aba", "a/b", "[]", "^-", "\\*",
+                        "bbbb", "B", "fbr", "mkf", "x", "a" * 20]
+
+    def assertSameResults(self, index, expected_index):
+        for query in self.queries:
+            expected = [(match.matched_string, match.score)
+                        for match in expected_index.search(query)]
+            observed = [(match.matched_string, match.score)
+                        for match in index.search(query)]
+            self.assertEqual(sorted(expected), sorted(observed))
+
+    def test_search(self):
+        self.assertSameResults(create_index(RegexFuzzyIndex, self.items),
+                               create_index(FuzzyIndex, self.items))
+
+    def test_items_with_multiple_tokens(self):
+        index, expected_index = RegexFuzzyIndex(), FuzzyIndex()
+        for item in self.items:
+            tokens = item.split("/")
+            index.add(item, tokenizer=lambda _: tokens)
+            expected_index.add(item, tokenizer=lambda _: tokens)
+        self.assertSameResults(index, expected_index)
+
+    def test_adding_items_after_search(self):
+        index = create_index(RegexFuzzyIndex)
+        self.assertEqual(["Makefile"], matched_strings(index.search("mkf")))
+        index.add("Makefile.am")
+        self.assertEqual(["Makefile", "Makefile.am"],
+                         sorted(matched_strings(index.search("mkf"))))
+
+    def test_tokens_containing_the_separator(self):
+        index = create_index(RegexFuzzyIndex, ["foo\nbar", "bar"])
+        self.assertEqual(["bar", "foo\nbar"],
+                         sorted(matched_strings(index.search("br"))))
+        self.assertEqual(["foo\nbar"], matched_strings(index.search("o\nb")))
+
+    def test_queries_containing_the_separator(self):
+        index = create_index(RegexFuzzyIndex, ["foo", "bar"])
+        self.assertEqual([], matched_strings(index.search("o\nb")))
+
+    def test_many_copies_of_the_first_character(self):
+        # Each copy of "a" used to be a new starting point for the
+        # expression, which took quadratic time in the length of the token
+        items = ["a" * 50000 + "cb", "a" * 10 + "bc"]
+        index = create_index(RegexFuzzyIndex, items)
+        start = time.time()
+        self.assertEqual([items[1]], matched_strings(index.search("abc")))
+        self.assertTrue(time.time() - start < 1)
+
+
+class PathTrieFuzzyIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        components = ["src", "lib", "Foo", "a.b", "x-y", "tests", "",
+                      "mod.py"]
+        self.items = [
+            "/".join(rng.choice(components)
+                     for _ in range(rng.randint(0, 6)))
+            for _ in range(300)
+        ]
+        self.items.extend(ITEMS)
+        self.queries = ["", "s", "sr", "src", "srcm", "srcmod", "s/l", "/",
+                        "//", "fo.b", "xym", "tests/mod", "a" * 5, "fbr",
+                        "mkf", "z"]
+
+    def assertSameResults(self, index, expected_index, limit=None):
+        for query in self.queries:
+            expected = expected_index.search(query, limit)
+            observed = index.search(query, limit)
+            self.assertEqual(expected.num_hits, observed.num_hits)
+            self.assertEqual(
+                [(match.matched_string, match.score, match.substrings)
+                 for match in expected],
+                [(match.matched_string, match.score, match.substrings)
+                 for match in observed]
+            )
+
+    def test_search(self):
+        index = create_index(PathTrieFuzzyIndex, self.items)
+        expected_index = create_index(FuzzyIndex, self.items)
+        self.assertSameResults(index, expected_index)
+        self.assertSameResults(index, expected_index, limit=5)
+
+    def test_incremental_search(self):
+        index = create_index(PathTrieFuzzyIndex, self.items)
+        expected_index = create_index(FuzzyIndex, self.items)
+        for query in self.queries:
+            for end in range(len(query) + 1):
+                self.assertEqual(
+                    matched_strings(expected_index.search(query[:end])),
+                    matched_strings(index.search(query[:end]))
+                )
+
+    def test_items_with_multiple_tokens(self):
+        index, expected_index = PathTrieFuzzyIndex(), FuzzyIndex()
+        for item in self.items:
+            tokens = [item, item.replace("/", "-")]
+            index.add(item, tokenizer=lambda _: tokens)
+            expected_index.add(item, tokenizer=lambda _: tokens)
+        self.assertSameResults(index, expected_index)
+
+    def test_adding_items_after_search(self):
+        index = create_index(PathTrieFuzzyIndex)
+        self.assertEqual(["foo/bar.py"],
+                         matched_strings(index.search("fbar")))
+        index.add("fubar")
+        index.add("foo/bar/baz.py")
+        self.assertEqual(["foo/bar.py", "foo/bar/baz.py", "fubar"],
+                         sorted(matched_strings(index.search("fbar"))))
+
+    def test_pruning(self):
+        index = create_index(PathTrieFuzzyIndex, [
+            "foo/bar/a.py", "foo/bar/b.py", "foo/baz/c.py", "spam/ham.txt"
+        ])
+        index.stats_callback = collector = StatsCollector()
+
+        # The root and foo/ are examined; the match is completed in foo/
+        self.assertEqual(3, index.search("fo").num_hits)
+        # The children of foo/ are examined; spam/ is pruned
+        self.assertEqual(1, index.search("fozc").num_hits)
+        self.assertEqual([2, 3], [stats.tokens_scanned
+                                  for stats in collector.searches])
+
+
+class SubstringIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = create_index(lambda: SubstringIndex(case_sensitive=False))
+
+    def test_search(self):
+        self.assertEqual(["foo/bar.py", "foo/baz.py"],
+                         sorted(matched_strings(self.index.search("foo/"))))
+        self.assertEqual(["README.md"],
+                         matched_strings(self.index.search("readme")))
+        self.assertEqual([(2, 4), (6, 8)],
+                         self.index.search("am")[0].substrings)
+
+    def test_trigram_prefilter(self):
+        self.assertEqual(["foo/bar.py", "foo/baz.py"],
+                         prefiltered_tokens(self.index, "foo/ba"))
+        self.assertEqual(["readme.md"], prefiltered_tokens(self.index, "me.m"))
+        self.assertEqual([], prefiltered_tokens(self.index, "mex"))
+        self.assertEqual(6, len(prefiltered_tokens(self.index, "me")))
+        self.assertEqual(["foo/baz.py"],
+                         matched_strings(self.index.search("baz.")))
+        self.assertEqual([], matched_strings(self.index.search("zab")))
+
+    def test_search_with_limit(self):
+        matches = self.index.search("a")
+        limited_matches = self.index.search("a", limit=3)
+        self.assertEqual(matched_strings(matches[:3]),
+                         matched_strings(limited_matches))
+        self.assertEqual(5, limited_matches.num_hits)
+
+    def test_incremental_search(self):
+        self.assertEqual(5, len(self.index.search("a")))
+        self.assertEqual(2, len(self.index.search("ba")))
+        self.assertEqual(1, len(self.index.search("bar")))
+        self.assertEqual(0, len(self.index.search("barx")))
+        self.assertEqual(5, len(self.index.search("a")))
+
+
+class BufferedSubstringIndexTestCase(unittest.TestCase):
+    index_class = BufferedSubstringIndex
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.items = [
+            "".join(rng.choice("abAB/._") for _ in range(rng.randint(0, 12)))
+            for _ in range(300)
+        ]
+        self.items.extend(ITEMS)
+        self.queries = ["", "a", "b", "ab", "aba", "a/b", "_.", "bbbb", "B",
+                        "foo", "index.rst", "x", "/", "a" * 20]
+
+    def assertSameResults(self, case_sensitive):
+        expected_index = SubstringIndex(case_sensitive=case_sensitive)
+        index = self.index_class(case_sensitive=case_sensitive)
+        for item in self.items:
+            expected_index.add(item)
+            index.add(item)
+        index.finalize()
+
+        for query in self.queries:
+            expected = [(match.matched_string, match.score)
+                        for match in expected_index.search(query)]
+            observed = [(match.matched_string, match.score)
+                        for match in index.search(query)]
+            self.assertEqual(expected, observed)
+
+    def test_case_sensitive_search(self):
+        self.assertSameResults(case_sensitive=True)
+
+    def test_case_insensitive_search(self):
+        self.assertSameResults(case_sensitive=False)
+
+    def test_adding_items_after_finalizing(self):
+        index = create_index(self.index_class)
+        index.finalize()
+        self.assertEqual(["Makefile"],
+                         matched_strings(index.search("Make")))
+        index.add("Makefile.am")
+        self.assertEqual(["Makefile", "Makefile.am"],
+                         sorted(matched_strings(index.search("Make"))))
+
+    def test_tokens_containing_the_separator(self):
+        index = self.index_class()
+        index.add("foo\x00bar")
+        index.add("bar")
+        self.assertEqual(["bar", "foo\x00bar"],
+                         sorted(matched_strings(index.search("bar"))))
+        self.assertEqual(["foo\x00bar"],
+                         matched_strings(index.search("o\x00b")))
+
+
+class SuffixArrayIndexTestCase(BufferedSubstringIndexTestCase):
+    index_class = SuffixArrayIndex
+
+    def test_new_items_are_merged_into_the_suffix_array(self):
+        expected_index, index = SubstringIndex(), self.index_class()
+        for item in self.items[:100]:
+            expected_index.add(item)
+            index.add(item)
+        index.finalize()
+
+        for start in range(100, len(self.items), 50):
+            for item in self.items[start:start+50]:
+                expected_index.add(item)
+                index.add(item)
+            for query in self.queries:
+                self.assertEqual(
+                    matched_strings(expected_index.search(query)),
+                    matched_strings(index.search(query))
+                )
+            self.assertEqual(
+                _build_suffix_array(index._buffer, index._SEPARATOR),
+                list(index._suffix_array)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
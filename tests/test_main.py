@@ -0,0 +1,60 @@
+import unittest
+
+from selecta.__main__ import filter_items, prepare_index, run_queries
+
+
+ITEMS = [u"foo/bar.py", u"foo/baz.py", u"spam/ham.txt", u"Makefile",
+         u"README.md", u"f\xf6\xf6/b\xe1r.py"]
+
+
+class Stream(object):
+    """Stream that collects the strings written to it, decoding the byte
+    strings written on Python 2.x."""
+
+    encoding = "utf-8"
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        if isinstance(data, bytes):
+            data = data.decode(self.encoding)
+        self.chunks.append(data)
+
+    def getvalue(self):
+        return u"".join(self.chunks)
+
+
+class NonInteractiveModeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = prepare_index(ITEMS, engine="python")
+
+    def test_filter_items(self):
+        stream = Stream()
+        self.assertEqual(2, filter_items(self.index, u"fbr", stream=stream))
+        self.assertEqual(u"foo/bar.py\nf\xf6\xf6/b\xe1r.py\n",
+                         stream.getvalue())
+
+        stream = Stream()
+        self.assertEqual(1, filter_items(self.index, u"fb", limit=1,
+                                         stream=stream))
+        self.assertEqual(u"foo/bar.py\n", stream.getvalue())
+
+        self.assertEqual(0, filter_items(self.index, u"xyz", stream=Stream()))
+
+    def test_run_queries(self):
+        stream = Stream()
+        self.assertEqual(4, run_queries(self.index,
+                                        [u"fb", u"xyz", u"mk", u"f\xf6"],
+                                        limit=2, stream=stream))
+        self.assertEqual(
+            u"fb\t1\t2\tfoo/bar.py\n"
+            u"fb\t2\t2\tfoo/baz.py\n"
+            u"mk\t1\t3\tMakefile\n"
+            u"f\xf6\t1\t2\tf\xf6\xf6/b\xe1r.py\n",
+            stream.getvalue()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from array import array
+from selecta.matches import Match, ResultSet
+
+
+class ResultSetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.results = ResultSet(["foo", "bar", "baz"], array("l", [1, 2, 3]),
+                                 spans=([0, 1, 2], [1, 2, 3]), num_hits=10)
+
+    def test_access(self):
+        self.assertEqual(3, len(self.results))
+        self.assertEqual(10, self.results.num_hits)
+        match = self.results[1]
+        self.assertEqual("bar", match.matched_object)
+        self.assertEqual("bar", match.matched_string)
+        self.assertEqual((2, (1, 2)), match.score)
+        self.assertEqual("baz", self.results[-1].matched_object)
+        self.assertEqual(["foo", "bar", "baz"],
+                         [match.matched_object for match in self.results])
+
+    def test_slicing(self):
+        results = self.results[1:]
+        self.assertTrue(isinstance(results, ResultSet))
+        self.assertEqual(10, results.num_hits)
+        self.assertEqual([(2, (1, 2)), (3, (2, 3))],
+                         [match.score for match in results])
+
+    def test_match_factory(self):
+        results = ResultSet(["foo"], [5], match_factory=lambda item, score:
+                            (item, score))
+        self.assertEqual(("foo", 5), results[0])
+
+
+class MatchTestCase(unittest.TestCase):
+    def test_slots(self):
+        self.assertRaises(AttributeError, setattr, Match(), "foo", 42)
+
+
+if __name__ == "__main__":
+    unittest.main()
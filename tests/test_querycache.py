@@ -0,0 +1,85 @@
+import unittest
+
+from selecta.indexing import FuzzyIndex
+from selecta.matches import ResultSet
+from selecta.querycache import QueryCache
+from selecta.stats import StatsCollector
+
+
+ITEMS = ["foo/bar.py", "foo/baz.py", "spam/ham.txt", "Makefile",
+         "README.md", "docs/index.rst"]
+
+
+def matched_strings(matches):
+    return [match.matched_string for match in matches]
+
+
+class QueryCacheTestCase(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = QueryCache()
+        result = ResultSet(["foo"], [1])
+        self.assertEqual(None, cache.get("f", 9))
+        cache.put("f", 9, result)
+        self.assertTrue(cache.get("f", 9) is result)
+        self.assertEqual(None, cache.get("f", None))
+        self.assertEqual(None, cache.get("fo", 9))
+        self.assertTrue(cache.size > 0)
+
+    def test_versions(self):
+        cache = QueryCache()
+        cache.put("f", 9, ResultSet(["foo"], [1]), version=1)
+        self.assertEqual(None, cache.get("f", 9, version=2))
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.size)
+
+    def test_eviction(self):
+        results = dict((query, ResultSet([query] * 10, list(range(10))))
+                       for query in ["a", "b", "c"])
+        cache = QueryCache()
+        cache.put("a", None, results["a"])
+        cache.max_size = 2 * cache.size
+        cache.put("b", None, results["b"])
+        cache.get("a")
+        cache.put("c", None, results["c"])
+        self.assertEqual(2, len(cache))
+        self.assertTrue(cache.get("a") is results["a"])
+        self.assertEqual(None, cache.get("b"))
+        self.assertTrue(cache.get("c") is results["c"])
+
+        cache.max_size = 10
+        cache.put("d", None, ResultSet(["d"] * 10, list(range(10))))
+        self.assertEqual(None, cache.get("d"))
+
+
+class IndexWithQueryCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = FuzzyIndex()
+        for item in ITEMS:
+            self.index.add(item)
+        self.index.query_cache = QueryCache()
+
+    def test_repeated_searches(self):
+        matches = self.index.search("fb")
+        self.index.search("fba")
+        self.assertTrue(self.index.search("fb") is matches)
+        self.assertFalse(self.index.search("fb", limit=1) is matches)
+
+    def test_invalidation(self):
+        matches = self.index.search("fb")
+        self.index.add(ITEMS[0])
+        self.assertTrue(self.index.search("fb") is matches)
+        self.index.add("fubar")
+        self.assertEqual(["foo/bar.py", "foo/baz.py", "fubar"],
+                         matched_strings(self.index.search("fb")))
+
+    def test_stats_of_cached_searches(self):
+        self.index.stats_callback = collector = StatsCollector()
+        self.index.search("fb")
+        self.index.search("fb")
+        self.assertEqual([False, True],
+                         [stats.cached for stats in collector.searches])
+        self.assertEqual(2, collector.searches[1].hits)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from selecta.screen import Screen
+
+
+class RecordingTerminal(object):
+    """Minimal stand-in for a Terminal that records the operations
+    performed on it."""
+
+    def __init__(self):
+        self.operations = []
+
+    def clear_to_eol(self):
+        self.operations.append("clear_to_eol")
+
+    def clear_to_eos(self):
+        self.operations.append("clear_to_eos")
+
+    def hidden_cursor(self):
+        return self
+
+    def move_cursor(self, x=None, y=None, dx=0, dy=0):
+        self.operations.append(("move", x, dy))
+
+    def write(self, template, raw=False):
+        self.operations.append(template)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
+class ScreenTestCase(unittest.TestCase):
+    def setUp(self):
+        self.terminal = RecordingTerminal()
+        self.screen = Screen(self.terminal)
+        self.screen.update(["> ", "foo", "bar", "baz"], cursor=(0, 2))
+        del self.terminal.operations[:]
+
+    def test_unchanged_rows_are_not_repainted(self):
+        self.screen.update(["> ", "foo", "BAR", "baz"], cursor=(0, 2))
+        self.assertEqual([("move", 0, 2), "BAR", ("move", 2, -2)],
+                         self.terminal.operations)
+
+    def test_nothing_is_sent_without_changes(self):
+        self.screen.update(["> ", "foo", "bar", "baz"], cursor=(0, 2))
+        self.assertEqual([], self.terminal.operations)
+
+    def test_removed_rows_are_cleared(self):
+        self.screen.update(["> f", "foo"], cursor=(0, 3))
+        self.assertEqual([("move", 0, 0), "> f", ("move", 0, 2),
+                          "clear_to_eos", ("move", 3, -2)],
+                         self.terminal.operations)
+        self.assertEqual(["> f", "foo"], self.screen.rows)
+
+    def test_emptied_rows_are_cleared(self):
+        self.screen.update(["> ", "", "bar", "baz"], cursor=(0, 2))
+        self.assertEqual([("move", 0, 1), "clear_to_eol", ("move", 2, -1)],
+                         self.terminal.operations)
+
+
+if __name__ == "__main__":
+    unittest.main()
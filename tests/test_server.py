@@ -0,0 +1,143 @@
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from selecta.errors import NotSupportedError
+from selecta.indexing import FuzzyIndex
+from threading import Thread
+
+if hasattr(socket, "AF_UNIX"):
+    from selecta.server import IndexClient, IndexServer
+
+
+ITEMS = [u"foo/bar.py", u"foo/baz.py", u"spam/ham.txt", u"Makefile",
+         u"README.md", u"f\xf6\xf6/b\xe1r.py"]
+
+
+def create_index(items):
+    index = FuzzyIndex()
+    for item in items:
+        index.add(item)
+    return index
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"),
+                     "Unix domain sockets are not supported")
+class IndexServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.address = os.path.join(self.tmpdir, "selecta.sock")
+        self.items_file = os.path.join(self.tmpdir, "items.txt")
+        self.server = IndexServer(self.address, self.load,
+                                  create_index(ITEMS))
+        self.server.start()
+        self.server.handle_requests()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def load(self, path):
+        if path is None:
+            raise NotSupportedError("no path")
+        with open(path) as fp:
+            return create_index(line.strip() for line in fp)
+
+    def test_search(self):
+        with IndexClient(self.address) as client:
+            client.ping()
+            self.assertEqual(
+                (2, [(4, u"foo/bar.py"), (4, u"f\xf6\xf6/b\xe1r.py")]),
+                client.search(u"fbr")
+            )
+            self.assertEqual((3, [(2, u"foo/bar.py")]),
+                             client.search(u"fb", limit=1))
+            self.assertEqual((0, []), client.search(u"xyz"))
+            self.assertEqual(create_index(ITEMS).search(u" f b").num_hits,
+                             client.search(u" f b")[0])
+
+    def test_errors(self):
+        with IndexClient(self.address) as client:
+            self.assertRaises(NotSupportedError, client._request, u"FOO")
+            self.assertRaises(NotSupportedError, client._request,
+                              u"SEARCH x fb")
+            self.assertRaises(NotSupportedError, client.reload)
+            client.ping()
+
+    def test_reload(self):
+        with open(self.items_file, "w") as fp:
+            fp.write("fubar\nspam/ham.txt\n")
+
+        with IndexClient(self.address) as client:
+            self.assertEqual(3, client.search(u"fb")[0])
+            client.reload(self.items_file)
+            self.assertEqual((1, [(3, u"fubar")]), client.search(u"fb"))
+
+    def test_reload_with_relative_path(self):
+        with open(self.items_file, "w") as fp:
+            fp.write("fubar\n")
+
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir)
+        try:
+            with IndexClient(self.address) as client:
+                self.assertRaises(NotSupportedError, client._request,
+                                  u"RELOAD items.txt")
+                client.reload("items.txt")
+                self.assertEqual((1, [(3, u"fubar")]), client.search(u"fb"))
+        finally:
+            os.chdir(cwd)
+
+    def test_items_with_special_characters(self):
+        items = [u"foo\tbar", u"foo\nbar", u"foo\\nbar", u"foo\rbar\\"]
+        self.server.index = create_index(items)
+        with IndexClient(self.address) as client:
+            num_hits, matches = client.search(u"fo")
+            self.assertEqual(4, num_hits)
+            self.assertEqual(items, [item for _, item in matches])
+            client.ping()
+
+    def test_queries_with_special_characters(self):
+        items = [u"foo\nbar", u"foo\rbar", u"foo\\bar"]
+        self.server.index = create_index(items)
+        with IndexClient(self.address) as client:
+            self.assertEqual((1, [(2, u"foo\nbar")]), client.search(u"o\nb"))
+            self.assertEqual((1, [(2, u"foo\rbar")]), client.search(u"o\r"))
+            self.assertEqual((1, [(2, u"foo\\bar")]), client.search(u"\\b"))
+            client.ping()
+
+    def test_concurrent_clients(self):
+        results = []
+
+        def search():
+            with IndexClient(self.address) as client:
+                for _ in range(20):
+                    results.append(client.search(u"fb")[0])
+
+        threads = [Thread(target=search) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([3] * 80, results)
+
+    def test_socket_in_use(self):
+        other = IndexServer(self.address, self.load, create_index(ITEMS))
+        self.assertRaises(NotSupportedError, other.start)
+
+    def test_stale_socket(self):
+        self.server.stop()
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.address)
+        stale.close()
+
+        self.server.start()
+        self.server.handle_requests()
+        with IndexClient(self.address) as client:
+            client.ping()
+
+
+if __name__ == "__main__":
+    unittest.main()
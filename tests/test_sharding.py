@@ -0,0 +1,65 @@
+import random
+import unittest
+
+from selecta.indexing import FuzzyIndex
+from selecta.sharding import ShardedIndex
+
+
+def random_corpus(rng, size):
+    words = ["src", "lib", "test", "Main", "util", "a_b", "foo", "x"]
+    return [
+        "/".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        for _ in range(size)
+    ]
+
+
+def results_of(matches):
+    return [(match.matched_string, match.score, list(match.substrings))
+            for match in matches]
+
+
+class ShardedIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.items = random_corpus(random.Random(42), 500)
+        self.index = ShardedIndex(3, FuzzyIndex, batch_size=64)
+
+    def tearDown(self):
+        self.index.close()
+
+    def test_search(self):
+        expected_index = FuzzyIndex()
+        for item in self.items:
+            expected_index.add(item)
+            self.index.add(item)
+        self.index.finalize()
+
+        for query in ["", "s", "src", "stm", "lib/x", "xyz", "fo/te"]:
+            expected = expected_index.search(query)
+            observed = self.index.search(query)
+            self.assertEqual(expected.num_hits, observed.num_hits)
+            self.assertEqual(results_of(expected), results_of(observed))
+            for limit in [1, 10]:
+                observed = self.index.search(query, limit)
+                self.assertEqual(
+                    [(match.score, match.matched_string)
+                     for match in expected[:limit]],
+                    [(match.score, match.matched_string)
+                     for match in observed]
+                )
+
+    def test_adding_items_after_search(self):
+        self.index.add("foo/bar")
+        self.assertEqual(1, self.index.search("fb").num_hits)
+        self.index.add("foo/baz")
+        self.index.add("foo/bar")
+        self.assertEqual(["foo/bar", "foo/baz"],
+                         [match.matched_string
+                          for match in self.index.search("fb")])
+
+    def test_errors_are_propagated(self):
+        self.index.add(42)
+        self.assertRaises(Exception, self.index.search, "fb")
+
+
+if __name__ == "__main__":
+    unittest.main()
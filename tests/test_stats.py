@@ -0,0 +1,100 @@
+import unittest
+
+from selecta.indexing import BufferedSubstringIndex, FuzzyIndex, \
+    RegexFuzzyIndex, SubstringIndex, SuffixArrayIndex
+from selecta.stats import SearchStats, StatsCollector
+
+try:
+    from selecta.vectorized import NumPyFuzzyIndex
+except ImportError:
+    NumPyFuzzyIndex = None
+
+
+ITEMS = ["foo/bar.py", "foo/baz.py", "spam/ham.txt", "Makefile",
+         "README.md", "docs/index.rst"]
+
+
+def create_index(index_factory, tokenizer=None):
+    index = index_factory()
+    for item in ITEMS:
+        index.add(item, tokenizer=tokenizer)
+    index.stats_callback = collector = StatsCollector()
+    return index, collector
+
+
+class SearchStatsTestCase(unittest.TestCase):
+    def test_fuzzy_search(self):
+        index, collector = create_index(FuzzyIndex)
+        index.search("fb")
+        index.search("fbr")
+
+        stats = collector.searches[0]
+        self.assertEqual("fb", stats.query)
+        self.assertEqual("FuzzyIndex", stats.index)
+        # The signature prefilter rejects everything but foo/bar.py and
+        # foo/baz.py
+        self.assertEqual(2, stats.tokens_scanned)
+        self.assertEqual(2, stats.candidates_scored)
+        self.assertEqual(4, stats.tokens_rejected)
+        self.assertEqual(2, stats.hits)
+        self.assertEqual(0, stats.items_deduplicated)
+        for name in SearchStats.TIMERS:
+            self.assertTrue(getattr(stats, name) >= 0)
+        self.assertTrue(stats.total_time >= stats.scoring_time)
+
+        # The second search narrows down the results of the first one
+        stats = collector.searches[1]
+        self.assertEqual(2, stats.tokens_scanned)
+        self.assertEqual(1, stats.candidates_scored)
+        self.assertEqual(1, stats.hits)
+
+    def test_deduplicated_items(self):
+        index, collector = create_index(
+            FuzzyIndex, tokenizer=lambda item: item.split("/")
+        )
+        index.search("s")
+        stats = collector.searches[0]
+        # "spam", "docs" and "index.rst" match; docs/index.rst is matched by
+        # two of its tokens
+        self.assertEqual(3, stats.candidates_scored)
+        self.assertEqual(2, stats.hits)
+        self.assertEqual(1, stats.items_deduplicated)
+
+    def test_all_index_types(self):
+        index_factories = [SubstringIndex, BufferedSubstringIndex,
+                           SuffixArrayIndex, FuzzyIndex, RegexFuzzyIndex]
+        if NumPyFuzzyIndex is not None:
+            index_factories.append(NumPyFuzzyIndex)
+
+        for index_factory in index_factories:
+            index, collector = create_index(index_factory)
+            self.assertEqual(2, len(index.search("ba")))
+            stats = collector.searches[0]
+            self.assertEqual(index_factory.__name__, stats.index)
+            self.assertEqual(2, stats.candidates_scored)
+            self.assertEqual(4, stats.tokens_rejected)
+            self.assertEqual(2, stats.hits)
+
+    def test_no_stats_without_callback(self):
+        index, collector = create_index(FuzzyIndex)
+        index.stats_callback = None
+        index.search("fb")
+        self.assertEqual([], collector.searches)
+
+
+class StatsCollectorTestCase(unittest.TestCase):
+    def test_summary(self):
+        collector = StatsCollector()
+        self.assertEqual("No searches were performed.", collector.summary())
+
+        index, collector = create_index(FuzzyIndex)
+        for query in ["f", "fo", "foo", "x"]:
+            index.search(query)
+        summary = collector.summary(num_slowest=2)
+        self.assertTrue(summary.startswith("4 search(es)"))
+        self.assertTrue("candidates_scored" in summary)
+        self.assertEqual(2, summary.split("Slowest searches:")[1].count("\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import time
+import unittest
+
+from selecta.indexing import FuzzyIndex
+from selecta.streaming import StreamingIndex
+from threading import Event
+
+
+class StreamingIndexTestCase(unittest.TestCase):
+    def test_loading(self):
+        items = ["item{0}".format(i) for i in range(2500)]
+        # Batches are flushed only when they are full, so there are exactly
+        # three of them no matter how fast the items are loaded
+        index = StreamingIndex(FuzzyIndex(), items, batch_size=1000,
+                               flush_interval=float("inf")).start()
+        self.assertTrue(index.wait(5))
+        self.assertFalse(index.loading)
+        self.assertEqual(2500, index.num_items)
+        self.assertEqual(3, index.generation)
+        self.assertEqual(2500, index.search("item").num_hits)
+        self.assertEqual(["item2499"],
+                         [match.matched_string
+                          for match in index.search("item2499", limit=1)])
+
+    def test_search_while_loading(self):
+        finish = Event()
+
+        def items():
+            yield "foo"
+            yield "bar"
+            finish.wait(5)
+            yield "foobar"
+
+        index = StreamingIndex(FuzzyIndex(), items(), batch_size=2)
+        index.start()
+        while index.num_items < 2:
+            time.sleep(0.01)
+        self.assertTrue(index.loading)
+        self.assertEqual(1, len(index.search("fo")))
+
+        finish.set()
+        self.assertTrue(index.wait(5))
+        self.assertEqual(2, len(index.search("fo")))
+
+    def test_error(self):
+        def items():
+            yield "foo"
+            raise ValueError("spam")
+
+        index = StreamingIndex(FuzzyIndex(), items()).start()
+        self.assertTrue(index.wait(5))
+        self.assertTrue(isinstance(index.error, ValueError))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+from selecta.terminal import CursesTerminal, Terminal
+
+
+class CountingStream(object):
+    def __init__(self):
+        self.chunks = []
+        self.num_flushes = 0
+
+    def flush(self):
+        self.num_flushes += 1
+
+    def write(self, data):
+        self.chunks.append(data)
+
+
+class FakeANSITerminal(Terminal):
+    @property
+    def supported(self):
+        return True
+
+    def init(self):
+        super(FakeANSITerminal, self).init()
+        self._control_sequences.update(
+            UP="\x1b[1A", DOWN="\x1b[1B", RIGHT="\x1b[1C", LEFT="\x1b[1D",
+            BOL="\r", CLEAR_EOL="\x1b[K"
+        )
+        self._parameterized_cursor_movements.update(
+            UP="\x1b[{0}A".format, RIGHT="\x1b[{0}C".format
+        )
+
+
+class FakeCursesModule(object):
+    """Fake ``curses`` module whose string capabilities are the names of
+    the capabilities in angle brackets."""
+
+    def tigetstr(self, capability_name):
+        return "<{0}>".format(capability_name)
+
+
+class CursesTerminalTestCase(unittest.TestCase):
+    def test_cursor_control_sequences(self):
+        terminal = CursesTerminal(stream=CountingStream(), is_tty=True)
+        terminal._curses = FakeCursesModule()
+        terminal._control_sequences = {}
+        terminal._parameterized_cursor_movements = {}
+        terminal._parse_cursor_control_sequences()
+        self.assertEqual("<civis>", terminal._control_sequences["HIDE_CURSOR"])
+        self.assertEqual("<cnorm>", terminal._control_sequences["SHOW_CURSOR"])
+        self.assertEqual("<cuu1>", terminal._control_sequences["UP"])
+
+
+class TerminalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stream = CountingStream()
+        self.terminal = FakeANSITerminal(stream=self.stream, is_tty=True)
+        self.terminal.init()
+
+    def tearDown(self):
+        self.terminal.deinit()
+
+    def test_frame(self):
+        with self.terminal.frame():
+            self.terminal.write("foo")
+            with self.terminal.frame():
+                self.terminal.clear_to_eol()
+            self.terminal.write("$BOL", raw=True)
+            self.assertEqual([], self.stream.chunks)
+        self.assertEqual(["foo\x1b[K$BOL"], self.stream.chunks)
+        self.assertEqual(1, self.stream.num_flushes)
+
+    def test_write_outside_frame(self):
+        self.terminal.write("foo")
+        self.terminal.write("${CLEAR_EOL}")
+        self.assertEqual(["foo", "\x1b[K"], self.stream.chunks)
+        self.assertEqual(2, self.stream.num_flushes)
+
+    def test_getch_splits_chunks_into_keys(self):
+        chunks = [u"ab\x1b[A\r\x1b\xe1".encode("utf-8")]
+        self.terminal._input_encoding = "utf-8"
+        self.terminal._read_chunk = lambda block, timeout: \
+            chunks.pop(0) if chunks else None
+        keys = [self.terminal.getch(block=False) for _ in range(6)]
+        self.assertEqual([u"ab", u"\x1b[A", u"\r", u"\x1b", u"\xe1", None],
+                         keys)
+
+    def test_move_cursor(self):
+        self.terminal.move_cursor(x=5, dy=-3)
+        self.terminal.move_cursor(dy=2)
+        self.terminal.move_cursor(dx=-1)
+        self.terminal.move_cursor(dx=1)
+        self.assertEqual(["\x1b[3A\r\x1b[5C", "\x1b[1B\x1b[1B", "\x1b[1D",
+                          "\x1b[1C"], self.stream.chunks)
+
+
+if __name__ == "__main__":
+    unittest.main()
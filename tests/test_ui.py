@@ -0,0 +1,132 @@
+import unittest
+
+from selecta.indexing import FuzzyIndex
+from selecta.streaming import StreamingIndex
+from selecta.terminal import Keycodes, Terminal
+from selecta.ui import SmartTerminalUI
+
+
+class FakeStream(object):
+    def __init__(self):
+        self.chunks = []
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return "".join(self.chunks)
+
+    def write(self, data):
+        self.chunks.append(data)
+
+
+class FakeTerminal(Terminal):
+    """Terminal that reads its input from a list of characters and records
+    its output in memory."""
+
+    def __init__(self, keys=()):
+        super(FakeTerminal, self).__init__(stream=FakeStream(), is_tty=True)
+        self.keys = list(keys)
+
+    def init(self):
+        super(FakeTerminal, self).init()
+        self._control_sequences.update(
+            UP="<UP>", DOWN="<DOWN>", LEFT="<LEFT>", RIGHT="<RIGHT>",
+            BOL="<BOL>"
+        )
+
+    def getch(self, block=True, timeout=None):
+        if self.keys:
+            return self.keys.pop(0)
+        if block and timeout is None:
+            raise EOFError
+        return None
+
+    @property
+    def supported(self):
+        return True
+
+
+class ChunkedFakeTerminal(FakeTerminal):
+    """Fake terminal that reads chunks of raw bytes like the raw getch()
+    function, which returns all the keys waiting in the input buffer of the
+    terminal at once."""
+
+    getch = Terminal.getch
+
+    def _detect_input_encoding(self):
+        return "utf-8"
+
+    def _read_chunk(self, block, timeout):
+        return FakeTerminal.getch(self, block, timeout)
+
+
+class CountingIndex(FuzzyIndex):
+    def __init__(self):
+        super(CountingIndex, self).__init__()
+        self.queries = []
+
+    def search(self, query, limit=None):
+        self.queries.append(query)
+        return super(CountingIndex, self).search(query, limit)
+
+
+class SmartTerminalUITestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = CountingIndex()
+        for item in ["foo/bar.py", "foo/baz.py", "spam/ham.txt"]:
+            self.index.add(item)
+
+    def choose_item(self, keys, terminal=None):
+        terminal = terminal or FakeTerminal(keys)
+        terminal.init()
+        try:
+            ui = SmartTerminalUI(terminal)
+            with ui.use(self.index):
+                return ui.choose_item()
+        finally:
+            terminal.deinit()
+
+    def test_pending_keys_are_coalesced(self):
+        match = self.choose_item(list(u"foo/baz") + [u"\r"])
+        self.assertEqual(u"foo/baz.py", match.matched_object)
+        self.assertEqual([u"foo/baz"], self.index.queries)
+
+    def test_chunks_are_split_into_keys(self):
+        terminal = ChunkedFakeTerminal([b"fb\x0e\r"])
+        match = self.choose_item(None, terminal)
+        self.assertEqual([u"fb"], self.index.queries)
+        expected = self.index.search(u"fb")[1]
+        self.assertEqual(expected.matched_object, match.matched_object)
+
+        terminal = ChunkedFakeTerminal([u"sp\xe1m\x17sp".encode("utf-8"),
+                                        b"m\r"])
+        match = self.choose_item(None, terminal)
+        self.assertEqual(u"spam/ham.txt", match.matched_object)
+
+    def test_selection_moves_after_query_change(self):
+        match = self.choose_item([u"f", u"b", Keycodes.DOWN, u"\r"])
+        self.assertEqual([u"fb"], self.index.queries)
+        expected = self.index.search(u"fb")[1]
+        self.assertEqual(expected.matched_object, match.matched_object)
+
+    def test_cancel(self):
+        self.assertEqual(None, self.choose_item([u"f", Keycodes.ESCAPE]))
+
+    def test_loading_error_is_shown(self):
+        def items():
+            yield u"foo/bar.py"
+            raise IOError("broken pipe")
+
+        self.index = StreamingIndex(FuzzyIndex(), items(), batch_size=1)
+        self.index.start()
+        self.assertTrue(self.index.wait(5))
+        terminal = FakeTerminal([u"f", u"\r"])
+        match = self.choose_item(None, terminal)
+        self.assertEqual(u"foo/bar.py", match.matched_object)
+        self.assertTrue(u"error while loading items: broken pipe" in
+                        terminal.stream.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from selecta.utils import each_index_of_string
+from selecta.utils import each_index_of_string, signature_of
 
 
 class EachIndexOfStringTestCase(unittest.TestCase):
@@ -20,5 +20,15 @@ class EachIndexOfStringTestCase(unittest.TestCase):
         self.assertEquals([2, 6, 10], list(each_index_of_string("a", corpus)))
 
 
+class SignatureOfTestCase(unittest.TestCase):
+    def test_signature_of(self):
+        self.assertEqual(0, signature_of(""))
+        self.assertEqual(signature_of("abc"), signature_of("cbaabc"))
+        for string, substring in [("spam ham", "sam"), ("bacon", "bc"),
+                                  ("eggs", "")]:
+            signature, mask = signature_of(string), signature_of(substring)
+            self.assertEqual(mask, signature & mask)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from selecta.indexing import FuzzyIndex
+
+try:
+    from selecta.vectorized import NumPyFuzzyIndex
+except ImportError:
+    NumPyFuzzyIndex = None
+
+
+def random_corpus(rng, size):
+    words = ["src", "lib", "test", "Main", "util", "a_b", "foo-bar", "x",
+             "index", "README", "aaa", "Abc"]
+    separators = ["/", "_", ".", "", " "]
+    return [
+        "".join(rng.choice(words) + rng.choice(separators)
+                for _ in range(rng.randint(1, 6)))
+        for _ in range(size)
+    ]
+
+
+def results_of(matches):
+    return [(match.matched_string, match.score, match.substrings)
+            for match in matches]
+
+
+@unittest.skipIf(NumPyFuzzyIndex is None, "NumPy is not installed")
+class NumPyFuzzyIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(42)
+        self.items = random_corpus(rng, 500)
+        self.queries = ["", "a", "s", "sr", "src", "srcm", "srcmain", "ab",
+                        "a_b", "aaa", "t/x", "utx", "x.", "README", "zzz",
+                        "a b", "fbi", "lib/", "li", "l"]
+
+    def create_indexes(self):
+        result = []
+        for factory in (FuzzyIndex, NumPyFuzzyIndex):
+            index = factory()
+            for item in self.items:
+                index.add(item)
+            result.append(index)
+        return result
+
+    def test_same_results_as_fuzzy_index(self):
+        python_index, numpy_index = self.create_indexes()
+        for query in self.queries:
+            self.assertEqual(results_of(python_index.search(query)),
+                             results_of(numpy_index.search(query)))
+
+    def test_adding_items_between_searches(self):
+        python_index, numpy_index = self.create_indexes()
+        for index, query in enumerate(self.queries):
+            for fuzzy_index in (python_index, numpy_index):
+                fuzzy_index.add("{0}/{1}".format(query, index))
+            self.assertEqual(results_of(python_index.search(query, limit=5)),
+                             results_of(numpy_index.search(query, limit=5)))
+
+    def test_tokens_are_packed_when_finalized(self):
+        _, numpy_index = self.create_indexes()
+        self.assertEqual(0, numpy_index._num_packed_tokens)
+        numpy_index.finalize()
+        self.assertEqual(len(numpy_index._tokens),
+                         numpy_index._num_packed_tokens)
+
+    def test_unpackable_index_is_not_packed_again(self):
+        python_index, numpy_index = self.create_indexes()
+        numpy_index._packable = False
+        for query in self.queries:
+            self.assertEqual(results_of(python_index.search(query)),
+                             results_of(numpy_index.search(query)))
+        self.assertEqual(0, numpy_index._num_packed_tokens)
+
+
+if __name__ == "__main__":
+    unittest.main()